@@ -0,0 +1,172 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
+
+from app import crud
+from app.auth import authenticate_user_async, check_login_throttle, create_user_access_token, get_current_user_async, record_login_result
+from app.dashboard import DashboardParams, dashboard_etag, not_modified_or_cached, render_dashboard
+from app.database import get_async_session
+from app.models import DashboardResponse, NotificationPage, NotificationReadRequest, NotificationReadResponse, Todo, TodoCreate, TodoPage, TodoRead, TodoUpdate, UserPrincipal
+from app.pagination import NotificationListParams, TodoListParams
+from app.reminders import dispatcher as reminder_dispatcher
+from app.responses import ORJSONResponse
+from app.search import TodoSearchParams, search_page, search_statement, todos_by_ids
+
+# ----------------------------
+# Async versions of the session-heavy endpoints in app/routers/.
+# Mounted instead of the sync ones when DB_ASYNC=1, so a request waiting on
+# the database no longer holds a threadpool thread.
+# Keep request/response behaviour identical to the sync handlers.
+# ----------------------------
+
+router = APIRouter()
+
+
+async def commit_todo_async(session, todo: Todo) -> Todo:
+    """Async twin of routers.todos.commit_todo: duplicate titles become a 400."""
+    session.add(todo)
+    try:
+        with session.no_autoflush:
+            todo.change_seq = (await session.execute(*crud.touch_user(todo.owner_id, crud.pending_counts_change(todo)))).scalar_one()
+        await session.flush()
+        await session.commit()
+    except IntegrityError as error:
+        await session.rollback()
+        if not crud.is_duplicate_title(error):
+            raise
+        raise HTTPException(status_code=400, detail="You already have a todo with this title.")
+    await session.refresh(todo)
+    if todo.reminder_at is not None and not todo.notified:
+        reminder_dispatcher.poke()
+    return todo
+
+
+async def get_owned_todo(session, todo_id: int, current_user: UserPrincipal) -> Todo:
+    todo = await session.get(Todo, todo_id)
+    if not todo or todo.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    return todo
+
+
+# ----------------------------
+# Token / login
+# ----------------------------
+@router.post("/token")
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), session=Depends(get_async_session)):
+    client_ip = request.client.host if request.client else None
+    check_login_throttle(form_data.username, client_ip)
+    user = await authenticate_user_async(session, form_data.username, form_data.password)
+    record_login_result(form_data.username, client_ip, user is not None)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
+    return {"access_token": create_user_access_token(user), "token_type": "bearer"}
+
+
+# ----------------------------
+# Notifications / dashboard
+# ----------------------------
+@router.get("/notifications", response_model=NotificationPage)
+async def list_notifications(
+    params: NotificationListParams = Depends(),
+    session=Depends(get_async_session),
+    current_user: UserPrincipal = Depends(get_current_user_async),
+):
+    statement = crud.notification_list_statement(current_user.id, params)
+    return ORJSONResponse(crud.page_of((await session.execute(*statement)).all(), params))
+
+
+@router.get("/notifications/unread-count")
+async def unread_notification_count(session=Depends(get_async_session), current_user: UserPrincipal = Depends(get_current_user_async)):
+    return {"unread": (await session.execute(*crud.unread_count_statement(current_user.id))).scalar_one()}
+
+
+@router.post("/notifications/read", response_model=NotificationReadResponse)
+async def mark_notifications_read(
+    body: NotificationReadRequest,
+    session=Depends(get_async_session),
+    current_user: UserPrincipal = Depends(get_current_user_async),
+):
+    marked = (await session.execute(*crud.mark_read_statement(current_user.id, body, datetime.now()))).rowcount
+    if marked:
+        await session.execute(*crud.notifications_read(current_user.id, marked))
+    await session.commit()
+    return {"marked": marked, "unread": (await session.execute(*crud.unread_count_statement(current_user.id))).scalar_one()}
+
+
+@router.get("/me/dashboard", response_model=DashboardResponse)
+async def my_dashboard(
+    request: Request,
+    params: DashboardParams = Depends(),
+    session=Depends(get_async_session),
+    current_user: UserPrincipal = Depends(get_current_user_async),
+):
+    version = (await session.execute(*crud.data_version_statement(current_user.id))).scalar_one()
+    etag = dashboard_etag(current_user.id, version, params)
+    short_circuit = not_modified_or_cached(request, etag)
+    if short_circuit is not None:
+        return short_circuit
+    t_stmt, n_stmt = crud.dashboard_statements(current_user.id, params.todo_limit, params.notification_limit)
+    todos = (await session.execute(*t_stmt)).all()
+    notifications = (await session.execute(*n_stmt)).all()
+    return render_dashboard(etag, todos, notifications)
+
+
+# ----------------------------
+# Todos
+# ----------------------------
+@router.post("/todos/", response_model=TodoRead, status_code=status.HTTP_201_CREATED)
+async def create_todo(todo_in: TodoCreate, session=Depends(get_async_session), current_user: UserPrincipal = Depends(get_current_user_async)):
+    if (await session.execute(*crud.duplicate_title_statement(current_user.id, todo_in.title))).first():
+        raise HTTPException(status_code=400, detail="You already have a todo with this title.")
+    return await commit_todo_async(session, crud.new_todo(todo_in, current_user.id))
+
+
+@router.get("/todos/", response_model=TodoPage)
+async def list_todos(
+    params: TodoListParams = Depends(),
+    session=Depends(get_async_session),
+    current_user: UserPrincipal = Depends(get_current_user_async),
+):
+    statement = crud.todo_list_statement(current_user.id, params)
+    return ORJSONResponse(crud.page_of((await session.execute(*statement)).all(), params))
+
+
+@router.get("/todos/search", response_model=TodoPage)
+async def search_todos(
+    params: TodoSearchParams = Depends(),
+    session=Depends(get_async_session),
+    current_user: UserPrincipal = Depends(get_current_user_async),
+):
+    hits = (await session.execute(*search_statement(session.bind.dialect.name, current_user.id, params))).all()
+    todos = (await session.execute(*todos_by_ids(current_user.id, [hit.id for hit in hits]))).all() if hits else []
+    return ORJSONResponse(search_page(hits, todos, params))
+
+
+@router.get("/todos/{todo_id}", response_model=TodoRead)
+async def get_todo(todo_id: int, session=Depends(get_async_session), current_user: UserPrincipal = Depends(get_current_user_async)):
+    return await get_owned_todo(session, todo_id, current_user)
+
+
+@router.patch("/todos/{todo_id}", response_model=TodoRead)
+async def partial_update(todo_id: int, todo_in: TodoUpdate, session=Depends(get_async_session), current_user: UserPrincipal = Depends(get_current_user_async)):
+    todo = await get_owned_todo(session, todo_id, current_user)
+    return await commit_todo_async(session, crud.apply_partial_update(todo, todo_in))
+
+
+@router.put("/todos/{todo_id}", response_model=TodoRead)
+async def replace_todo(todo_id: int, todo_in: TodoCreate, session=Depends(get_async_session), current_user: UserPrincipal = Depends(get_current_user_async)):
+    todo = await get_owned_todo(session, todo_id, current_user)
+    return await commit_todo_async(session, crud.apply_replace(todo, todo_in))
+
+
+@router.delete("/todos/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_todo(todo_id: int, session=Depends(get_async_session), current_user: UserPrincipal = Depends(get_current_user_async)):
+    todo = await get_owned_todo(session, todo_id, current_user)
+    counts = crud.counts_change(crud.counts_of(todo), crud.NO_COUNTS)
+    change_seq = (await session.execute(*crud.touch_user(current_user.id, counts))).scalar_one()
+    await session.execute(*crud.tombstones(current_user.id, [todo.id], change_seq, datetime.now()))
+    await session.delete(todo)
+    await session.commit()
+    return None
@@ -1,36 +1,161 @@
+import os
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from passlib.context import CryptContext
+from sqlalchemy import bindparam
 from sqlmodel import Session, select
 
-from app.database import get_session
-from app.models import User
+from app.cache import TTLCache
+from app.database import engine, get_async_session, get_session
+from app.hashing import HashingOverloaded, hash_pool
+from app.models import User, UserPrincipal
+from app.ratelimit import AttemptLimiter, first_retry_after
 
 # IMPORTANT: change this in production to an environment variable with a strong random value
 SECRET_KEY = "CHANGE_THIS_TO_A_SECURE_RANDOM_STRING"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Decoded tokens -> UserPrincipal, so repeat requests with the same token skip the JWT decode.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+# Each worker has its own cache and invalidate_user() only clears this one, so a
+# cached user is re-checked (a primary-key lookup) once every this many seconds:
+# a user deleted or demoted through another worker loses access within it.
+USER_CACHE_REVALIDATE_SECONDS = float(os.getenv("USER_CACHE_REVALIDATE_SECONDS", "5"))
+# When enabled, a cache miss builds the principal from the token's uid/adm claims
+# without any query. Deleted users are then only rejected by workers that saw
+# invalidate_user(); leave off unless tokens are short-lived.
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "0") == "1"
+
+# argon2 cost parameters. Changing them makes password_context().needs_update() true for
+# older hashes, which are then re-hashed transparently on the user's next login.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+# Login/registration throttling, checked before any hashing (0 disables a limit).
+# Only failed logins count: per username from one IP (so a stranger can't lock
+# the real user out) and per IP (so a NAT's successful logins aren't capped).
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+LOGIN_MAX_FAILURES_PER_USER = int(os.getenv("LOGIN_MAX_FAILURES_PER_USER", "5"))
+# LOGIN_MAX_ATTEMPTS_PER_IP is the older name of this setting
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "50")))
+
+@lru_cache(maxsize=None)
+def password_context():
+    """
+    The passlib context, built on first use. Importing passlib and its argon2
+    handler is a good part of app.main's import time, and processes that never
+    hash (dispatchers, migrations, scripts) shouldn't pay for it.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__time_cost=ARGON2_TIME_COST,
+        argon2__memory_cost=ARGON2_MEMORY_COST,
+        argon2__parallelism=ARGON2_PARALLELISM,
+    )
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
+user_failures = AttemptLimiter(LOGIN_MAX_FAILURES_PER_USER, LOGIN_WINDOW_SECONDS)
+ip_failures = AttemptLimiter(LOGIN_MAX_FAILURES_PER_IP, LOGIN_WINDOW_SECONDS)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _in_hash_pool(password_context().hash, password)
+
+# -------------------------------
+# Hashing through the bounded pool (app/hashing.py)
+# -------------------------------
+def _overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins in progress, try again shortly.",
+        headers={"Retry-After": "1"},
+    )
+
+def _in_hash_pool(fn, *args):
+    try:
+        return hash_pool.run(fn, *args)
+    except HashingOverloaded:
+        raise _overloaded()
+
+async def _in_hash_pool_async(fn, *args):
+    try:
+        return await hash_pool.run_async(fn, *args)
+    except HashingOverloaded:
+        raise _overloaded()
+
+def _user_key(username: str, client_ip: Optional[str]) -> str:
+    return f"user:{username}|ip:{client_ip}"
+
+def check_login_throttle(username: Optional[str], client_ip: Optional[str]) -> None:
+    """
+    Raise 429 (with Retry-After) if this username failed too often from this IP,
+    or this IP failed too often in the current window. Counts nothing itself;
+    record_login_result does.
+    """
+    checks = [(ip_failures, f"ip:{client_ip}")]
+    if username:
+        checks.append((user_failures, _user_key(username, client_ip)))
+    wait = first_retry_after(checks)
+    if wait is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, try again later.",
+            headers={"Retry-After": str(wait)},
+        )
+
+def record_login_result(username: str, client_ip: Optional[str], ok: bool) -> None:
+    if ok:
+        user_failures.reset(_user_key(username, client_ip))
+    else:
+        user_failures.hit(_user_key(username, client_ip))
+        ip_failures.hit(f"ip:{client_ip}")
 
 def authenticate_user_db(session: Session, username: str, password: str):
     user = session.exec(select(User).where(User.username == username)).first()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = _in_hash_pool(password_context().verify_and_update, password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        # cost parameters changed since this hash was made: store the upgraded hash
+        user.hashed_password = new_hash
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+    return user
+
+async def authenticate_user_async(session, username: str, password: str):
+    """
+    Async variant of authenticate_user_db. Verification runs in the hashing
+    pool, so neither the event loop nor a threadpool thread waits on argon2.
+    """
+    user = (await session.exec(select(User).where(User.username == username))).first()
+    if not user:
+        return None
+    valid, new_hash = await _in_hash_pool_async(password_context().verify_and_update, password, user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
     return user
 
 # -------------------------------
@@ -42,34 +167,179 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     Automatically sets the expiration time.
     """
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> User:
-    credentials_exception = HTTPException(
+def create_user_access_token(user: User) -> str:
+    """
+    Token for a logged-in user. Besides the username (sub) it carries the user id (uid)
+    and admin flag (adm) so a cache miss can look the user up by primary key.
+    """
+    return create_access_token(data={"sub": user.username, "uid": user.id, "adm": bool(user.is_admin)})
+
+# -------------------------------
+# Authenticated user cache
+# -------------------------------
+user_cache = TTLCache(maxsize=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL_SECONDS)
+# user id -> True while the user's row was checked less than USER_CACHE_REVALIDATE_SECONDS ago
+user_checked = TTLCache(maxsize=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_REVALIDATE_SECONDS)
+_USER_CHECK = select(User.username, User.is_admin).where(User.id == bindparam("user_id"))
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Forget every cached token of a user in this worker. Call this when a user is
+    deleted or their admin status changes so the next request re-reads the
+    database; other workers notice on their next revalidation.
+    """
+    user_cache.discard_where(lambda principal: principal.id == user_id)
+    user_checked.pop(user_id)
+
+def auth_cache_stats() -> dict:
+    return user_cache.stats()
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str) -> dict:
     """
-    Decode the JWT token and return the current user.
-    Raises an exception if token is invalid or expired.
+    Decode and validate a JWT. Raises 401 if it is invalid, expired or has no subject.
     """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: Optional[str] = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    statement = select(User).where(User.username == username)
-    user = session.exec(statement).first()
-    if user is None:
-        raise credentials_exception
-    return user
+        raise credentials_exception()
+    if payload.get("sub") is None:
+        raise credentials_exception()
+    return payload
+
+def token_subject(token: str) -> Optional[str]:
+    """
+    Username a bearer token belongs to, for the rate limiter (app/ratelimit.py):
+    from the principal cache when get_current_user has seen the token, else from
+    the verified JWT. None if the token is invalid.
+    """
+    principal = user_cache.peek(token)
+    if principal is not None:
+        return principal.username
+    try:
+        return decode_token(token)["sub"]
+    except HTTPException:
+        return None
+
+def _principal_from_claims(payload: dict) -> Optional[UserPrincipal]:
+    if AUTH_TRUST_TOKEN_CLAIMS and payload.get("uid") is not None:
+        return UserPrincipal(id=payload["uid"], username=payload["sub"], is_admin=bool(payload.get("adm")))
+    return None
+
+def _principal_from_user(payload: dict, user: Optional[User]) -> UserPrincipal:
+    # a uid that now belongs to another username means the token is stale
+    if user is None or user.username != payload["sub"]:
+        raise credentials_exception()
+    user_checked.set(user.id, True)
+    return UserPrincipal(id=user.id, username=user.username, is_admin=user.is_admin)
+
+def _needs_check(principal: UserPrincipal) -> bool:
+    return not AUTH_TRUST_TOKEN_CLAIMS and user_checked.get(principal.id) is None
+
+def _revalidated(token: str, principal: UserPrincipal, row) -> UserPrincipal:
+    """A cached principal after re-reading its user's (username, is_admin) row; 401 if the user is gone."""
+    if row is None or row.username != principal.username:
+        user_cache.pop(token)
+        raise credentials_exception()
+    if row.is_admin != principal.is_admin:
+        # the next request rebuilds the cache entry from the token
+        user_cache.pop(token)
+        principal = UserPrincipal(id=principal.id, username=principal.username, is_admin=row.is_admin)
+    user_checked.set(principal.id, True)
+    return principal
+
+def _user_statement(payload: dict):
+    if payload.get("uid") is not None:
+        return select(User).where(User.id == payload["uid"])
+    # tokens issued before uid was added only carry the username
+    return select(User).where(User.username == payload["sub"])
+
+def _cache_principal(token: str, payload: dict, principal: UserPrincipal) -> UserPrincipal:
+    user_cache.set(token, principal, ttl=payload["exp"] - time.time() if "exp" in payload else None)
+    return principal
+
+def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> UserPrincipal:
+    """
+    Decode the JWT token and return the current user.
+    Raises an exception if token is invalid or expired.
+    Results are cached per token (until the token expires or USER_CACHE_TTL_SECONDS),
+    and the user's row is re-checked every USER_CACHE_REVALIDATE_SECONDS.
+    """
+    principal = user_cache.get(token)
+    if principal is not None:
+        if _needs_check(principal):
+            principal = _revalidated(token, principal, session.execute(_USER_CHECK, {"user_id": principal.id}).first())
+        return principal
+    payload = decode_token(token)
+    principal = _principal_from_claims(payload)
+    if principal is None:
+        principal = _principal_from_user(payload, session.exec(_user_statement(payload)).first())
+    return _cache_principal(token, payload, principal)
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), session=Depends(get_async_session)) -> UserPrincipal:
+    """Same as get_current_user, for handlers running on the async engine."""
+    principal = user_cache.get(token)
+    if principal is not None:
+        if _needs_check(principal):
+            principal = _revalidated(token, principal, (await session.execute(_USER_CHECK, {"user_id": principal.id})).first())
+        return principal
+    payload = decode_token(token)
+    principal = _principal_from_claims(payload)
+    if principal is None:
+        principal = _principal_from_user(payload, (await session.exec(_user_statement(payload))).first())
+    return _cache_principal(token, payload, principal)
+
+def _load_user(payload: dict) -> Optional[User]:
+    with Session(engine) as session:
+        return session.exec(_user_statement(payload)).first()
+
+def _check_user(user_id: int):
+    with Session(engine) as session:
+        return session.execute(_USER_CHECK, {"user_id": user_id}).first()
+
+async def get_stream_user(request: Request, token: Optional[str] = None) -> UserPrincipal:
+    """
+    Auth for long-lived push streams. Browsers' EventSource can't send headers,
+    so the JWT may also be passed as ?token=. Unlike get_current_user this does not
+    hold a database session (and pool connection) open for the life of the stream.
+    """
+    if token is None:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise credentials_exception()
+    return await _sessionless_principal(token)
+
+async def get_current_user_sessionless(token: str = Depends(oauth2_scheme)) -> UserPrincipal:
+    """
+    get_current_user for endpoints that stream a request or response body: the
+    user is loaded in a short session of its own instead of a get_session one
+    that would keep its pool connection until the stream ends.
+    """
+    return await _sessionless_principal(token)
+
+async def _sessionless_principal(token: str) -> UserPrincipal:
+    principal = user_cache.get(token)
+    if principal is not None:
+        if _needs_check(principal):
+            principal = _revalidated(token, principal, await run_in_threadpool(_check_user, principal.id))
+        return principal
+    payload = decode_token(token)
+    principal = _principal_from_claims(payload)
+    if principal is None:
+        principal = _principal_from_user(payload, await run_in_threadpool(_load_user, payload))
+    return _cache_principal(token, payload, principal)
 
-def get_current_admin(current_user: User = Depends(get_current_user)):
+def get_current_admin(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
     """
     Raises 403 if current_user is not admin.
     Use this as: current_admin: User = Depends(get_current_admin)
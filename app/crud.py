@@ -0,0 +1,598 @@
+import os
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Integer, bindparam, case, delete, false, func, insert, inspect, literal, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.events import broker, make_event, publish_safely
+from app.models import Notification, NotificationRead, NotificationReadRequest, Todo, TodoBatchOperation, TodoBatchResult, TodoCreate, TodoRead, TodoTombstone, TodoUpdate, User
+from app.pagination import NotificationListParams, TodoListParams, build_page, keyset_paginate, keyset_params
+from app.recurrence import next_occurrence
+from app.responses import read_columns, rows_as_dicts
+
+# -------------------------
+# Query builders and model helpers shared by the sync routers (app/routers/)
+# and the async endpoints (app/async_api.py). The builders don't touch a
+# session, so both can execute the same statements.
+# -------------------------
+# Per-request statements are built once and reused: every value that varies
+# per request is a bind parameter, and a builder returns the shared statement
+# plus its parameters as a BoundStatement (run it with session.execute(*bound)).
+# Statements whose SQL depends on the request (filters, sort, cursor) are
+# built once per shape by an lru_cache'd function. Reusing the statement
+# object also reuses its memoized cache key, so SQLAlchemy's compiled cache is
+# hit without rebuilding and re-hashing the select on every request
+# (benchmarks/bench_statements.py).
+
+
+class BoundStatement(NamedTuple):
+    statement: Any
+    params: Any  # a dict, or a list of dicts for executemany
+
+
+# list/search/dashboard queries select only what TodoRead / NotificationRead return
+TODO_READ_COLUMNS = read_columns(Todo, TodoRead)
+NOTIFICATION_READ_COLUMNS = read_columns(Notification, NotificationRead)
+
+
+@lru_cache(maxsize=None)
+def _todo_list_shape(field: str, descending: bool, filters: Tuple[str, ...], with_cursor: bool):
+    statement = select(*TODO_READ_COLUMNS).where(Todo.owner_id == bindparam("owner_id"))
+    if "completed" in filters:
+        statement = statement.where(Todo.completed == bindparam("completed"))
+    if "due_after" in filters:
+        statement = statement.where(Todo.due_date >= bindparam("due_after"))
+    if "due_before" in filters:
+        statement = statement.where(Todo.due_date <= bindparam("due_before"))
+    if "has_reminder" in filters:
+        statement = statement.where(Todo.reminder_at != None)
+    if "no_reminder" in filters:
+        statement = statement.where(Todo.reminder_at == None)
+    return keyset_paginate(statement, getattr(Todo, field), Todo.id, descending, with_cursor)
+
+
+def todo_list_statement(owner_id: int, params: TodoListParams) -> BoundStatement:
+    values = {"owner_id": owner_id, **keyset_params(params.sort, params.cursor, params.limit)}
+    filters = []
+    for name in ("completed", "due_after", "due_before"):
+        if getattr(params, name) is not None:
+            filters.append(name)
+            values[name] = getattr(params, name)
+    if params.has_reminder is not None:
+        filters.append("has_reminder" if params.has_reminder else "no_reminder")
+    statement = _todo_list_shape(params.field, params.descending, tuple(filters), "cursor_id" in values)
+    return BoundStatement(statement, values)
+
+
+@lru_cache(maxsize=None)
+def _notification_list_shape(field: str, descending: bool, unread: Optional[bool], with_cursor: bool):
+    statement = select(*NOTIFICATION_READ_COLUMNS).where(Notification.user_id == bindparam("user_id"))
+    if unread is not None:
+        statement = statement.where(Notification.read_at == None if unread else Notification.read_at != None)
+    return keyset_paginate(statement, getattr(Notification, field), Notification.id, descending, with_cursor)
+
+
+def notification_list_statement(user_id: int, params: NotificationListParams) -> BoundStatement:
+    values = {"user_id": user_id, **keyset_params(params.sort, params.cursor, params.limit)}
+    statement = _notification_list_shape(params.field, params.descending, params.unread, "cursor_id" in values)
+    return BoundStatement(statement, values)
+
+
+def page_of(rows, params) -> dict:
+    page = build_page(rows, params.sort, params.field, params.limit)
+    page["items"] = rows_as_dicts(page["items"])
+    return page
+
+
+_DASHBOARD_TODOS = (
+    select(*TODO_READ_COLUMNS)
+    .where(Todo.owner_id == bindparam("user_id"))
+    .order_by(Todo.updated_at.desc(), Todo.id.desc())
+    .limit(bindparam("limit"))
+)
+_DASHBOARD_NOTIFICATIONS = (
+    select(*NOTIFICATION_READ_COLUMNS)
+    .where(Notification.user_id == bindparam("user_id"))
+    .order_by(Notification.created_at.desc(), Notification.id.desc())
+    .limit(bindparam("limit"))
+)
+
+
+def dashboard_statements(user_id: int, todo_limit: int, notification_limit: int) -> Tuple[BoundStatement, BoundStatement]:
+    """(todos, notifications) statements for /me/dashboard: the most recent items only."""
+    return (
+        BoundStatement(_DASHBOARD_TODOS, {"user_id": user_id, "limit": todo_limit}),
+        BoundStatement(_DASHBOARD_NOTIFICATIONS, {"user_id": user_id, "limit": notification_limit}),
+    )
+
+
+_DATA_VERSION = select(User.data_version).where(User.id == bindparam("user_id"))
+
+
+def data_version_statement(user_id: int) -> BoundStatement:
+    return BoundStatement(_DATA_VERSION, {"user_id": user_id})
+
+
+class TodoCounts(NamedTuple):
+    """A todo's share of its owner's todo counters (GET /me/stats), or a change to them."""
+    todos: int = 0
+    completed: int = 0
+    reminders: int = 0  # reminder set and not sent yet
+
+
+NO_COUNTS = TodoCounts()
+# user columns holding the TodoCounts fields, in order
+_COUNTER_COLUMNS = ("todo_count", "completed_count", "reminder_count")
+
+
+def todo_counts(completed: bool, reminder_at: Optional[datetime], notified: bool) -> TodoCounts:
+    return TodoCounts(1, int(bool(completed)), int(reminder_at is not None and not notified))
+
+
+def counts_of(todo) -> TodoCounts:
+    return todo_counts(todo.completed, todo.reminder_at, todo.notified)
+
+
+def counts_change(before: TodoCounts, after: TodoCounts) -> TodoCounts:
+    return TodoCounts(*(a - b for a, b in zip(after, before)))
+
+
+def sum_counts(changes: Iterable[TodoCounts]) -> TodoCounts:
+    return TodoCounts(*(sum(column) for column in zip(*changes)))
+
+
+def pending_counts_change(todo: Todo) -> TodoCounts:
+    """Counter change of a todo added to or modified in the session, from its attribute history; call it before flushing."""
+    state = inspect(todo)
+    if not state.persistent:
+        return counts_of(todo)
+
+    def before(name: str):
+        replaced = state.attrs[name].history.deleted
+        return replaced[0] if replaced else getattr(todo, name)
+
+    return counts_change(todo_counts(before("completed"), before("reminder_at"), before("notified")), counts_of(todo))
+
+
+def _counter_values(counts: TodoCounts) -> dict:
+    return {
+        name: getattr(User, name) + delta
+        for name, delta in zip(_COUNTER_COLUMNS, counts)
+        if not isinstance(delta, int) or delta
+    }
+
+
+def bump_data_version(*conditions, unread_delta: int = 0, counts: TodoCounts = NO_COUNTS):
+    """
+    UPDATE statement bumping user.data_version for the users matching conditions.
+    Run it in the same transaction as any todo/notification write so cached
+    dashboards and ETags for those users become stale.
+    unread_delta and counts adjust the unread-notification and todo counters in
+    the same statement (ints, or bind-parameter expressions for statements built once).
+    """
+    values = {"data_version": User.data_version + 1, **_counter_values(counts)}
+    if not isinstance(unread_delta, int) or unread_delta:
+        unread = User.unread_notifications + unread_delta
+        values["unread_notifications"] = case((unread < 0, 0), else_=unread)
+    return update(User).where(*conditions).values(**values).execution_options(synchronize_session=False)
+
+
+_COUNT_PARAMS = TodoCounts(*(bindparam(f"d_{name}", type_=Integer) for name in TodoCounts._fields))
+_TOUCH_USER = bump_data_version(User.id == bindparam("user_id"), counts=_COUNT_PARAMS).returning(User.data_version)
+_ADD_COUNTS = update(User).where(User.id == bindparam("user_id")).values(**_counter_values(_COUNT_PARAMS))
+
+
+def _counts_params(user_id: int, counts: TodoCounts) -> dict:
+    return {"user_id": user_id, **{f"d_{name}": delta for name, delta in counts._asdict().items()}}
+
+
+def touch_user(user_id: int, counts: TodoCounts = NO_COUNTS) -> BoundStatement:
+    """
+    Bump one user's data_version and add `counts` to their todo counters; the
+    result's scalar_one() is the new version. It is the change_seq of every todo
+    written or deleted in this transaction (see app/sync.py), so bump before
+    writing the rows.
+    """
+    return BoundStatement(_TOUCH_USER, _counts_params(user_id, counts))
+
+
+def add_counts(user_id: int, counts: TodoCounts) -> BoundStatement:
+    """Add `counts` to one user's todo counters, for writes that only know them after touch_user."""
+    return BoundStatement(_ADD_COUNTS, _counts_params(user_id, counts))
+
+
+# change_seq = the owner's data_version, for writes that bump several owners at once
+_OWNER_DATA_VERSION = select(User.data_version).where(User.id == Todo.owner_id).scalar_subquery()
+
+
+def stamp_changes(*conditions):
+    """UPDATE giving the matched todos their owner's current data_version as change_seq; run it after bump_data_version."""
+    return update(Todo).where(*conditions).values(change_seq=_OWNER_DATA_VERSION).execution_options(synchronize_session=False)
+
+
+def tombstones(owner_id: int, todo_ids: List[int], change_seq: int, now: datetime) -> BoundStatement:
+    """INSERT of the tombstones for deleted todos (GET /todos/changes reports them)."""
+    rows = [{"todo_id": todo_id, "owner_id": owner_id, "change_seq": change_seq, "deleted_at": now} for todo_id in todo_ids]
+    return BoundStatement(insert(TodoTombstone), rows)
+
+
+_UNREAD_COUNT = select(User.unread_notifications).where(User.id == bindparam("user_id"))
+
+
+def unread_count_statement(user_id: int) -> BoundStatement:
+    """GET /notifications/unread-count: the maintained counter, a primary-key lookup instead of COUNT(*)."""
+    return BoundStatement(_UNREAD_COUNT, {"user_id": user_id})
+
+
+@lru_cache(maxsize=None)
+def _mark_read_shape(by_ids: bool, up_to_id: bool):
+    # bind parameters of an UPDATE can't share a name with the table's columns
+    statement = update(Notification).where(Notification.user_id == bindparam("owner"), Notification.read_at == None)
+    if by_ids:
+        statement = statement.where(Notification.id.in_(bindparam("ids", expanding=True)))
+    if up_to_id:
+        statement = statement.where(Notification.id <= bindparam("up_to_id"))
+    return statement.values(read_at=bindparam("now")).execution_options(synchronize_session=False)
+
+
+def mark_read_statement(user_id: int, body: NotificationReadRequest, now: datetime) -> BoundStatement:
+    """
+    UPDATE flipping the selected unread notifications to read. Only rows that were
+    unread match, so the rowcount is exactly how much the unread counter drops,
+    even when two requests mark the same notifications at once.
+    """
+    values = {"owner": user_id, "now": now}
+    by_ids = not body.all and body.ids is not None
+    up_to_id = not body.all and body.up_to_id is not None
+    if by_ids:
+        values["ids"] = body.ids
+    if up_to_id:
+        values["up_to_id"] = body.up_to_id
+    return BoundStatement(_mark_read_shape(by_ids, up_to_id), values)
+
+
+_NOTIFICATIONS_READ = bump_data_version(User.id == bindparam("user_id"), unread_delta=-bindparam("marked", type_=Integer))
+
+
+def notifications_read(user_id: int, marked: int) -> BoundStatement:
+    """Counter/version update to run after mark_read_statement (same transaction)."""
+    return BoundStatement(_NOTIFICATIONS_READ, {"user_id": user_id, "marked": marked})
+
+
+_DUPLICATE_TITLE = select(Todo.id).where(Todo.owner_id == bindparam("owner_id"), Todo.title == bindparam("title"))
+
+
+def is_duplicate_title(error: IntegrityError) -> bool:
+    """
+    True if `error` is a violation of uq_todo_owner_title. Postgres names the
+    index in the message; SQLite names its columns.
+    """
+    message = str(error.orig)
+    return "uq_todo_owner_title" in message or "todo.owner_id, todo.title" in message
+
+
+def duplicate_title_statement(owner_id: int, title: str) -> BoundStatement:
+    return BoundStatement(_DUPLICATE_TITLE, {"owner_id": owner_id, "title": title})
+
+
+def recurrence_values(changes: dict, now: datetime) -> dict:
+    """
+    Setting a recurrence rule (re)arms the reminder: at the reminder_at sent
+    with it, else at the rule's first occurrence after now.
+    """
+    rule = changes.get("recurrence")
+    if not rule:
+        return {}
+    return {"reminder_at": changes.get("reminder_at") or next_occurrence(rule, None, now), "notified": False}
+
+
+def new_todo(todo_in: TodoCreate, owner_id: int, change_seq: int = 0) -> Todo:
+    todo = Todo.model_validate(todo_in)
+    todo.owner_id = owner_id
+    todo.change_seq = change_seq
+    # optional explicit: set updated_at same as created_at now
+    todo.updated_at = datetime.now()
+    for k, v in recurrence_values(todo_in.model_dump(), todo.updated_at).items():
+        setattr(todo, k, v)
+    return todo
+
+
+def apply_partial_update(todo: Todo, todo_in: TodoUpdate) -> Todo:
+    now = datetime.now()
+    data = todo_in.model_dump(exclude_unset=True)  # only the fields the client actually sent
+    data.update(recurrence_values(data, now))
+    for k, v in data.items():
+        setattr(todo, k, v)
+    todo.updated_at = now
+    return todo
+
+
+def apply_replace(todo: Todo, todo_in: TodoCreate) -> Todo:
+    todo.title = todo_in.title
+    todo.description = todo_in.description
+    todo.completed = todo_in.completed
+    todo.due_date = todo_in.due_date
+    todo.reminder_at = todo_in.reminder_at
+    todo.recurrence = todo_in.recurrence
+    todo.updated_at = datetime.now()
+    for k, v in recurrence_values(todo_in.model_dump(), todo.updated_at).items():
+        setattr(todo, k, v)
+    return todo
+
+
+# -------------------------
+# Session operations used by the sync routers (app/routers/)
+# -------------------------
+# app/async_api.py awaits the same statements itself. Nothing here commits;
+# the caller does.
+
+_USERNAME_TAKEN = select(User.id).where(User.username == bindparam("username"))
+_USER_LIST = select(User.id, User.username, User.is_admin).order_by(User.id)
+
+
+def username_taken(session: Session, username: str) -> bool:
+    return session.execute(_USERNAME_TAKEN, {"username": username}).first() is not None
+
+
+def create_user(session: Session, username: str, hashed_password: str, is_admin: bool) -> User:
+    user = User(username=username, hashed_password=hashed_password, is_admin=is_admin)
+    session.add(user)
+    session.flush()
+    return user
+
+
+def list_users(session: Session) -> List[dict]:
+    return [dict(row._mapping) for row in session.execute(_USER_LIST)]
+
+
+def list_todos(session: Session, owner_id: int, params: TodoListParams) -> dict:
+    return page_of(session.execute(*todo_list_statement(owner_id, params)).all(), params)
+
+
+def title_taken(session: Session, owner_id: int, title: str) -> bool:
+    return session.execute(*duplicate_title_statement(owner_id, title)).first() is not None
+
+
+def get_owned_todo(session: Session, todo_id: int, owner_id: int) -> Optional[Todo]:
+    """The todo if it exists and belongs to owner_id (a primary-key lookup), else None."""
+    todo = session.get(Todo, todo_id)
+    return todo if todo is not None and todo.owner_id == owner_id else None
+
+
+def delete_todo(session: Session, todo: Todo) -> None:
+    change_seq = session.execute(*touch_user(todo.owner_id, counts_change(counts_of(todo), NO_COUNTS))).scalar_one()
+    session.execute(*tombstones(todo.owner_id, [todo.id], change_seq, datetime.now()))
+    session.delete(todo)
+
+
+def list_notifications(session: Session, user_id: int, params: NotificationListParams) -> dict:
+    return page_of(session.execute(*notification_list_statement(user_id, params)).all(), params)
+
+
+def unread_count(session: Session, user_id: int) -> int:
+    return session.execute(*unread_count_statement(user_id)).scalar_one()
+
+
+def mark_notifications_read(session: Session, user_id: int, body: NotificationReadRequest) -> int:
+    """Mark the selected notifications read and adjust the counter; returns how many changed."""
+    marked = session.execute(*mark_read_statement(user_id, body, datetime.now())).rowcount
+    if marked:
+        session.execute(*notifications_read(user_id, marked))
+    return marked
+
+
+def data_version(session: Session, user_id: int) -> int:
+    return session.execute(*data_version_statement(user_id)).scalar_one()
+
+
+def dashboard_rows(session: Session, user_id: int, todo_limit: int, notification_limit: int):
+    """(todo rows, notification rows) for render_dashboard."""
+    todos, notifications = dashboard_statements(user_id, todo_limit, notification_limit)
+    return session.execute(*todos).all(), session.execute(*notifications).all()
+
+
+# -------------------------
+# Batch operations (POST /todos/batch)
+# -------------------------
+BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", "10000"))
+# keep IN (...) lists well under the bound-parameter limits of SQLite/Postgres
+IN_CLAUSE_CHUNK = 5000
+
+
+def chunked(items: list, size: int = IN_CLAUSE_CHUNK) -> Iterable[list]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def apply_todo_batch(session: Session, owner_id: int, operations: List[TodoBatchOperation]) -> List[TodoBatchResult]:
+    """
+    Validate and apply a list of create/update/complete/delete operations for one owner.
+
+    Validation needs one query for the targeted ids and one for the titles being
+    claimed; every valid operation is then written with one bulk statement per
+    kind (DELETE, UPDATE by primary key, UPDATE ... IN, INSERT ... RETURNING) in a
+    single transaction. Invalid operations are reported and skipped, the rest still apply.
+    The caller commits.
+    """
+    results = [TodoBatchResult(index=i, op=op.op, ok=True, id=op.id) for i, op in enumerate(operations)]
+
+    def fail(i: int, error: str) -> None:
+        results[i].ok = False
+        results[i].error = error
+
+    # --- 1) existing todos referenced by id (one query) ---
+    target_ids = list({op.id for op in operations if op.op != "create" and op.id is not None})
+    owned = {}
+    for ids in chunked(target_ids):
+        rows = session.exec(select(Todo.id, Todo.title, Todo.completed, Todo.reminder_at, Todo.notified).where(Todo.owner_id == owner_id, Todo.id.in_(ids)))
+        owned.update((row.id, row) for row in rows)
+
+    seen_ids = set()
+    for i, op in enumerate(operations):
+        if op.op == "create":
+            if op.todo is None:
+                fail(i, "create needs a 'todo' object")
+            continue
+        if op.id is None:
+            fail(i, f"{op.op} needs an 'id'")
+        elif op.id not in owned:
+            fail(i, "Todo not found")
+        elif op.id in seen_ids:
+            fail(i, "Todo appears more than once in this batch")
+        elif op.op == "update" and op.changes is None:
+            fail(i, "update needs a 'changes' object")
+        else:
+            seen_ids.add(op.id)
+
+    # --- 2) duplicate-title rule, same as create_todo (one query) ---
+    def new_title(op: TodoBatchOperation):
+        if op.op == "create":
+            return op.todo.title
+        if op.op == "update" and "title" in op.changes.model_dump(exclude_unset=True):
+            return op.changes.title
+        return None
+
+    valid = [(i, op) for i, op in enumerate(operations) if results[i].ok]
+    claimed = list({t for _, op in valid if (t := new_title(op)) is not None})
+    taken = {}
+    for titles in chunked(claimed):
+        taken.update(session.exec(select(Todo.title, Todo.id).where(Todo.owner_id == owner_id, Todo.title.in_(titles))).all())
+    # titles freed by todos deleted or renamed in this batch can be reused
+    for _, op in valid:
+        if op.op == "delete" or (op.op == "update" and new_title(op) is not None):
+            if taken.get(owned[op.id].title) == op.id:
+                del taken[owned[op.id].title]
+    for i, op in valid:
+        title = new_title(op)
+        if title is None:
+            continue
+        holder = taken.get(title)
+        if holder is not None and holder != op.id:
+            fail(i, "You already have a todo with this title.")
+        else:
+            taken[title] = op.id if op.op != "create" else -1 - i
+
+    # --- 3) bulk writes ---
+    now = datetime.now()
+    ops_by_kind = {"create": [], "update": [], "complete": [], "delete": []}
+    for i, op in enumerate(operations):
+        if results[i].ok:
+            ops_by_kind[op.op].append((i, op))
+    if not any(r.ok for r in results):
+        return results
+
+    # counter changes, from the rows read in 1)
+    updates = []
+    for _, op in ops_by_kind["update"]:
+        changes = op.changes.model_dump(exclude_unset=True)
+        updates.append((op.id, {**changes, **recurrence_values(changes, now)}))
+    created = [new_todo(op.todo, owner_id) for _, op in ops_by_kind["create"]]
+    counts = [counts_change(counts_of(owned[op.id]), NO_COUNTS) for _, op in ops_by_kind["delete"]]
+    for todo_id, values in updates:
+        row = owned[todo_id]
+        after = todo_counts(*(values.get(name, getattr(row, name)) for name in ("completed", "reminder_at", "notified")))
+        counts.append(counts_change(counts_of(row), after))
+    for _, op in ops_by_kind["complete"]:
+        row = owned[op.id]
+        counts.append(counts_change(counts_of(row), todo_counts(True, row.reminder_at, row.notified)))
+    counts.extend(counts_of(todo) for todo in created)
+    # every row written below records this version as its change_seq
+    change_seq = session.execute(*touch_user(owner_id, sum_counts(counts))).scalar_one()
+
+    delete_ids = [op.id for _, op in ops_by_kind["delete"]]
+    for ids in chunked(delete_ids):
+        session.execute(*tombstones(owner_id, ids, change_seq, now))
+        session.execute(delete(Todo).where(Todo.owner_id == owner_id, Todo.id.in_(ids)).execution_options(synchronize_session=False))
+
+    if updates:
+        renamed = [todo_id for todo_id, values in updates if "title" in values]
+        if len(renamed) > 1:
+            # a rename may take the title another rename in this batch frees (a -> b, b -> c):
+            # park the renamed rows on unique placeholders first so row order doesn't matter
+            marker = uuid.uuid4().hex
+            session.execute(update(Todo), [{"id": todo_id, "title": f"~{marker} {todo_id}~"} for todo_id in renamed])
+        session.execute(update(Todo), [{"id": todo_id, **values, "updated_at": now, "change_seq": change_seq} for todo_id, values in updates])
+
+    complete_ids = [op.id for _, op in ops_by_kind["complete"]]
+    for ids in chunked(complete_ids):
+        session.execute(
+            update(Todo)
+            .where(Todo.owner_id == owner_id, Todo.id.in_(ids))
+            .values(completed=True, updated_at=now, change_seq=change_seq)
+            .execution_options(synchronize_session=False)
+        )
+
+    if created:
+        rows = [{**todo.model_dump(exclude={"id"}), "change_seq": change_seq} for todo in created]
+        new_ids = session.execute(insert(Todo).returning(Todo.id, sort_by_parameter_order=True), rows).scalars().all()
+        for (i, _), new_id in zip(ops_by_kind["create"], new_ids):
+            results[i].id = new_id
+    return results
+
+
+def batch_sets_reminder(operations: List[TodoBatchOperation]) -> bool:
+    """True if any operation creates or changes a reminder (the dispatcher should re-plan)."""
+    for op in operations:
+        if op.op == "create" and op.todo is not None and (op.todo.reminder_at is not None or op.todo.recurrence):
+            return True
+        if op.op == "update" and op.changes is not None and (op.changes.reminder_at is not None or op.changes.recurrence):
+            return True
+    return False
+
+
+# -------------------------
+# Admin: set-based user deletion and bulk notify
+# -------------------------
+# Number of user ids handled per INSERT ... SELECT transaction in notify_all_users
+BULK_NOTIFY_CHUNK = int(os.getenv("BULK_NOTIFY_CHUNK", "10000"))
+
+
+def delete_user_cascade(session: Session, user_id: int) -> bool:
+    """
+    Delete a user with their notifications and todos using three DELETE ... WHERE
+    statements (no rows are loaded). The FKs cascade too, but doing it explicitly
+    keeps databases that were never migrated working. The caller commits.
+    """
+    session.execute(delete(Notification).where(Notification.user_id == user_id).execution_options(synchronize_session=False))
+    session.execute(delete(Todo).where(Todo.owner_id == user_id).execution_options(synchronize_session=False))
+    result = session.execute(delete(User).where(User.id == user_id).execution_options(synchronize_session=False))
+    return result.rowcount > 0
+
+
+def max_user_id(session: Session) -> int:
+    """Upper bound of the user id range (an index lookup, unlike COUNT(*))."""
+    return session.exec(select(func.max(User.id))).one() or 0
+
+
+def notify_all_users(title: str, message: str, progress=None, chunk_size: int = BULK_NOTIFY_CHUNK) -> int:
+    """
+    Create one Notification per non-admin user with INSERT ... SELECT over
+    user-id ranges, one short transaction per range, so memory use doesn't
+    depend on the number of users. progress(done, total) is called after each range.
+    Connected users get one push event once every range is committed.
+    Returns the number of notifications created.
+    """
+    with Session(engine) as session:
+        last_id = max_user_id(session)
+    now = datetime.now()
+    created = 0
+    for start in range(0, last_id, chunk_size):
+        in_range = (User.is_admin == false(), User.id > start, User.id <= start + chunk_size)
+        rows = select(literal(title), literal(message), literal(now), User.id).where(*in_range)
+        with Session(engine) as session:
+            result = session.execute(
+                insert(Notification).from_select(["title", "message", "created_at", "user_id"], rows)
+            )
+            session.execute(bump_data_version(*in_range, unread_delta=1))
+            session.commit()
+        created += result.rowcount
+        if progress:
+            progress(min(start + chunk_size, last_id), last_id)
+    # one broadcast for the whole fan-out rather than an event per user
+    publish_safely(broker.broadcast, make_event("notification", {"title": title, "message": message, "todo_id": None, "created_at": now}))
+    return created
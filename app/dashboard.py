@@ -0,0 +1,65 @@
+import os
+from typing import Optional
+
+import orjson
+from fastapi import Query, Request, Response
+
+from app.cache import TTLCache
+from app.responses import rows_as_dicts
+
+# -------------------------
+# /me/dashboard conditional GET and response cache
+# -------------------------
+# Every todo/notification write bumps user.data_version (see crud.bump_data_version),
+# so (user, data_version, limits) identifies one exact dashboard body:
+#   - it is sent as a weak ETag; If-None-Match with the same tag gets a 304 after
+#     a single primary-key read of user.data_version
+#   - the serialized JSON is cached under the same key, so repeat polls from
+#     other devices skip the todo/notification queries too
+
+DASHBOARD_DEFAULT_LIMIT = 50
+DASHBOARD_MAX_LIMIT = 500
+DASHBOARD_CACHE_ENABLED = os.getenv("DASHBOARD_CACHE", "1") == "1"
+dashboard_cache = TTLCache(
+    maxsize=int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "2000")),
+    ttl=float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "300")),
+)
+
+
+class DashboardParams:
+    """?todo_limit=&notification_limit= -- how many of the most recent items to return."""
+
+    def __init__(
+        self,
+        todo_limit: int = Query(DASHBOARD_DEFAULT_LIMIT, ge=1, le=DASHBOARD_MAX_LIMIT),
+        notification_limit: int = Query(DASHBOARD_DEFAULT_LIMIT, ge=1, le=DASHBOARD_MAX_LIMIT),
+    ):
+        self.todo_limit = todo_limit
+        self.notification_limit = notification_limit
+
+
+def dashboard_etag(user_id: int, version: int, params: DashboardParams) -> str:
+    return f'W/"{user_id}.{version}.{params.todo_limit}.{params.notification_limit}"'
+
+
+def not_modified_or_cached(request: Request, etag: str) -> Optional[Response]:
+    """
+    304 if the client already has this version, the cached body if we have it,
+    otherwise None (the caller builds the dashboard and calls render_dashboard).
+    """
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers={"ETag": etag})
+    if DASHBOARD_CACHE_ENABLED:
+        body = dashboard_cache.get(etag)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers={"ETag": etag})
+    return None
+
+
+def render_dashboard(etag: str, todos, notifications) -> Response:
+    """todos / notifications are rows of crud.dashboard_statements() (DashboardResponse shape)."""
+    body = orjson.dumps({"todos": rows_as_dicts(todos), "notifications": rows_as_dicts(notifications)})
+    if DASHBOARD_CACHE_ENABLED:
+        dashboard_cache.set(etag, body)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from app.plugins import load_instance
+
+logger = logging.getLogger("todo_events")
+
+# -------------------------
+# Push events (pub/sub fan-out to open streams)
+# -------------------------
+# The reminder dispatcher and bulk notify publish an event after they commit;
+# every open GET /notifications/stream of the affected users receives it, so
+# clients no longer have to poll /notifications or /me/dashboard.
+#
+# Publishers run in worker threads (dispatcher, background jobs, sync handlers)
+# while subscribers wait on the event loop, so delivery goes through
+# loop.call_soon_threadsafe -- one call per loop per event, not per subscriber.
+#
+# LocalBroker only reaches streams held by this process. To share events
+# between several workers, subclass Broker so publish()/broadcast() send the
+# event through something shared (Redis pub/sub, Postgres LISTEN/NOTIFY, ...)
+# and call deliver()/deliver_all() in every worker when it arrives, then
+# point EVENT_BROKER at it ("package.module:ClassName").
+
+EVENT_BROKER = os.getenv("EVENT_BROKER", "app.events:LocalBroker")
+# events kept per stream while the client is slow; older ones are dropped
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+# idle streams get a comment line this often so proxies don't time them out
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+
+class Event(NamedTuple):
+    type: str
+    data: str  # JSON, serialized once per publish and shared by every subscriber
+
+
+def make_event(event_type: str, payload: dict) -> Event:
+    return Event(event_type, json.dumps({"type": event_type, **payload}, default=str, separators=(",", ":")))
+
+
+class Subscription:
+    """One open stream. Created and read on the event loop; filled from any thread."""
+
+    def __init__(self, user_id: int, is_admin: bool, loop: asyncio.AbstractEventLoop, max_queued: int = EVENT_QUEUE_SIZE):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(max_queued)
+        self.dropped = 0
+
+    def put(self, event: Event) -> None:
+        """Queue an event (event loop thread only); a full queue drops its oldest event."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        """Next event, or None if nothing arrived within timeout seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def _put_all(subscriptions: List[Subscription], event: Event) -> None:
+    for subscription in subscriptions:
+        subscription.put(event)
+
+
+class Broker:
+    """
+    Keeps this process's subscriptions and fans events out to them.
+    publish()/broadcast() are what publishers call; by default they deliver locally.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_user: Dict[int, Set[Subscription]] = defaultdict(set)
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, user_id: int, is_admin: bool = False) -> Subscription:
+        """Must be called from the event loop that will read the subscription."""
+        subscription = Subscription(user_id, is_admin, asyncio.get_running_loop())
+        with self._lock:
+            self._by_user[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._by_user.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._by_user[subscription.user_id]
+
+    def publish(self, user_ids: Iterable[int], event: Event) -> None:
+        """Send event to every stream of the given users (safe from any thread)."""
+        self.deliver(user_ids, event)
+
+    def broadcast(self, event: Event, include_admins: bool = False) -> None:
+        """Send event to every connected user (bulk notify skips admins, like its Notification rows)."""
+        self.deliver_all(event, include_admins)
+
+    def deliver(self, user_ids: Iterable[int], event: Event) -> None:
+        with self._lock:
+            targets = [s for user_id in set(user_ids) for s in self._by_user.get(user_id, ())]
+        self._dispatch(targets, event)
+
+    def deliver_all(self, event: Event, include_admins: bool = False) -> None:
+        with self._lock:
+            targets = [s for subs in self._by_user.values() for s in subs if include_admins or not s.is_admin]
+        self._dispatch(targets, event)
+
+    def _dispatch(self, targets: List[Subscription], event: Event) -> None:
+        by_loop: Dict[asyncio.AbstractEventLoop, List[Subscription]] = defaultdict(list)
+        for subscription in targets:
+            by_loop[subscription.loop].append(subscription)
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_put_all, subscriptions, event)
+            except RuntimeError:
+                # the loop was closed (server shutting down); nobody is listening any more
+                continue
+        with self._lock:
+            self.published += 1
+            self.delivered += len(targets)
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscriptions = [s for subs in self._by_user.values() for s in subs]
+            return {
+                "broker": type(self).__name__,
+                "connections": len(subscriptions),
+                "users": len(self._by_user),
+                "published": self.published,
+                "delivered": self.delivered,
+                "dropped": sum(s.dropped for s in subscriptions),
+            }
+
+
+class LocalBroker(Broker):
+    """In-process broker: events only reach streams held by this worker."""
+
+
+def load_broker(path: str = EVENT_BROKER) -> Broker:
+    return load_instance(path, Broker)
+
+
+broker = load_broker()
+
+
+def publish_safely(publish, *args) -> None:
+    """Push delivery is best effort: a broker error must never fail the write that triggered it."""
+    try:
+        publish(*args)
+    except Exception:
+        logger.exception("Publishing event failed")
+
+
+async def sse_stream(user_id: int, is_admin: bool = False, heartbeat: float = SSE_HEARTBEAT_SECONDS):
+    """
+    Body of a text/event-stream response. Starlette cancels the generator when
+    the client disconnects, which removes the subscription.
+    """
+    subscription = broker.subscribe(user_id, is_admin)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            event = await subscription.get(heartbeat)
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {event.type}\ndata: {event.data}\n\n"
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# -------------------------
+# Bounded worker pool for password hashing
+# -------------------------
+# argon2 is deliberately expensive (tens of ms of CPU and 64 MiB of memory per
+# call). Running it directly in request handlers lets a login burst occupy the
+# whole request threadpool. All hashing goes through this pool instead: at most
+# HASH_WORKERS hashes run at once, at most HASH_MAX_PENDING more may wait, and
+# anything beyond that is rejected immediately so the caller can answer 503.
+# (argon2-cffi releases the GIL, so threads give real parallelism here.)
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 4)))
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue is full."""
+
+
+class HashingPool:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        # running + queued calls
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+        self.completed = 0
+
+    def submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingOverloaded()
+        with self._lock:
+            self.in_flight += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def run(self, fn, *args):
+        """Run fn in the pool and wait for it (sync handlers)."""
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        """Run fn in the pool without holding an event-loop or threadpool thread (async handlers)."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+hash_pool = HashingPool()
@@ -0,0 +1,97 @@
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import delete, update
+from sqlmodel import Session
+
+from app.database import engine
+from app.metrics import job_duration
+from app.models import BackgroundJob
+
+logger = logging.getLogger("todo_jobs")
+
+# -------------------------
+# Background jobs with progress
+# -------------------------
+# Used for admin operations that can touch millions of rows (e.g. bulk notify):
+# the request returns a job id right away and the admin polls GET /admin/jobs/{id}.
+# The job runs in the executor of the worker that accepted it, but its state
+# is a BackgroundJob row, so the poll can land on any worker. A job whose
+# worker died stays "running". Finished jobs are pruned after JOB_RETENTION_HOURS.
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))
+
+
+def _save(job_id: str, **values) -> None:
+    with Session(engine) as session:
+        session.execute(update(BackgroundJob).where(BackgroundJob.id == job_id).values(**values))
+        session.commit()
+
+
+class Job:
+    """Handle passed to the job function; everything it reports is written to the job's row."""
+
+    def __init__(self, job_id: str, kind: str):
+        self.id = job_id
+        self.kind = kind
+
+    def progress(self, done: int, total: Optional[int] = None) -> None:
+        """Called by the job function as it works through its chunks."""
+        _save(self.id, done=done, **({"total": total} if total is not None else {}))
+
+
+def job_dict(job: BackgroundJob) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "done": job.done,
+        "total": job.total,
+        "percent": round(100 * job.done / job.total, 1) if job.total else None,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="todo-job")
+
+
+def submit_job(kind: str, fn: Callable[[Job], dict]) -> Job:
+    """
+    Run fn(job) in the background. fn reports progress through job.progress()
+    and returns a result dict.
+    """
+    job = Job(uuid.uuid4().hex, kind)
+    with Session(engine) as session:
+        cutoff = datetime.now() - timedelta(hours=JOB_RETENTION_HOURS)
+        session.execute(delete(BackgroundJob).where(BackgroundJob.finished_at < cutoff))
+        session.add(BackgroundJob(id=job.id, kind=kind))
+        session.commit()
+
+    def run():
+        _save(job.id, status="running")
+        started = time.perf_counter()
+        try:
+            result = fn(job)
+            _save(job.id, status="done", result=result, finished_at=datetime.now())
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, kind)
+            _save(job.id, status="failed", error=str(e), finished_at=datetime.now())
+        job_duration.observe(time.perf_counter() - started, kind)
+
+    _executor.submit(run)
+    return job
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    with Session(engine) as session:
+        job = session.get(BackgroundJob, job_id)
+        return job_dict(job) if job is not None else None
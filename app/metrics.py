@@ -0,0 +1,314 @@
+import bisect
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as TallyCounter
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("todo_metrics")
+
+# -------------------------
+# Request, query and job metrics (Prometheus text format on GET /metrics)
+# -------------------------
+# MetricsMiddleware times every request and labels it with the route template
+# (/todos/{todo_id}, not /todos/42) so label cardinality stays fixed.
+# instrument_engine() hooks SQLAlchemy's cursor events to count queries and DB
+# time; the counts are attributed to the current request through a contextvar
+# (sync handlers run in the threadpool with a copy of the context, so they see
+# the same RequestStats). A request that runs the same SQL text
+# N_PLUS_ONE_THRESHOLD or more times is counted and logged as a likely N+1.
+#
+# Everything is plain counters behind one lock per metric: a few microseconds
+# per request and per query. METRICS_ENABLED=0 turns all of it off.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+# Opt-in: sample the stacks of requests running longer than SLOW_REQUEST_SECONDS
+# and log where they spent their time.
+PROFILE_SLOW_REQUESTS = os.getenv("PROFILE_SLOW_REQUESTS", "0") == "1"
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.01"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class CounterMetric:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, k)} {v}" for k, v in items]
+        return lines
+
+
+class HistogramMetric:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self._values: Dict[Tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(label_values)
+            if row is None:
+                row = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            if slot < len(self.buckets):
+                row[slot] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        for key, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, key + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {row[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {row[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {row[-1]}")
+        return lines
+
+
+class Registry:
+    """
+    Metrics owned by this module plus collectors: callables returning
+    {name: (type, help, value)} read at scrape time (reminder, hashing, event stats).
+    """
+
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: List[Callable[[], dict]] = []
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> CounterMetric:
+        metric = CounterMetric(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple = LATENCY_BUCKETS) -> HistogramMetric:
+        metric = HistogramMetric(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect: Callable[[], dict]) -> None:
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collect in self._collectors:
+            try:
+                values = collect()
+            except Exception:
+                logger.exception("Metrics collector failed")
+                continue
+            for name, (kind, help_text, value) in values.items():
+                if value is None:
+                    continue
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {float(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_duration = registry.histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+db_queries = registry.counter("db_queries_total", "SQL statements executed.")
+db_duration = registry.histogram("db_query_duration_seconds", "SQL statement latency.")
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements per HTTP request.", ("route",), buckets=COUNT_BUCKETS
+)
+db_time_per_request = registry.histogram("db_time_per_request_seconds", "Time spent in SQL per HTTP request.", ("route",))
+n_plus_one = registry.counter("db_n_plus_one_total", "Requests that repeated one SQL statement N_PLUS_ONE_THRESHOLD+ times.", ("route",))
+job_duration = registry.histogram("job_duration_seconds", "Background job / scheduled run duration.", ("job",))
+
+
+# -------------------------
+# Per-request query accounting
+# -------------------------
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: TallyCounter = TallyCounter()
+
+
+_current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    db_queries.inc()
+    db_duration.observe(elapsed)
+    stats = _current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        stats.statements[statement] += 1
+
+
+def _handle_error(exception_context):
+    # a failed statement never reaches after_cursor_execute
+    started = exception_context.connection.info.get("query_started") if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine) -> None:
+    """Count queries and DB time on a sync engine (pass async_engine.sync_engine for async ones)."""
+    if not METRICS_ENABLED:
+        return
+    from sqlalchemy import event
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# -------------------------
+# Slow request profiler (opt-in)
+# -------------------------
+
+class SlowRequestProfiler:
+    """
+    While any request has been running for SLOW_REQUEST_SECONDS, a sampler thread
+    records the stacks of threads currently inside app code every
+    PROFILE_INTERVAL_SECONDS; when a slow request finishes, the most common
+    stacks seen during it are logged. Costs nothing while requests are fast.
+    """
+
+    def __init__(self, threshold: float = SLOW_REQUEST_SECONDS, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.threshold = threshold
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active: Dict[int, Tuple[float, TallyCounter]] = {}  # token -> (started, stack samples)
+        self._next_token = 0
+        self._thread: Optional[threading.Thread] = None
+        self._app_dir = os.path.dirname(os.path.abspath(__file__))
+
+    def begin(self) -> int:
+        with self._lock:
+            self._next_token += 1
+            token = self._next_token
+            self._active[token] = (time.perf_counter(), TallyCounter())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+                self._thread.start()
+        return token
+
+    def end(self, token: int, route: str, elapsed: float) -> None:
+        with self._lock:
+            _, samples = self._active.pop(token)
+        if elapsed >= self.threshold and samples:
+            top = "\n".join(f"  {count:>5} samples  {stack}" for stack, count in samples.most_common(5))
+            logger.warning("Slow request %s took %.3fs; hottest stacks:\n%s", route, elapsed, top)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            with self._lock:
+                slow = [samples for started, samples in self._active.values() if now - started >= self.threshold]
+            if not slow:
+                continue
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = traceback.extract_stack(frame)
+                if not any(f.filename.startswith(self._app_dir) for f in stack):
+                    continue  # idle worker threads, the event loop waiting, ...
+                collapsed = ";".join(f"{os.path.basename(f.filename)}:{f.name}" for f in stack[-12:])
+                for samples in slow:
+                    samples[collapsed] += 1
+
+
+profiler = SlowRequestProfiler() if PROFILE_SLOW_REQUESTS else None
+
+
+# -------------------------
+# ASGI middleware
+# -------------------------
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware), so streaming responses pass straight through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+        stats = RequestStats()
+        context_token = _current_request.set(stats)
+        profile_token = profiler.begin() if profiler else None
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_request.reset(context_token)
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            http_requests.inc(method, route, status_code)
+            http_duration.observe(elapsed, method, route)
+            db_queries_per_request.observe(stats.queries, route)
+            db_time_per_request.observe(stats.db_seconds, route)
+            if stats.statements:
+                statement, repeats = stats.statements.most_common(1)[0]
+                if repeats >= N_PLUS_ONE_THRESHOLD:
+                    n_plus_one.inc(route)
+                    logger.warning("Possible N+1 on %s %s: %s queries, this one %s times: %s", method, route, stats.queries, repeats, statement[:200])
+            if profiler:
+                profiler.end(profile_token, f"{method} {route}", elapsed)
+
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,278 @@
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select
+from sqlalchemy.schema import CreateTable
+from sqlmodel import SQLModel
+
+from app.models import BackgroundJob, Notification, Todo, TodoTombstone
+from app.search import create_search_index, rebuild_search_index
+
+logger = logging.getLogger("todo_migrations")
+
+# -------------------------
+# Versioned schema migrations
+# -------------------------
+# create_all() only creates missing tables; it never touches tables that already
+# exist, so an old todos.db would never get new indexes or columns.
+# Each migration below upgrades an existing database one version at a time and
+# the applied version is recorded in the schema_version table.
+#
+# Fresh databases are created from the models directly and stamped with the
+# latest version, so migrations only ever run against older files.
+
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _create_index(conn, table, name: str) -> None:
+    """Create one of the indexes declared on a model table (no-op if it exists)."""
+    index = next(i for i in table.indexes if i.name == name)
+    index.create(conn, checkfirst=True)
+
+
+def _v1_query_indexes(conn) -> None:
+    # the unique index can't be built while duplicate titles exist (PATCH/PUT used to allow them)
+    duplicates = conn.execute(
+        select(Todo.owner_id, Todo.title)
+        .group_by(Todo.owner_id, Todo.title)
+        .having(func.count() > 1)
+        .limit(5)
+    ).all()
+    if duplicates:
+        raise RuntimeError(
+            "Cannot add unique (owner_id, title) index, duplicate todo titles exist: "
+            + ", ".join(f"owner_id={o} title={t!r}" for o, t in duplicates)
+            + ". Rename or delete the duplicates and run the migration again."
+        )
+    for name in ("ix_todo_owner_updated", "ix_todo_owner_created", "uq_todo_owner_title", "ix_todo_pending_reminder"):
+        _create_index(conn, Todo.__table__, name)
+    _create_index(conn, Notification.__table__, "ix_notification_user_created")
+
+
+def _rebuild_sqlite_table(conn, table) -> None:
+    """
+    SQLite can't ALTER a foreign key, so: create the table under a temporary name
+    from the current model, copy the rows, drop the old one, rename, re-create indexes.
+    Columns added by later migrations therefore may already exist; see _add_column.
+    """
+    full = MetaData()
+    for t in SQLModel.metadata.sorted_tables:
+        t.to_metadata(full)  # FK targets must be resolvable to render REFERENCES
+    tmp = table.to_metadata(full, name=f"_{table.name}_new")
+    conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{tmp.name}"')
+    conn.execute(CreateTable(tmp))
+    # only copy columns the old table has: the model may already carry columns a later migration adds
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    cols = ", ".join(f'"{c.name}"' for c in table.columns if c.name in existing)
+    conn.exec_driver_sql(f'INSERT INTO "{tmp.name}" ({cols}) SELECT {cols} FROM "{table.name}"')
+    conn.exec_driver_sql(f'DROP TABLE "{table.name}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{tmp.name}" RENAME TO "{table.name}"')
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _add_column(conn, table: str, column: str, ddl: str) -> None:
+    """ALTER TABLE ... ADD COLUMN unless an earlier table rebuild already created it."""
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.exec_driver_sql(f'ALTER TABLE "{table}" ADD COLUMN {column} {ddl}')
+
+
+# (table, column, referenced table, ON DELETE action) -- mirrors the ondelete= on the models
+_V2_FOREIGN_KEYS = [
+    ("todo", "owner_id", "user", "CASCADE"),
+    ("notification", "user_id", "user", "CASCADE"),
+    ("notification", "todo_id", "todo", "SET NULL"),
+]
+
+
+def _v2_foreign_key_actions(conn) -> None:
+    # rows left behind by the old one-object-at-a-time deletes would violate the enforced FKs
+    conn.exec_driver_sql('DELETE FROM notification WHERE user_id IS NOT NULL AND user_id NOT IN (SELECT id FROM "user")')
+    conn.exec_driver_sql('DELETE FROM todo WHERE owner_id IS NOT NULL AND owner_id NOT IN (SELECT id FROM "user")')
+    conn.exec_driver_sql("UPDATE notification SET todo_id = NULL WHERE todo_id IS NOT NULL AND todo_id NOT IN (SELECT id FROM todo)")
+    if conn.dialect.name == "sqlite":
+        _rebuild_sqlite_table(conn, Todo.__table__)
+        _rebuild_sqlite_table(conn, Notification.__table__)
+        return
+    inspector = inspect(conn)
+    for table, column, target, action in _V2_FOREIGN_KEYS:
+        for fk in inspector.get_foreign_keys(table):
+            if fk["constrained_columns"] == [column] and fk["name"]:
+                conn.exec_driver_sql(f'ALTER TABLE "{table}" DROP CONSTRAINT "{fk["name"]}"')
+        conn.exec_driver_sql(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{column}_fkey" '
+            f'FOREIGN KEY ("{column}") REFERENCES "{target}" (id) ON DELETE {action}'
+        )
+
+
+def _v3_user_data_version(conn) -> None:
+    conn.exec_driver_sql('ALTER TABLE "user" ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0')
+
+
+def _v4_todo_search(conn) -> None:
+    # note: a later _rebuild_sqlite_table(todo) drops the FTS triggers; call create_search_index after it
+    create_search_index(conn)
+    rebuild_search_index(conn)
+
+
+def _v5_notification_read_state(conn) -> None:
+    _add_column(conn, "notification", "read_at", "TIMESTAMP")
+    _add_column(conn, "user", "unread_notifications", "INTEGER NOT NULL DEFAULT 0")
+    # every existing notification starts out unread
+    conn.exec_driver_sql(
+        'UPDATE "user" SET unread_notifications = '
+        '(SELECT count(*) FROM notification WHERE notification.user_id = "user".id)'
+    )
+    _create_index(conn, Notification.__table__, "ix_notification_user_unread")
+    _create_index(conn, Notification.__table__, "ix_notification_read_at")
+
+
+def _v6_todo_recurrence(conn) -> None:
+    # recurring todos stay in ix_todo_pending_reminder; no new index needed
+    _add_column(conn, "todo", "recurrence", "VARCHAR(100)")
+
+
+def _v7_todo_changes(conn) -> None:
+    # existing rows start at 0, before any sync token
+    _add_column(conn, "todo", "change_seq", "INTEGER NOT NULL DEFAULT 0")
+    _create_index(conn, Todo.__table__, "ix_todo_owner_change")
+    TodoTombstone.__table__.create(conn, checkfirst=True)
+
+
+def _v8_todo_counters(conn) -> None:
+    for column in ("todo_count", "completed_count", "reminder_count"):
+        _add_column(conn, "user", column, "INTEGER NOT NULL DEFAULT 0")
+    # same counts as app/stats.py reconcile_todo_counts()
+    conn.exec_driver_sql(
+        'UPDATE "user" SET '
+        'todo_count = (SELECT count(*) FROM todo WHERE todo.owner_id = "user".id), '
+        'completed_count = (SELECT count(*) FROM todo WHERE todo.owner_id = "user".id AND todo.completed = true), '
+        'reminder_count = (SELECT count(*) FROM todo WHERE todo.owner_id = "user".id '
+        'AND todo.reminder_at IS NOT NULL AND todo.notified = false)'
+    )
+    _create_index(conn, Todo.__table__, "ix_todo_open_due")
+
+
+def _v9_background_jobs(conn) -> None:
+    BackgroundJob.__table__.create(conn, checkfirst=True)
+
+
+# (version, description, function(conn)) -- append only, never edit an applied entry
+MIGRATIONS = [
+    (1, "composite indexes for list, dashboard, duplicate-title and reminder queries", _v1_query_indexes),
+    (2, "ON DELETE CASCADE / SET NULL on todo and notification foreign keys", _v2_foreign_key_actions),
+    (3, "user.data_version counter for dashboard ETags", _v3_user_data_version),
+    (4, "full-text search index on todo title/description", _v4_todo_search),
+    (5, "notification.read_at and user.unread_notifications counter", _v5_notification_read_state),
+    (6, "todo.recurrence rule for repeating reminders", _v6_todo_recurrence),
+    (7, "todo.change_seq and todo tombstones for delta sync", _v7_todo_changes),
+    (8, "user todo counters and open-todo due-date index for stats", _v8_todo_counters),
+    (9, "background job state shared by all workers", _v9_background_jobs),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn) -> int:
+    schema_version.create(conn, checkfirst=True)
+    current = conn.execute(select(func.max(schema_version.c.version))).scalar()
+    return current or 0
+
+
+def _record_version(conn, version: int, description: str) -> None:
+    conn.execute(schema_version.insert().values(version=version, description=description, applied_at=datetime.now()))
+
+
+# any constant shared by every worker; Postgres advisory locks are keyed by a bigint
+_PG_SCHEMA_LOCK = 0x746F646F
+
+
+@contextmanager
+def schema_lock(engine, foreign_keys_off: bool = False):
+    """
+    A connection in a transaction that holds the schema lock: BEGIN IMMEDIATE
+    (the database write lock) on SQLite, a transaction-level advisory lock on
+    Postgres. Workers starting at the same time take turns, so whatever they
+    decide from the schema version must be read inside it.
+    foreign_keys_off turns SQLite foreign keys off for the transaction, for
+    table rebuilds (the pragma only works outside a transaction).
+    """
+    with engine.connect() as conn:
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite and foreign_keys_off:
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            conn.commit()
+        try:
+            if sqlite:
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            elif conn.dialect.name == "postgresql":
+                conn.execute(select(func.pg_advisory_xact_lock(_PG_SCHEMA_LOCK)))
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if sqlite and foreign_keys_off:
+                conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+                conn.commit()
+
+
+def stamp_latest(conn) -> None:
+    """
+    Mark a freshly created database as fully migrated.
+    Objects the models can't describe (search index and triggers) are created here too.
+    """
+    create_search_index(conn)
+    if get_schema_version(conn) < LATEST_VERSION:
+        for version, description, _ in MIGRATIONS:
+            _record_version(conn, version, description)
+
+
+def migrate(engine) -> int:
+    """
+    Apply every pending migration, each in its own transaction under the schema
+    lock. Versions another worker applied while this one waited are skipped.
+    Returns the schema version the database ends up at.
+    """
+    with engine.begin() as conn:
+        current = get_schema_version(conn)
+    for version, description, upgrade in MIGRATIONS:
+        if version <= current:
+            continue
+        # table rebuilds must not fire ON DELETE actions
+        with schema_lock(engine, foreign_keys_off=True) as conn:
+            current = get_schema_version(conn)
+            if version <= current:
+                continue
+            logger.info("Applying migration %s: %s", version, description)
+            upgrade(conn)
+            _record_version(conn, version, description)
+            if conn.dialect.name == "sqlite":
+                problems = conn.exec_driver_sql("PRAGMA foreign_key_check").fetchall()
+                if problems:
+                    logger.warning("Foreign key violations after migration %s: %s", version, problems[:10])
+        current = version
+    return current
+
+
+def is_fresh_database(conn) -> bool:
+    """True when none of the application tables exist yet."""
+    return not inspect(conn).has_table(Todo.__tablename__)
+
+
+if __name__ == "__main__":
+    # Create or upgrade the schema in place, once per deploy and before the API
+    # workers start: python -m app.migrations (they don't, unless DB_CREATE_ON_STARTUP=1)
+    from app.database import create_db_and_tables
+
+    logging.basicConfig(level=logging.INFO)
+    create_db_and_tables()
@@ -1,6 +1,9 @@
-from typing import Optional,List
+from typing import Optional,List,Literal
+from sqlalchemy import JSON,Column,Index,text
+from pydantic import field_validator,model_validator
 from sqlmodel import SQLModel,Field,Relationship
 from datetime import datetime
+from app.recurrence import MAX_RULE_LENGTH,validate_rule
 
 # -------------------------
 # User models
@@ -17,10 +20,25 @@ class User(UserBase,table=True):
     id:Optional[int]=Field(default=None,primary_key=True)
     hashed_password:str
     is_admin:bool
+    # bumped on every write to the user's todos/notifications; used as the dashboard ETag
+    data_version:int=Field(default=0,sa_column_kwargs={"server_default":"0"})
+    # unread notifications, kept up to date by every write that creates or reads them (GET /notifications/unread-count)
+    unread_notifications:int=Field(default=0,sa_column_kwargs={"server_default":"0"})
+    # the user's todos: all, completed, and with a reminder not sent yet; kept up to date by every
+    # write to them and repaired by app/stats.py (GET /me/stats)
+    todo_count:int=Field(default=0,sa_column_kwargs={"server_default":"0"})
+    completed_count:int=Field(default=0,sa_column_kwargs={"server_default":"0"})
+    reminder_count:int=Field(default=0,sa_column_kwargs={"server_default":"0"})
     # Relationship: one user -> many todos
     todos: List["Todo"] = Relationship(back_populates="owner")
     notifications:List["Notification"]=Relationship(back_populates="user")
 
+# Lightweight identity attached to each authenticated request (cached by app/auth.py)
+class UserPrincipal(SQLModel):
+    id:int
+    username:str
+    is_admin:bool=False
+
 # -------------------------
 # Todo models
 # -------------------------
@@ -35,6 +53,12 @@ class TodoBase(SQLModel):
 class TodoCreate(TodoBase):
     due_date:Optional[datetime]=Field(None,description="Deadline to complete the task")
     reminder_at: Optional[datetime] = Field(None, description="UTC datetime when reminder should be triggered (ISO format)")
+    recurrence: Optional[str] = Field(None, max_length=MAX_RULE_LENGTH, description="Repeat the reminder: hourly, daily, weekly, 'every <n> <unit>' or a cron expression (see app/recurrence.py)")
+
+    @field_validator("recurrence")
+    @classmethod
+    def check_recurrence(cls, value):
+        return validate_rule(value)
 
 
 
@@ -45,9 +69,45 @@ class TodoUpdate(SQLModel):
     completed: Optional[bool] = None
     due_date:Optional[datetime]=None
     reminder_at: Optional[datetime] = None
+    recurrence: Optional[str] = Field(None, max_length=MAX_RULE_LENGTH)
+
+    @field_validator("recurrence")
+    @classmethod
+    def check_recurrence(cls, value):
+        return validate_rule(value)
+
+    # omitted means unchanged, but these columns are NOT NULL: an explicit null is a 422, not a failed write
+    @field_validator("title", "completed")
+    @classmethod
+    def check_not_null(cls, value, info):
+        if value is None:
+            raise ValueError(f"{info.field_name} cannot be null")
+        return value
 
 # DB model / response model
 class Todo(TodoBase, table=True):
+    # Indexes follow the queries we actually run (see app/migrations.py for existing databases):
+    #   - list/dashboard: WHERE owner_id = ? ORDER BY updated_at|created_at, id
+    #   - create_todo duplicate check: WHERE owner_id = ? AND title = ? (also enforced by the DB)
+    #   - reminder job: WHERE notified = false AND reminder_at <= now (partial, only pending rows)
+    #   - delta sync: WHERE owner_id = ? AND change_seq > ? ORDER BY change_seq, id
+    #   - stats: overdue = WHERE owner_id = ? AND completed = false AND due_date < now (partial, open todos with a due date)
+    __table_args__ = (
+        Index("ix_todo_owner_updated", "owner_id", "updated_at", "id"),
+        Index("ix_todo_owner_change", "owner_id", "change_seq", "id"),
+        Index("ix_todo_owner_created", "owner_id", "created_at", "id"),
+        Index("uq_todo_owner_title", "owner_id", "title", unique=True),
+        Index(
+            "ix_todo_pending_reminder", "reminder_at",
+            sqlite_where=text("notified = 0"), postgresql_where=text("notified = false"),
+        ),
+        Index(
+            "ix_todo_open_due", "owner_id", "due_date",
+            sqlite_where=text("completed = 0 AND due_date IS NOT NULL"),
+            postgresql_where=text("completed = false AND due_date IS NOT NULL"),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
@@ -56,12 +116,31 @@ class Todo(TodoBase, table=True):
     # Reminder fields
     reminder_at: Optional[datetime] = Field(None, description="UTC datetime for reminder")
     notified: bool = Field(False, description="True if reminder already sent")
+    # recurring todos: the dispatcher moves reminder_at to the next occurrence instead of setting notified
+    recurrence: Optional[str] = Field(None, max_length=MAX_RULE_LENGTH)
+    # owner's data_version of the last write to this row (GET /todos/changes, see app/sync.py)
+    change_seq: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
     # Owner foreign key and relationship
-    owner_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    # deleting a user deletes their todos in the database as well
+    owner_id: Optional[int] = Field(default=None, foreign_key="user.id", ondelete="CASCADE")
     owner: Optional[User] = Relationship(back_populates="todos")
 
 
+# Left behind by a deleted todo so GET /todos/changes can report the deletion
+class TodoTombstone(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_tombstone_owner_change", "owner_id", "change_seq"),
+        Index("ix_tombstone_deleted_at", "deleted_at"),  # retention
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    todo_id: int
+    owner_id: int = Field(foreign_key="user.id", ondelete="CASCADE")
+    change_seq: int
+    deleted_at: datetime = Field(default_factory=datetime.now)
+
+
 # -------------------------
 # Notification model 
 # -------------------------
@@ -75,8 +154,155 @@ class NotificationCreate(NotificationBase):
     todo_id:Optional[int]=None
 
 class Notification(NotificationBase,table=True):
+    # list/dashboard: WHERE user_id = ? ORDER BY created_at, id
+    # ?unread=true: the same, over unread rows only (partial index)
+    # retention: read rows by age (partial index; unread rows are never purged)
+    __table_args__ = (
+        Index("ix_notification_user_created", "user_id", "created_at", "id"),
+        Index(
+            "ix_notification_user_unread", "user_id", "created_at", "id",
+            sqlite_where=text("read_at IS NULL"), postgresql_where=text("read_at IS NULL"),
+        ),
+        Index(
+            "ix_notification_read_at", "read_at",
+            sqlite_where=text("read_at IS NOT NULL"), postgresql_where=text("read_at IS NOT NULL"),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    todo_id: Optional[int] = Field(default=None, foreign_key="todo.id")
-    user_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    # keep the notification when its todo is deleted; delete it with its user
+    todo_id: Optional[int] = Field(default=None, foreign_key="todo.id", ondelete="SET NULL")
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", ondelete="CASCADE")
+    read_at: Optional[datetime] = Field(None, description="When the user marked it read; null while unread")
     # Relationship backrefs can be added if needed
-    user: Optional[User] = Relationship(back_populates="notifications")
\ No newline at end of file
+    user: Optional[User] = Relationship(back_populates="notifications")
+
+
+# -------------------------
+# Background job model (app/jobs.py)
+# -------------------------
+# Progress of admin jobs, in the database so that any API worker can answer
+# GET /admin/jobs/{id} for a job started on another one.
+
+class BackgroundJob(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_backgroundjob_finished_at", "finished_at"),  # pruning finished jobs
+    )
+
+    id: str = Field(primary_key=True, max_length=32)
+    kind: str = Field(max_length=50)
+    status: str = Field("queued", max_length=20)  # queued -> running -> done | failed
+    done: int = 0
+    total: Optional[int] = None
+    result: Optional[dict] = Field(None, sa_column=Column(JSON))
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+
+# -------------------------
+# Read schemas
+# -------------------------
+# What the API returns for a todo / notification. List endpoints select exactly
+# these columns and serialize the row tuples (app/responses.py) instead of
+# loading full ORM instances; field order here is the column order there.
+
+class TodoRead(SQLModel):
+    id:int
+    title:str
+    description:Optional[str]=None
+    completed:bool
+    created_at:datetime
+    updated_at:datetime
+    due_date:Optional[datetime]=None
+    reminder_at:Optional[datetime]=None
+    notified:bool
+    recurrence:Optional[str]=None
+    owner_id:Optional[int]=None
+
+class NotificationRead(SQLModel):
+    id:int
+    title:str
+    message:Optional[str]=None
+    created_at:datetime
+    todo_id:Optional[int]=None
+    user_id:Optional[int]=None
+    read_at:Optional[datetime]=None
+
+# -------------------------
+# Paginated list responses
+# -------------------------
+
+class TodoPage(SQLModel):
+    items: List[TodoRead]
+    next_cursor: Optional[str] = None
+
+class NotificationPage(SQLModel):
+    items: List[NotificationRead]
+    next_cursor: Optional[str] = None
+
+class NotificationReadRequest(SQLModel):
+    ids:Optional[List[int]]=Field(None,max_length=1000,description="Mark these notifications read")
+    up_to_id:Optional[int]=Field(None,description="Mark every notification with id <= up_to_id read")
+    all:bool=Field(False,description="Mark every notification read")
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if not self.all and self.ids is None and self.up_to_id is None:
+            raise ValueError("pass ids, up_to_id or all=true")
+        return self
+
+class NotificationReadResponse(SQLModel):
+    marked:int
+    unread:int
+
+# GET /todos/changes
+class TodoChanges(SQLModel):
+    todos: List[TodoRead]
+    deleted: List[int]
+    sync_token: str
+    has_more: bool
+
+# GET /me/stats
+class TodoStats(SQLModel):
+    total: int
+    completed: int
+    open: int
+    overdue: int
+    pending_reminders: int
+
+# GET /admin/stats: the same over every user
+class AdminTodoStats(TodoStats):
+    users: int
+
+# -------------------------
+# Dashboard response
+# -------------------------
+
+class DashboardResponse(SQLModel):
+    todos: List[TodoRead]
+    notifications: List[NotificationRead]
+
+# -------------------------
+# Batch todo operations (POST /todos/batch)
+# -------------------------
+
+class TodoBatchOperation(SQLModel):
+    op:Literal["create","update","complete","delete"]
+    id:Optional[int]=Field(None,description="Target todo for update/complete/delete")
+    todo:Optional[TodoCreate]=Field(None,description="New todo for create")
+    changes:Optional[TodoUpdate]=Field(None,description="Fields to change for update")
+
+class TodoBatchRequest(SQLModel):
+    operations:List[TodoBatchOperation]
+
+class TodoBatchResult(SQLModel):
+    index:int
+    op:str
+    ok:bool
+    id:Optional[int]=None
+    error:Optional[str]=None
+
+class TodoBatchResponse(SQLModel):
+    applied:int
+    failed:int
+    results:List[TodoBatchResult]
@@ -0,0 +1,154 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple, Union
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import and_, bindparam, or_
+
+# -------------------------
+# Keyset (cursor) pagination helpers
+# -------------------------
+# Instead of OFFSET (which still scans every skipped row) we remember the
+# (sort value, id) of the last row we returned and ask for rows "after" it.
+# With an index on (owner, sort column, id) every page costs the same.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(sort: str, sort_value: Union[datetime, float], row_id: int) -> str:
+    """
+    Build an opaque cursor token from the last row of a page.
+    The sort key is stored too so a cursor can't be replayed with another sort.
+    Datetimes are stored as ISO strings, numbers (e.g. a search rank) as-is.
+    """
+    value = sort_value.isoformat() if isinstance(sort_value, datetime) else float(sort_value)
+    payload = {"s": sort, "v": value, "i": row_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Union[datetime, float], int]:
+    """
+    Decode a cursor produced by encode_cursor.
+    Raises HTTPException(400) if the token is malformed or was made for another sort.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["s"] != sort:
+            raise ValueError("cursor sort mismatch")
+        value = payload["v"]
+        value = datetime.fromisoformat(value) if isinstance(value, str) else float(value)
+        return value, int(payload["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def parse_sort(sort: str, allowed: Tuple[str, ...]) -> Tuple[str, bool]:
+    """
+    Turn "-updated_at" / "updated_at" into (column name, descending).
+    """
+    descending = sort.startswith("-")
+    name = sort.lstrip("-")
+    if name not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sort must be one of: {', '.join(allowed)} (prefix with '-' for descending)",
+        )
+    return name, descending
+
+
+def keyset_paginate(statement, sort_column, id_column, descending: bool, with_cursor: bool):
+    """
+    Apply cursor condition, ordering and limit to a select statement.
+    The cursor and limit are bind parameters (:cursor_value, :cursor_id, :limit;
+    fill them with keyset_params), so the statement can be built once per shape
+    and reused for every request.
+    """
+    if with_cursor:
+        value, last_id = bindparam("cursor_value"), bindparam("cursor_id")
+        if descending:
+            statement = statement.where(or_(sort_column < value, and_(sort_column == value, id_column < last_id)))
+        else:
+            statement = statement.where(or_(sort_column > value, and_(sort_column == value, id_column > last_id)))
+    if descending:
+        statement = statement.order_by(sort_column.desc(), id_column.desc())
+    else:
+        statement = statement.order_by(sort_column.asc(), id_column.asc())
+    return statement.limit(bindparam("limit"))
+
+
+def keyset_params(sort: str, cursor: Optional[str], limit: int) -> dict:
+    """
+    Parameters for a keyset_paginate statement. One extra row is fetched so the
+    caller can tell if there is a next page.
+    """
+    params = {"limit": limit + 1}
+    if cursor:
+        params["cursor_value"], params["cursor_id"] = decode_cursor(cursor, sort)
+    return params
+
+
+def build_page(rows, sort: str, sort_field: str, limit: int) -> dict:
+    """
+    Cut the extra row off and compute the next cursor (None on the last page).
+    """
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, sort_field), last.id)
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+# -------------------------
+# Query parameters shared by the sync and async list endpoints
+# -------------------------
+
+class TodoListParams:
+    """
+    ?limit=&cursor=&sort=&completed=&due_after=&due_before=&has_reminder= for GET /todos/
+      - sort: updated_at or created_at, prefix with '-' for descending (default -updated_at)
+      - due_after / due_before are inclusive
+    """
+    sorts = ("updated_at", "created_at")
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        sort: str = "-updated_at",
+        completed: Optional[bool] = None,
+        due_after: Optional[datetime] = None,
+        due_before: Optional[datetime] = None,
+        has_reminder: Optional[bool] = None,
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.sort = sort
+        self.field, self.descending = parse_sort(sort, self.sorts)
+        self.completed = completed
+        self.due_after = due_after
+        self.due_before = due_before
+        self.has_reminder = has_reminder
+
+
+class NotificationListParams:
+    """?limit=&cursor=&sort=&unread= for GET /notifications (default newest first)."""
+    sorts = ("created_at",)
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        sort: str = "-created_at",
+        unread: Optional[bool] = None,
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.sort = sort
+        self.field, self.descending = parse_sort(sort, self.sorts)
+        self.unread = unread
@@ -0,0 +1,26 @@
+import importlib
+from typing import Type, TypeVar
+
+T = TypeVar("T")
+
+# -------------------------
+# Pluggable backends chosen by environment variable
+# -------------------------
+# EVENT_BROKER (app/events.py) and RATE_LIMIT_BACKEND (app/ratelimit.py) name
+# a class as "package.module:ClassName"; the worker imports it and builds one
+# instance with no arguments at startup.
+
+
+def load_instance(path: str, base: Type[T]) -> T:
+    """
+    Import "package.module:ClassName" and return an instance of it. Raises
+    ValueError if the path is malformed or the class isn't a `base`, so a
+    typo in the setting fails at startup rather than on first use.
+    """
+    module_name, _, class_name = path.partition(":")
+    if not module_name or not class_name:
+        raise ValueError(f"invalid class path {path!r}, expected 'package.module:ClassName'")
+    cls = getattr(importlib.import_module(module_name), class_name, None)
+    if not (isinstance(cls, type) and issubclass(cls, base)):
+        raise ValueError(f"{path!r} is not a {base.__name__} subclass")
+    return cls()
@@ -0,0 +1,362 @@
+import math
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import compile_path
+
+from app.metrics import registry
+from app.plugins import load_instance
+
+# -------------------------
+# Fixed-window attempt counters
+# -------------------------
+# Used to throttle logins/registrations per username and per client IP before
+# any password hashing happens, so brute-force traffic is turned away cheaply.
+
+
+class AttemptLimiter:
+    def __init__(self, max_attempts: int, window_seconds: float, max_keys: int = 100_000):
+        """max_attempts <= 0 disables the limiter."""
+        self.max_attempts = max_attempts
+        self.window = window_seconds
+        self.max_keys = max_keys
+        self._counts: Dict[str, Tuple[float, int]] = {}  # key -> (window start, attempts)
+        self._lock = threading.Lock()
+
+    def _current(self, key: str, now: float) -> Tuple[float, int]:
+        start, count = self._counts.get(key, (now, 0))
+        if now - start >= self.window:
+            return now, 0
+        return start, count
+
+    def retry_after(self, key: str) -> Optional[int]:
+        """Seconds until key may try again, or None if it is under the limit."""
+        if self.max_attempts <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            start, count = self._current(key, now)
+        if count < self.max_attempts:
+            return None
+        return max(1, math.ceil(start + self.window - now))
+
+    def hit(self, key: str) -> None:
+        if self.max_attempts <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            start, count = self._current(key, now)
+            self._counts[key] = (start, count + 1)
+            if len(self._counts) > self.max_keys:
+                self._prune(now)
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._counts.pop(key, None)
+
+    def _prune(self, now: float) -> None:
+        expired = [k for k, (start, _) in self._counts.items() if now - start >= self.window]
+        for k in expired:
+            del self._counts[k]
+        # still too many live keys: drop the oldest windows
+        if len(self._counts) > self.max_keys:
+            for k, _ in sorted(self._counts.items(), key=lambda item: item[1][0])[: len(self._counts) - self.max_keys]:
+                del self._counts[k]
+
+
+def first_retry_after(checks: Iterable[Tuple[AttemptLimiter, str]]) -> Optional[int]:
+    """Largest Retry-After among the (limiter, key) pairs that are over their limit."""
+    waits = [w for limiter, key in checks if (w := limiter.retry_after(key)) is not None]
+    return max(waits) if waits else None
+
+
+# -------------------------
+# Token-bucket request limits (RateLimitMiddleware)
+# -------------------------
+# Every client has a bucket of RATE_LIMIT_BURST tokens refilled at
+# RATE_LIMIT_PER_SECOND; a request takes its route's cost (1 by default) and
+# gets 429 with Retry-After when the bucket is short. Routes listed in
+# RATE_LIMIT_ROUTES also get a bucket of their own per client, so one
+# expensive endpoint can be throttled harder than the rest:
+#   "GET /todos/=20:40;POST /admin/bulk-notify=0.1:3:10"
+#   = METHOD path-template=per-second:burst[:cost]
+# The client is the JWT subject (the username get_current_user resolves),
+# or the client IP for requests without a valid token.
+#
+# Buckets live in a BucketStore. LocalBucketStore keeps them in this process,
+# so with N workers a client gets up to N times the limit. To share them,
+# subclass SharedBucketStore over something every worker reaches (Redis,
+# memcached, ...) and point RATE_LIMIT_BACKEND at it ("package.module:ClassName");
+# InMemorySharedStore is the in-process stand-in used to exercise that path.
+# A request is charged to all its buckets or to none, so a refused one costs nothing.
+# benchmarks/bench_ratelimit.py measures the per-request overhead.
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "50"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "100"))
+RATE_LIMIT_ROUTES = os.getenv(
+    "RATE_LIMIT_ROUTES",
+    "GET /todos/=20:40;GET /me/dashboard=20:40;GET /todos/search=10:20:2;GET /todos/export=1:3:5;POST /admin/bulk-notify=0.1:3:10",
+)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "app.ratelimit:LocalBucketStore")
+
+rate_limited = registry.counter("http_rate_limited_total", "Requests rejected with 429 by the rate limiter.", ("limit",))
+
+
+def refill(tokens: float, stamp: float, now: float, rate: float, burst: float, cost: float) -> Tuple[float, float]:
+    """
+    One token-bucket step from (tokens, stamp): (tokens left, 0) if `cost` could
+    be taken, else (tokens, seconds until it can). A cost above the burst is
+    capped at the burst so the request isn't refused forever.
+    """
+    tokens = min(burst, tokens + (now - stamp) * rate)
+    cost = min(cost, burst)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+class Bucket(NamedTuple):
+    key: str
+    rate: float  # tokens per second
+    burst: float  # capacity
+    cost: float  # tokens this request takes
+
+
+def take_from(states: List[Optional[Tuple[float, float]]], buckets: Sequence[Bucket], now: float):
+    """
+    All-or-nothing take over several buckets given their (tokens, stamp) states
+    (None = never used, i.e. full). Returns (new states, 0, None) if every bucket
+    had its cost, else (None, the longest wait, the bucket that needs it).
+    """
+    new_states, wait, refused = [], 0.0, None
+    for state, bucket in zip(states, buckets):
+        tokens, stamp = state if state is not None else (bucket.burst, now)
+        tokens, bucket_wait = refill(tokens, stamp, now, bucket.rate, bucket.burst, bucket.cost)
+        if bucket_wait > wait:
+            wait, refused = bucket_wait, bucket
+        new_states.append((tokens, now))
+    return (None, wait, refused) if wait else (new_states, 0.0, None)
+
+
+class BucketStore:
+    """Where the token buckets live."""
+
+    async def take(self, buckets: Sequence[Bucket]) -> Tuple[float, Optional[Bucket]]:
+        """
+        Take each bucket's cost, atomically and all or nothing: (0, None) if they
+        all had it, else (seconds to wait, the bucket that refused) with nothing taken.
+        Called on the event loop for every request, so it must not block.
+        """
+        raise NotImplementedError
+
+
+class LocalBucketStore(BucketStore):
+    """Buckets of this process only; a dict update, so it runs on the event loop directly."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, monotonic stamp)
+        self._lock = threading.Lock()
+
+    async def take(self, buckets: Sequence[Bucket]) -> Tuple[float, Optional[Bucket]]:
+        return self.take_now(buckets)
+
+    def take_now(self, buckets: Sequence[Bucket]) -> Tuple[float, Optional[Bucket]]:
+        now = time.monotonic()
+        with self._lock:
+            states, wait, refused = take_from([self._buckets.get(b.key) for b in buckets], buckets, now)
+            if states is not None:
+                self._buckets.update(zip((b.key for b in buckets), states))
+                if len(self._buckets) > self.max_keys:
+                    self._prune(now, buckets[0].rate, buckets[0].burst)
+        return wait, refused
+
+    def _prune(self, now: float, rate: float, burst: float) -> None:
+        # a bucket that has refilled is the same as no bucket
+        full = [k for k, (tokens, stamp) in self._buckets.items() if tokens + (now - stamp) * rate >= burst]
+        for k in full:
+            del self._buckets[k]
+        # still too many: drop the least recently used
+        if len(self._buckets) > self.max_keys:
+            for k, _ in sorted(self._buckets.items(), key=lambda item: item[1][1])[: len(self._buckets) - self.max_keys]:
+                del self._buckets[k]
+
+
+class SharedBucketStore(BucketStore):
+    """
+    Buckets in a store shared by every worker, updated with an optimistic
+    read / compare-and-set loop. Subclasses provide two blocking primitives
+    over several keys at once (Redis WATCH + MULTI/EXEC, an UPDATE ... WHERE
+    version = ? in one transaction):
+      - load(keys) -> ([(tokens, stamp) or None per key], versions)
+      - save(keys, states, versions, ttls) -> False if any key changed since load
+    The loop runs in the threadpool, so their network round trips never block
+    the event loop. Stamps are wall-clock time, the only clock the workers share.
+    """
+
+    max_attempts = 5
+
+    def load(self, keys: List[str]):
+        raise NotImplementedError
+
+    def save(self, keys: List[str], states: list, versions, ttls: List[float]) -> bool:
+        raise NotImplementedError
+
+    async def take(self, buckets: Sequence[Bucket]) -> Tuple[float, Optional[Bucket]]:
+        return await run_in_threadpool(self.take_blocking, buckets)
+
+    def take_blocking(self, buckets: Sequence[Bucket]) -> Tuple[float, Optional[Bucket]]:
+        keys = [b.key for b in buckets]
+        ttls = [b.burst / b.rate for b in buckets]  # a bucket untouched this long is full again
+        for _ in range(self.max_attempts):
+            states, versions = self.load(keys)
+            states, wait, refused = take_from(states, buckets, time.time())
+            if states is None:
+                return wait, refused
+            if self.save(keys, states, versions, ttls):
+                return 0.0, None
+        return 0.0, None  # heavy contention on these keys: let the request through rather than fail it
+
+
+class InMemorySharedStore(SharedBucketStore):
+    """SharedBucketStore over a dict: the stand-in for a real shared store in tests and benchmarks."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Tuple[float, float], int, float]] = {}  # key -> (state, version, expires)
+        self._lock = threading.Lock()
+
+    def _entry(self, key: str, now: float):
+        entry = self._data.get(key)
+        return entry if entry is not None and entry[2] > now else (None, 0, 0.0)
+
+    def load(self, keys: List[str]):
+        now = time.time()
+        with self._lock:
+            entries = [self._entry(key, now) for key in keys]
+        return [entry[0] for entry in entries], [entry[1] for entry in entries]
+
+    def save(self, keys: List[str], states: list, versions, ttls: List[float]) -> bool:
+        now = time.time()
+        with self._lock:
+            if [self._entry(key, now)[1] for key in keys] != list(versions):
+                return False
+            for key, state, version, ttl in zip(keys, states, versions, ttls):
+                self._data[key] = (state, version + 1, now + ttl)
+            return True
+
+
+def load_bucket_store(path: str = RATE_LIMIT_BACKEND) -> BucketStore:
+    return load_instance(path, BucketStore)
+
+
+class RouteLimit(NamedTuple):
+    method: str
+    template: str
+    rate: float
+    burst: float
+    cost: float
+
+
+def parse_route_limits(spec: str) -> List[RouteLimit]:
+    """RATE_LIMIT_ROUTES -> RouteLimits; raises ValueError on a malformed entry."""
+    limits = []
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        route, _, numbers = entry.rpartition("=")
+        method, _, template = route.strip().partition(" ")
+        values = [float(v) for v in numbers.split(":")]
+        if not template or len(values) not in (2, 3) or values[0] <= 0 or values[1] < 1:
+            raise ValueError(f"invalid rate limit {entry!r}, expected 'METHOD /path=per_second:burst[:cost]'")
+        limits.append(RouteLimit(method.upper(), template.strip(), values[0], values[1], values[2] if len(values) == 3 else 1.0))
+    return limits
+
+
+class RouteLimits:
+    """Finds the RouteLimit of a request: a dict lookup for plain paths, a regex per templated one."""
+
+    def __init__(self, limits: Iterable[RouteLimit]):
+        self._exact: Dict[Tuple[str, str], RouteLimit] = {}
+        self._templated: List[Tuple[str, re.Pattern, RouteLimit]] = []
+        for limit in limits:
+            if "{" in limit.template:
+                self._templated.append((limit.method, compile_path(limit.template)[0], limit))
+            else:
+                self._exact[(limit.method, limit.template)] = limit
+
+    def match(self, method: str, path: str) -> Optional[RouteLimit]:
+        limit = self._exact.get((method, path))
+        if limit is None:
+            for limit_method, pattern, candidate in self._templated:
+                if limit_method == method and pattern.match(path):
+                    return candidate
+        return limit
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware (like MetricsMiddleware) applying the token-bucket
+    limits before routing. subject_of_token(token) -> username or None
+    identifies authenticated clients (app.auth.token_subject).
+    """
+
+    def __init__(
+        self,
+        app,
+        subject_of_token: Optional[Callable[[str], Optional[str]]] = None,
+        store: Optional[BucketStore] = None,
+        rate: float = RATE_LIMIT_PER_SECOND,
+        burst: float = RATE_LIMIT_BURST,
+        routes: str = RATE_LIMIT_ROUTES,
+    ):
+        self.app = app
+        self.subject_of_token = subject_of_token
+        self.store = store if store is not None else load_bucket_store()
+        self.rate = rate
+        self.burst = burst
+        self.routes = RouteLimits(parse_route_limits(routes))
+
+    def client_key(self, scope) -> str:
+        if self.subject_of_token is not None:
+            for name, value in scope["headers"]:
+                if name == b"authorization":
+                    scheme, _, token = value.decode("latin-1").partition(" ")
+                    subject = self.subject_of_token(token) if scheme.lower() == "bearer" and token else None
+                    if subject is not None:
+                        return f"user:{subject}"
+                    break
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def wait_for(self, scope) -> Tuple[float, str]:
+        """(seconds the request has to wait or 0, which limit refused it)."""
+        client = self.client_key(scope)
+        limit = self.routes.match(scope["method"], scope["path"])
+        if limit is None:
+            buckets = [Bucket(client, self.rate, self.burst, 1.0)]
+        else:
+            # the client's overall bucket pays the route's cost; both are checked before either is charged
+            route = f"{limit.method} {limit.template}"
+            buckets = [Bucket(client, self.rate, self.burst, limit.cost), Bucket(f"{client} {route}", limit.rate, limit.burst, 1.0)]
+        wait, refused = await self.store.take(buckets)
+        return wait, ("client" if refused is buckets[0] else route) if wait else ""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        wait, refused_by = await self.wait_for(scope)
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+        rate_limited.inc(refused_by)
+        response = JSONResponse(
+            {"detail": "Too many requests, try again later."},
+            status_code=429,
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+        await response(scope, receive, send)
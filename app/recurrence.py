@@ -0,0 +1,134 @@
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import FrozenSet, NamedTuple, Optional
+
+# -------------------------
+# Recurrence rules for repeating reminders
+# -------------------------
+# A recurring todo keeps one row; when its reminder fires the dispatcher moves
+# reminder_at to the next occurrence (app/reminders.py). Supported rules:
+#   hourly | daily | weekly                    every hour/day/week from reminder_at
+#   every <n> minutes|hours|days|weeks         e.g. "every 2 days"
+#   <minute> <hour> <day> <month> <weekday>     5-field cron, e.g. "0 9 * * 1-5"
+# Cron fields take *, numbers, a-b ranges, lists and /steps; weekday 0 or 7 is
+# Sunday. As in cron, a rule restricting both day and weekday fires when either
+# matches. Occurrences missed while the dispatcher was down are skipped, not
+# replayed: the next reminder is always the first occurrence after now.
+
+MAX_RULE_LENGTH = 100
+
+_INTERVALS = {"hourly": timedelta(hours=1), "daily": timedelta(days=1), "weekly": timedelta(weeks=1)}
+_EVERY = re.compile(r"every\s+(\d+)\s+(minute|hour|day|week)s?")
+_UNITS = {"minute": "minutes", "hour": "hours", "day": "days", "week": "weeks"}
+# (low, high) of minute, hour, day of month, month, weekday
+_CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+# how far ahead to look for a cron match (covers Feb 29 rules)
+_CRON_SEARCH_DAYS = 366 * 8
+
+
+class CronRule(NamedTuple):
+    minutes: FrozenSet[int]
+    hours: FrozenSet[int]
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]  # 0 = Sunday
+    any_day: bool
+    any_weekday: bool
+
+
+def _cron_field(text: str, low: int, high: int) -> FrozenSet[int]:
+    values = set()
+    for part in text.split(","):
+        span, _, step = part.partition("/")
+        if span == "*":
+            start, end = low, high
+        elif "-" in span:
+            start, end = (int(v) for v in span.split("-", 1))
+        else:
+            start = end = int(span)
+        step = int(step) if step else 1
+        if not (low <= start <= end <= high) or step < 1:
+            raise ValueError(f"{part!r} is out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@lru_cache(maxsize=1024)
+def parse_rule(rule: str):
+    """
+    A timedelta for interval rules, a CronRule for cron expressions.
+    Raises ValueError for anything else.
+    """
+    text = " ".join(rule.lower().split())
+    if text in _INTERVALS:
+        return _INTERVALS[text]
+    every = _EVERY.fullmatch(text)
+    if every:
+        step = timedelta(**{_UNITS[every.group(2)]: int(every.group(1))})
+        if step < timedelta(minutes=1):
+            raise ValueError("recurrence interval must be at least one minute")
+        return step
+    fields = text.split(" ")
+    if len(fields) != 5:
+        raise ValueError("recurrence must be hourly, daily, weekly, 'every <n> <unit>' or a 5-field cron expression")
+    try:
+        minutes, hours, days, months, weekdays = (_cron_field(f, *r) for f, r in zip(fields, _CRON_RANGES))
+    except ValueError as e:
+        raise ValueError(f"invalid cron expression {rule!r}: {e}")
+    weekdays = frozenset(d % 7 for d in weekdays)
+    return CronRule(minutes, hours, days, months, weekdays, fields[2] == "*", fields[4] == "*")
+
+
+def validate_rule(rule: Optional[str]) -> Optional[str]:
+    """Pydantic validator helper: normalized rule text, ValueError if it doesn't parse."""
+    if rule is None:
+        return None
+    parsed = parse_rule(rule)
+    if isinstance(parsed, CronRule):
+        _next_cron(parsed, datetime.now())  # e.g. "0 0 30 2 *" parses but never fires
+    return " ".join(rule.split())
+
+
+def _cron_day_matches(rule: CronRule, day: datetime) -> bool:
+    if day.month not in rule.months:
+        return False
+    in_days = day.day in rule.days
+    in_weekdays = (day.isoweekday() % 7) in rule.weekdays
+    if rule.any_day or rule.any_weekday:
+        return in_days and in_weekdays
+    return in_days or in_weekdays
+
+
+def _next_cron(rule: CronRule, after: datetime) -> datetime:
+    start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    day = start.replace(hour=0, minute=0)
+    for offset in range(_CRON_SEARCH_DAYS):
+        if _cron_day_matches(rule, day):
+            first_day = offset == 0
+            for hour in sorted(rule.hours):
+                if first_day and hour < start.hour:
+                    continue
+                for minute in sorted(rule.minutes):
+                    if first_day and hour == start.hour and minute < start.minute:
+                        continue
+                    return day.replace(hour=hour, minute=minute)
+        day += timedelta(days=1)
+    raise ValueError("cron expression never fires")
+
+
+def next_occurrence(rule: str, previous: Optional[datetime], now: datetime) -> datetime:
+    """
+    First occurrence of `rule` strictly after `now`. Interval rules keep the
+    phase of `previous` (the reminder that just fired, or None for a new rule),
+    so a daily 09:00 reminder stays at 09:00 even if it is dispatched late.
+    """
+    parsed = parse_rule(rule)
+    if isinstance(parsed, CronRule):
+        return _next_cron(parsed, now)
+    if previous is None:
+        return now + parsed
+    if previous > now:
+        return previous
+    missed = (now - previous) // parsed
+    return previous + parsed * (missed + 1)
@@ -0,0 +1,264 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import bindparam, false, func, insert, update
+from sqlmodel import Session, select
+
+from app.crud import TodoCounts, bump_data_version, stamp_changes
+from app.database import engine
+from app.events import broker, make_event, publish_safely
+from app.metrics import job_duration, registry
+from app.models import Notification, Todo, User
+from app.recurrence import next_occurrence
+from app.workers import PeriodicWorker
+
+logger = logging.getLogger("todo_reminder")
+
+# -------------------------
+# Reminder dispatcher
+# -------------------------
+# Instead of scanning every minute, the dispatcher sleeps until the next
+# pending reminder_at (found through the partial ix_todo_pending_reminder index)
+# and claims due todos in small batches with a single
+#   UPDATE todo SET notified = true WHERE id IN (...) AND notified = false RETURNING ...
+# A row can only flip from false to true once, so any number of dispatchers
+# (API workers or `python -m app.reminders` processes) can run side by side
+# without sending a reminder twice.
+#
+# Recurring todos (app/recurrence.py) are claimed the same way; in the same
+# transaction that creates their notifications they are put back in the pending
+# set with reminder_at moved to the next occurrence. The partial index is
+# therefore the index of next fire times, and a dispatch only touches the rows
+# that are due, however many recurring todos are waiting.
+
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+# Upper bound on how long the dispatcher sleeps; reminders created by another
+# process are picked up within this many seconds.
+REMINDER_MAX_IDLE_SECONDS = float(os.getenv("REMINDER_MAX_IDLE_SECONDS", "30"))
+# Run the dispatcher inside each API worker. Set to 0 when running it separately.
+RUN_REMINDER_DISPATCHER = os.getenv("RUN_REMINDER_DISPATCHER", "1") == "1"
+
+
+class DispatchMetrics:
+    """Counters for the dispatcher; read them through snapshot()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.dispatched_total = 0
+        self.batches_total = 0
+        self.runs_total = 0
+        self.busy_seconds = 0.0
+        self.last_run_at: Optional[datetime] = None
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self._lag_sum = 0.0
+
+    def record_batch(self, count: int, lags: list) -> None:
+        if count == 0:
+            return
+        for lag in lags:
+            reminder_lag.observe(lag)
+        with self._lock:
+            self.batches_total += 1
+            self.dispatched_total += count
+            if lags:
+                self.last_lag_seconds = max(lags)
+                self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+                self._lag_sum += sum(lags)
+
+    def record_run(self, seconds: float) -> None:
+        job_duration.observe(seconds, "reminder_dispatch")
+        with self._lock:
+            self.runs_total += 1
+            self.busy_seconds += seconds
+            self.last_run_at = datetime.now()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "dispatched_total": self.dispatched_total,
+                "batches_total": self.batches_total,
+                "runs_total": self.runs_total,
+                "last_run_at": self.last_run_at,
+                "last_lag_seconds": round(self.last_lag_seconds, 3),
+                "max_lag_seconds": round(self.max_lag_seconds, 3),
+                "avg_lag_seconds": round(self._lag_sum / self.dispatched_total, 3) if self.dispatched_total else 0.0,
+                # reminders per second of time spent dispatching (not wall-clock)
+                "throughput_per_second": round(self.dispatched_total / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+            }
+
+
+reminder_lag = registry.histogram(
+    "reminder_lag_seconds", "Delay between a reminder's reminder_at and its notification.",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+metrics = DispatchMetrics()
+
+
+def pending_reminders():
+    """WHERE clause for reminders not sent yet; literal false so SQLite can use the partial index."""
+    return Todo.notified == false()
+
+
+_DUE_REMINDERS = (
+    select(Todo.id, Todo.owner_id)
+    .where(pending_reminders(), Todo.reminder_at <= bindparam("now"))
+    .order_by(Todo.reminder_at)
+    .limit(bindparam("limit"))
+)
+_LOCK_OWNERS = (
+    select(User.id)
+    .where(User.id.in_(bindparam("owner_ids", expanding=True)))
+    .order_by(User.id)
+    .with_for_update(skip_locked=True)
+)
+
+
+def claim_due_reminders(session: Session, now: datetime, limit: int):
+    """
+    Atomically mark up to `limit` due todos as notified and return (id, title, owner_id, reminder_at, recurrence)
+    for the rows this call won.
+    The owners' user rows are locked before their todos, the order every API
+    write takes (touch_user, then the todo), so a dispatch racing a PATCH of the
+    same todo waits instead of deadlocking. Owners locked by another dispatcher
+    are skipped along with their todos; the next run picks those up.
+    """
+    due = session.execute(_DUE_REMINDERS, {"now": now, "limit": limit}).all()
+    if not due:
+        return []
+    owners = set(session.execute(_LOCK_OWNERS, {"owner_ids": sorted({row.owner_id for row in due})}).scalars())
+    todo_ids = [row.id for row in due if row.owner_id in owners]
+    if not todo_ids:
+        return []
+    stmt = (
+        update(Todo)
+        # re-checked under the lock: a write that got in first may have changed the reminder
+        .where(Todo.id.in_(todo_ids), pending_reminders(), Todo.reminder_at <= now)
+        .values(notified=True, updated_at=now)
+        .returning(Todo.id, Todo.title, Todo.owner_id, Todo.reminder_at, Todo.recurrence)
+        .execution_options(synchronize_session=False)
+    )
+    return session.execute(stmt).all()
+
+
+def rearm_recurring(claimed, now: datetime) -> List[dict]:
+    """
+    Bulk UPDATE rows that put each claimed recurring todo back in the pending set
+    at its next occurrence. Todos firing together mostly share a rule and
+    reminder_at, so each distinct pair is computed once.
+    """
+    upcoming, rows = {}, []
+    for row in claimed:
+        if not row.recurrence:
+            continue
+        key = (row.recurrence, row.reminder_at)
+        if key not in upcoming:
+            try:
+                upcoming[key] = next_occurrence(row.recurrence, row.reminder_at, now)
+            except ValueError:
+                # only possible for rules written around the API; treat the todo as one-shot
+                logger.warning("Todo id=%s has an invalid recurrence %r", row.id, row.recurrence)
+                upcoming[key] = None
+        if upcoming[key] is not None:
+            rows.append({"id": row.id, "reminder_at": upcoming[key], "notified": False})
+    return rows
+
+
+def dispatch_due_reminders(batch_size: int = REMINDER_BATCH_SIZE) -> int:
+    """
+    Create a Notification for every due todo, one bounded transaction per batch.
+    Returns how many reminders were sent.
+    """
+    started = time.perf_counter()
+    sent = 0
+    while True:
+        now = datetime.now()  # naive local time, same as the stored reminder_at values
+        with Session(engine) as session:
+            claimed = claim_due_reminders(session, now, batch_size)
+            if claimed:
+                rearm = rearm_recurring(claimed, now)
+                rearmed = {row["id"] for row in rearm}
+                # per owner: new notifications, and reminders no longer pending (one-shot ones)
+                per_owner = {}
+                for row in claimed:
+                    sent_count, done = per_owner.get(row.owner_id, (0, 0))
+                    per_owner[row.owner_id] = (sent_count + 1, done + (row.id not in rearmed))
+                # one UPDATE per distinct per-owner change (almost always just "+1")
+                for change in set(per_owner.values()):
+                    owners = [owner for owner, c in per_owner.items() if c == change]
+                    session.execute(bump_data_version(User.id.in_(owners), unread_delta=change[0], counts=TodoCounts(reminders=-change[1])))
+                # notified / the next reminder_at changed: GET /todos/changes reports these rows
+                session.execute(stamp_changes(Todo.id.in_([row.id for row in claimed])))
+                session.execute(
+                    insert(Notification),
+                    [
+                        {
+                            "title": f"Reminder for todo #{row.id}",
+                            "message": f"Reminder: {row.title}",
+                            "todo_id": row.id,
+                            "user_id": row.owner_id,
+                            "created_at": now,
+                        }
+                        for row in claimed
+                    ],
+                )
+                if rearm:
+                    session.execute(update(Todo), rearm)
+            session.commit()
+        metrics.record_batch(len(claimed), [(now - row.reminder_at).total_seconds() for row in claimed])
+        for row in claimed:
+            event = make_event(
+                "notification",
+                {"title": f"Reminder for todo #{row.id}", "message": f"Reminder: {row.title}", "todo_id": row.id, "created_at": now},
+            )
+            publish_safely(broker.publish, [row.owner_id], event)
+            logger.info(f"Reminder created for Todo id={row.id}, owner_id={row.owner_id}, reminder_at={row.reminder_at}")
+        sent += len(claimed)
+        if len(claimed) < batch_size:
+            break
+    metrics.record_run(time.perf_counter() - started)
+    return sent
+
+
+def next_reminder_at() -> Optional[datetime]:
+    """Earliest pending reminder_at (an index lookup on the partial index)."""
+    with Session(engine) as session:
+        return session.exec(select(func.min(Todo.reminder_at)).where(pending_reminders())).one()
+
+
+class ReminderDispatcher(PeriodicWorker):
+    """
+    Background thread that sleeps until the next reminder is due (at most interval seconds).
+    poke() wakes it early, e.g. after a todo's reminder_at was set in this process.
+    """
+
+    name = "reminder-dispatcher"  # dispatch_due_reminders records its own metrics
+
+    def __init__(self, batch_size: int = REMINDER_BATCH_SIZE, interval: float = REMINDER_MAX_IDLE_SECONDS):
+        super().__init__(interval)
+        self.batch_size = batch_size
+
+    def run_once(self) -> None:
+        dispatch_due_reminders(self.batch_size)
+
+    def next_wait(self) -> float:
+        next_at = next_reminder_at()
+        if next_at is None:
+            return self.interval
+        return min(max((next_at - datetime.now()).total_seconds(), 0.0), self.interval)
+
+
+dispatcher = ReminderDispatcher()
+
+
+if __name__ == "__main__":
+    # Standalone dispatcher, separate from the API: python -m app.reminders
+    logging.basicConfig(level=logging.INFO)
+    try:
+        dispatcher.run_forever()
+    except KeyboardInterrupt:
+        pass
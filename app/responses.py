@@ -0,0 +1,37 @@
+from typing import List
+
+import orjson
+from fastapi.responses import JSONResponse
+
+# -------------------------
+# JSON rendering
+# -------------------------
+# Routes with a response_model are serialized by FastAPI itself: it validates
+# the return value and has pydantic write JSON bytes directly. That is not the
+# app-wide default class on purpose -- any response_class other than the
+# default makes FastAPI fall back to dump-to-dict-then-render.
+#
+# The list endpoints (GET /todos/, /todos/search, /notifications, /me/dashboard)
+# skip that step entirely: they select just the TodoRead / NotificationRead
+# columns and return an ORJSONResponse built from the row tuples, so no ORM
+# instances are loaded and nothing is validated per row. The columns are
+# exactly the read schema's fields (crud.TODO_READ_COLUMNS, ...), so the JSON
+# has the shape the response_model documents.
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+def read_columns(table, schema) -> tuple:
+    """table's columns for every field of a read schema, in schema order."""
+    return tuple(getattr(table, name) for name in schema.model_fields)
+
+
+def rows_as_dicts(rows) -> List[dict]:
+    """Result rows of a column select -> [{column: value}] ready for orjson."""
+    if not rows:
+        return []
+    names = rows[0]._fields
+    return [dict(zip(names, row)) for row in rows]
@@ -0,0 +1,95 @@
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.crud import bump_data_version
+from app.database import engine
+from app.models import Notification, User
+from app.sync import purge_tombstones
+from app.workers import PeriodicWorker
+
+logger = logging.getLogger("todo_retention")
+
+# -------------------------
+# Notification retention
+# -------------------------
+# Read notifications older than NOTIFICATION_RETENTION_DAYS are deleted in
+# batches of RETENTION_BATCH_SIZE, one short transaction each, found through
+# the partial ix_notification_read_at index. Unread notifications are never
+# purged, so the unread counters stay correct. With this running, the table
+# holds roughly "unread + the last N days of read" rows per user.
+# The same worker drops delta-sync tombstones past their retention (app/sync.py).
+# It runs in one process for the whole deployment: `python -m app.retention`
+# (`python -m app.retention --once` purges once, e.g. from cron).
+
+NOTIFICATION_RETENTION_DAYS = float(os.getenv("NOTIFICATION_RETENTION_DAYS", "30"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "5000"))
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+# Run the purge inside this API worker. Off by default: every worker would run the
+# same purge; set to 1 only when there is a single API worker.
+RUN_RETENTION = os.getenv("RUN_RETENTION", "0") == "1"
+
+
+def purge_read_notifications(older_than: Optional[datetime] = None, batch_size: int = RETENTION_BATCH_SIZE) -> int:
+    """
+    Delete read notifications whose read_at is before older_than (default: now minus
+    NOTIFICATION_RETENTION_DAYS). Returns how many were deleted.
+    """
+    if older_than is None:
+        older_than = datetime.now() - timedelta(days=NOTIFICATION_RETENTION_DAYS)
+    purged = 0
+    while True:
+        with Session(engine) as session:
+            batch = select(Notification.id).where(Notification.read_at < older_than).limit(batch_size)
+            owners = session.execute(
+                delete(Notification)
+                .where(Notification.id.in_(batch.scalar_subquery()))
+                .returning(Notification.user_id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            if owners:
+                # the purged rows may still be on a cached dashboard
+                session.execute(bump_data_version(User.id.in_(set(owners))))
+            session.commit()
+        purged += len(owners)
+        if len(owners) < batch_size:
+            return purged
+
+
+class RetentionWorker(PeriodicWorker):
+    """Background thread running purge_read_notifications every interval seconds."""
+
+    name = "notification-retention"
+    job = "notification_retention"
+
+    def __init__(self, interval: float = RETENTION_INTERVAL_SECONDS):
+        super().__init__(interval)
+
+    def run_once(self) -> None:
+        purged = purge_read_notifications()
+        if purged:
+            logger.info("Purged %s read notifications", purged)
+        purged = purge_tombstones()
+        if purged:
+            logger.info("Purged %s todo tombstones", purged)
+
+
+retention_worker = RetentionWorker()
+
+
+if __name__ == "__main__":
+    # Standalone purge, separate from the API: python -m app.retention [--once]
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] == ["--once"]:
+        logger.info("Purged %s read notifications", purge_read_notifications())
+        logger.info("Purged %s todo tombstones", purge_tombstones())
+    else:
+        try:
+            retention_worker.run_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,161 @@
+import hmac
+import ipaddress
+import os
+from fastapi import APIRouter,Body,Depends,HTTPException,Request,Response,status
+from fastapi.responses import PlainTextResponse
+from sqlmodel import Session
+from app import crud
+from app.auth import auth_cache_stats,get_current_admin,invalidate_user
+from app.database import get_session
+from app.events import broker as event_broker
+from app.hashing import hash_pool
+from app.jobs import get_job,submit_job
+from app.metrics import registry as metrics_registry,render_metrics
+from app.models import AdminTodoStats,UserPrincipal
+from app.reminders import metrics as reminder_metrics
+from app.stats import all_stats
+
+router=APIRouter()
+
+#----------------------------
+#ADMIN:list all users(admin only)   
+#----------------------------
+
+@router.get("/admin/users/",response_model=list[dict])
+def admin_list_users(session:Session=Depends(get_session),admin:UserPrincipal=Depends(get_current_admin)):
+    """
+    Return minimal info for all users.
+    """
+    return crud.list_users(session)
+
+#----------------------------
+#ADMIN:todo statistics over all users(admin only)
+#----------------------------
+
+@router.get("/admin/stats",response_model=AdminTodoStats)
+def admin_stats(session:Session=Depends(get_session),admin:UserPrincipal=Depends(get_current_admin)):
+    """
+    /me/stats summed over every user, plus the number of users.
+    """
+    return all_stats(session)
+
+#-----------------------------
+#ADMIN:delete user
+#-----------------------------
+@router.delete("/admin/users/{user_id}",status_code=status.HTTP_204_NO_CONTENT)
+def admin_delete_user(user_id:int,session:Session=Depends(get_session),admin:UserPrincipal=Depends(get_current_admin)):
+    # delete the user's notifications, todos and the user itself with bulk DELETEs
+    if not crud.delete_user_cascade(session,user_id):
+        raise HTTPException(status_code=404,detail="user not found")
+    session.commit()
+    # drop cached tokens so the deleted user is rejected on the next request
+    invalidate_user(user_id)
+    return None
+
+#-----------------------------
+#ADMIN:reminder dispatcher metrics
+#-----------------------------
+@router.get("/admin/reminders/stats")
+def admin_reminder_stats(admin:UserPrincipal=Depends(get_current_admin)):
+    """
+    Dispatch lag and throughput of this process's reminder dispatcher.
+    """
+    return reminder_metrics.snapshot()
+
+#-----------------------------
+#ADMIN:auth cache counters
+#-----------------------------
+@router.get("/admin/auth-cache")
+def admin_auth_cache_stats(admin:UserPrincipal=Depends(get_current_admin)):
+    """
+    Hit/miss counters of this worker's authenticated-user cache and password-hashing pool load.
+    """
+    return {**auth_cache_stats(), "hashing": hash_pool.stats()}
+
+#-----------------------------
+#ADMIN:push stream counters
+#-----------------------------
+@router.get("/admin/events/stats")
+def admin_event_stats(admin:UserPrincipal=Depends(get_current_admin)):
+    """
+    Open notification streams and published/delivered/dropped event counts of this worker.
+    """
+    return event_broker.stats()
+
+#-----------------------------
+#Prometheus metrics (METRICS_TOKEN bearer or a METRICS_ALLOWED_IPS address, see require_metrics_access)
+#-----------------------------
+def runtime_metrics() -> dict:
+    """Gauges/counters read from the dispatcher, hashing pool, event broker and auth cache at scrape time."""
+    reminders, hashing, events, auth = reminder_metrics.snapshot(), hash_pool.stats(), event_broker.stats(), auth_cache_stats()
+    return {
+        "reminders_dispatched_total": ("counter", "Reminders sent by this worker's dispatcher.", reminders["dispatched_total"]),
+        "reminder_last_lag_seconds": ("gauge", "Lag of the most recent reminder batch.", reminders["last_lag_seconds"]),
+        "hashing_in_flight": ("gauge", "Password hashes running or queued.", hashing["in_flight"]),
+        "hashing_rejected_total": ("counter", "Password hashes rejected because the pool was full.", hashing["rejected"]),
+        "event_stream_connections": ("gauge", "Open notification streams.", events["connections"]),
+        "events_dropped_total": ("counter", "Events dropped from slow streams' queues.", events["dropped"]),
+        "auth_cache_hits_total": ("counter", "Authenticated-user cache hits.", auth.get("hits")),
+        "auth_cache_misses_total": ("counter", "Authenticated-user cache misses.", auth.get("misses")),
+    }
+
+metrics_registry.add_collector(runtime_metrics)
+
+# Who may scrape /metrics (it exposes traffic, users and internals):
+# a request is let through if it presents METRICS_TOKEN as a bearer token, or
+# comes from an address in METRICS_ALLOWED_IPS (comma-separated IPs or CIDRs,
+# loopback by default; set it to "" to require the token).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = [
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if entry.strip()
+]
+
+def metrics_access_allowed(authorization: str, client_host: str) -> bool:
+    if METRICS_TOKEN and hmac.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        return True
+    try:
+        address = ipaddress.ip_address(client_host)
+    except ValueError:
+        return False
+    return any(address in network for network in METRICS_ALLOWED_IPS)
+
+def require_metrics_access(request: Request) -> None:
+    client_host = request.client.host if request.client else ""
+    if not metrics_access_allowed(request.headers.get("authorization", ""), client_host):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to read metrics")
+
+@router.get("/metrics",response_class=PlainTextResponse,include_in_schema=False,dependencies=[Depends(require_metrics_access)])
+def metrics_endpoint():
+    return PlainTextResponse(render_metrics(),media_type="text/plain; version=0.0.4")
+
+# ----------------------------
+# ADMIN: bulk-notify all users (store Notification rows for everyone)
+# ----------------------------
+# Above this many users (by id range) the fan-out runs as a background job
+BULK_NOTIFY_INLINE_MAX_USERS = int(os.getenv("BULK_NOTIFY_INLINE_MAX_USERS", "10000"))
+
+@router.post("/admin/bulk-notify",status_code=status.HTTP_201_CREATED)
+def admin_bulk_notify(response: Response, title: str = Body(..., embed=True), message: str = Body(..., embed=True),session:Session=Depends(get_session),admin:UserPrincipal=Depends(get_current_admin)):
+    """
+    Create a Notification for each non-admin user.
+    Example POST body:
+      {"title":"System maintenance", "message":"Service will be down at 02:00 UTC"}
+    Small user bases are handled inline (201 {"created": n}). Larger fan-outs run
+    as a background job: 202 {"job_id": ...}, poll GET /admin/jobs/{job_id} for progress.
+    """
+    if crud.max_user_id(session) <= BULK_NOTIFY_INLINE_MAX_USERS:
+        return {"created": crud.notify_all_users(title, message)}
+    job = submit_job("bulk-notify", lambda job: {"created": crud.notify_all_users(title, message, job.progress)})
+    response.status_code = status.HTTP_202_ACCEPTED
+    return {"job_id": job.id, "status_url": f"/admin/jobs/{job.id}"}
+
+#-----------------------------
+#ADMIN:background job progress
+#-----------------------------
+@router.get("/admin/jobs/{job_id}")
+def admin_job_status(job_id: str, admin:UserPrincipal=Depends(get_current_admin)):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
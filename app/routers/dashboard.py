@@ -0,0 +1,41 @@
+from fastapi import APIRouter,Depends,Request
+from sqlmodel import Session
+from app import crud
+from app.auth import get_current_user
+from app.dashboard import DashboardParams,dashboard_etag,not_modified_or_cached,render_dashboard
+from app.database import get_session
+from app.models import DashboardResponse,TodoStats,UserPrincipal
+from app.stats import user_stats
+
+router=APIRouter()
+# endpoints with an async twin in app/async_api.py
+sync_router=APIRouter()
+
+# ------------------------
+# Dashboard Endpoint
+# ------------------------
+@sync_router.get("/me/dashboard",response_model=DashboardResponse)
+def my_dashboard(request:Request,params:DashboardParams=Depends(),session:Session=Depends(get_session),current_user:UserPrincipal=Depends(get_current_user)):
+    """
+    Most recent todos and notifications of the current user, with an ETag.
+    Send it back as If-None-Match to get a 304 when nothing changed.
+    """
+    version=crud.data_version(session,current_user.id)
+    etag=dashboard_etag(current_user.id,version,params)
+    short_circuit=not_modified_or_cached(request,etag)
+    if short_circuit is not None:
+        return short_circuit
+    todos,notifications=crud.dashboard_rows(session,current_user.id,params.todo_limit,params.notification_limit)
+    return render_dashboard(etag,todos,notifications)
+
+
+# ------------------------
+# Todo statistics
+# ------------------------
+@router.get("/me/stats",response_model=TodoStats)
+def my_stats(session:Session=Depends(get_session),current_user:UserPrincipal=Depends(get_current_user)):
+    """
+    Total, completed, open and overdue todos and pending reminders of the current user.
+    Read from counters kept on the user row (see app/stats.py), not by scanning todos.
+    """
+    return user_stats(session,current_user.id)
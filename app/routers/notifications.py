@@ -0,0 +1,59 @@
+from fastapi import APIRouter,Depends
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+from app import crud
+from app.auth import get_current_user,get_stream_user
+from app.database import get_session
+from app.events import sse_stream
+from app.models import NotificationPage,NotificationReadRequest,NotificationReadResponse,UserPrincipal
+from app.pagination import NotificationListParams
+from app.responses import ORJSONResponse
+
+# router: always mounted. sync_router: endpoints with an async twin in app/async_api.py
+router=APIRouter()
+sync_router=APIRouter()
+
+#-----------------
+#Notification endpoints
+#-----------------
+@sync_router.get("/notifications", response_model=NotificationPage)
+def list_notifications(
+    params: NotificationListParams = Depends(),
+    session: Session = Depends(get_session),
+    current_user: UserPrincipal = Depends(get_current_user),
+):
+    """
+    Return one page of the user's notifications (newest first by default).
+    ?unread=true / false returns only unread / read ones.
+    Pass the returned next_cursor back as ?cursor= to get the following page.
+    """
+    return ORJSONResponse(crud.list_notifications(session, current_user.id, params))
+
+@sync_router.get("/notifications/unread-count")
+def unread_notification_count(session: Session = Depends(get_session), current_user: UserPrincipal = Depends(get_current_user)):
+    return {"unread": crud.unread_count(session, current_user.id)}
+
+@sync_router.post("/notifications/read", response_model=NotificationReadResponse)
+def mark_notifications_read(body: NotificationReadRequest, session: Session = Depends(get_session), current_user: UserPrincipal = Depends(get_current_user)):
+    """
+    Mark notifications read in one UPDATE.
+    Example POST bodies: {"ids": [4, 7]}, {"up_to_id": 120} (everything seen so far) or {"all": true}
+    Already-read and other users' ids are ignored.
+    """
+    marked = crud.mark_notifications_read(session, current_user.id, body)
+    session.commit()
+    return {"marked": marked, "unread": crud.unread_count(session, current_user.id)}
+
+@router.get("/notifications/stream")
+async def notification_stream(current_user: UserPrincipal = Depends(get_stream_user)):
+    """
+    Server-sent events: an `event: notification` is pushed whenever a reminder or
+    bulk notification is created for the current user, instead of polling GET /notifications.
+    Authenticate with the usual Bearer header, or ?token=<jwt> from a browser EventSource.
+    Events are not replayed after a reconnect; refetch GET /notifications then.
+    """
+    return StreamingResponse(
+        sse_stream(current_user.id, current_user.is_admin),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
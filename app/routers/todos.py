@@ -1,6 +1,224 @@
-from fastapi import APIRouter,Depends,HTTPException,status
+from typing import Literal
+from fastapi import APIRouter,Depends,HTTPException,Request,status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session
+from app import crud
+from app.auth import get_current_user,get_current_user_sessionless
 from app.database import get_session
-from app.models import Todo,TodoBase
-from app.crud import create_todo
+from app.models import Todo,TodoBatchRequest,TodoBatchResponse,TodoChanges,TodoCreate,TodoPage,TodoRead,TodoUpdate,UserPrincipal
+from app.pagination import TodoListParams
+from app.reminders import dispatcher as reminder_dispatcher
+from app.responses import ORJSONResponse
+from app.search import TodoSearchParams,search_page,search_statement,todos_by_ids
+from app.sync import ChangesParams,changes_page
+from app.transfer import MEDIA_TYPES,export_todos,import_todos as import_todo_stream
 
+# router: always mounted. sync_router: endpoints with an async twin in app/async_api.py.
+# app/main.py includes router first so /todos/batch, /todos/export,
+# /todos/import and /todos/changes are matched before /todos/{todo_id}.
+router=APIRouter()
+sync_router=APIRouter()
+
+def commit_todo(session: Session, todo: Todo) -> Todo:
+    """
+    Commit a new/changed todo. The (owner_id, title) unique index turns a
+    duplicate title (or a race between two creates) into a clean 400; any
+    other integrity error is a bug and propagates.
+    """
+    session.add(todo)
+    try:
+        # bump first: the new version is the row's change_seq (written by the same flush)
+        with session.no_autoflush:
+            todo.change_seq = session.execute(*crud.touch_user(todo.owner_id, crud.pending_counts_change(todo))).scalar_one()
+        session.flush()
+        session.commit()
+    except IntegrityError as error:
+        session.rollback()
+        if not crud.is_duplicate_title(error):
+            raise
+        raise HTTPException(status_code=400, detail="You already have a todo with this title.")
+    session.refresh(todo)
+    if todo.reminder_at is not None and not todo.notified:
+        # wake the dispatcher so it can re-plan its sleep around the new reminder
+        reminder_dispatcher.poke()
+    return todo
+
+# ----------------------------
+# CREATE TODO (owner is current user)
+# ----------------------------
+@sync_router.post("/todos/", response_model=TodoRead, status_code=status.HTTP_201_CREATED)
+def create_todo(todo_in: TodoCreate, session: Session = Depends(get_session), current_user: UserPrincipal = Depends(get_current_user)) -> Todo:
+    if crud.title_taken(session, current_user.id, todo_in.title):
+        raise HTTPException(status_code=400, detail="You already have a todo with this title.")
+
+    return commit_todo(session, crud.new_todo(todo_in, current_user.id))
+
+
+# ----------------------------
+# BATCH create/update/complete/delete (owner is current user)
+# ----------------------------
+@router.post("/todos/batch", response_model=TodoBatchResponse)
+def batch_todos(batch: TodoBatchRequest, session: Session = Depends(get_session), current_user: UserPrincipal = Depends(get_current_user)):
+    """
+    Apply many operations in one request and one transaction.
+    Example POST body:
+      {"operations": [
+          {"op": "create", "todo": {"title": "Buy milk"}},
+          {"op": "update", "id": 3, "changes": {"description": "2 litres"}},
+          {"op": "complete", "id": 4},
+          {"op": "delete", "id": 5}]}
+    Each operation gets its own result; invalid ones (unknown id, duplicate title)
+    are reported and skipped while the others are applied.
+    """
+    if len(batch.operations) > crud.BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {crud.BATCH_MAX_OPERATIONS} operations.")
+    try:
+        results = crud.apply_todo_batch(session, current_user.id, batch.operations)
+        session.commit()
+    except IntegrityError as error:
+        # e.g. a concurrent write took one of the titles after validation
+        session.rollback()
+        if not crud.is_duplicate_title(error):
+            raise
+        raise HTTPException(status_code=400, detail="Batch conflicts with an existing todo title; nothing was applied.")
+    if crud.batch_sets_reminder(batch.operations):
+        reminder_dispatcher.poke()
+    applied = sum(1 for r in results if r.ok)
+    return {"applied": applied, "failed": len(results) - applied, "results": results}
+
+# ----------------------------
+# EXPORT / IMPORT todos as NDJSON or CSV (streamed both ways)
+# ----------------------------
+@router.get("/todos/export")
+def export_my_todos(format: Literal["ndjson","csv"]="ndjson", current_user: UserPrincipal = Depends(get_current_user_sessionless)):
+    """
+    Stream all of the current user's todos, oldest first: one JSON object per line
+    (ndjson) or a CSV file with a header row.
+    """
+    return StreamingResponse(
+        export_todos(current_user.id, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="todos.{format}"'},
+    )
+
+@router.post("/todos/import")
+async def import_my_todos(request: Request, format: Literal["ndjson","csv"]="ndjson", current_user: UserPrincipal = Depends(get_current_user_sessionless)):
+    """
+    Create todos from an uploaded file (send the file as the raw request body).
+      - ndjson: one object per line with title and optionally description, completed, due_date, reminder_at, recurrence
+      - csv: header row with those column names (other columns, e.g. from an export, are ignored)
+    Titles you already have (or repeated in the file) are skipped as duplicates.
+    Returns {"imported", "duplicates", "invalid", "errors": [{"line", "error"}, ...]}.
+    """
+    result = await import_todo_stream(current_user.id, request.stream(), format)
+    if result.pop("has_reminders"):
+        reminder_dispatcher.poke()
+    return result
+
+# ----------------------------
+# DELTA SYNC: what changed since the last sync token
+# ----------------------------
+@router.get("/todos/changes",response_model=TodoChanges)
+def todo_changes(params: ChangesParams = Depends(), session: Session = Depends(get_session), current_user: UserPrincipal = Depends(get_current_user)):
+    """
+    Todos created or changed since ?since= plus the ids of todos deleted since then.
+    Start without ?since= (every todo), then always pass the returned sync_token back.
+    While has_more is true, call again right away with the new token.
+    A 410 means the token is too old: sync again without ?since=.
+    """
+    return ORJSONResponse(changes_page(session, current_user.id, params))
+
+# ----------------------------
+# READ ALL TODOS for current user
+# ----------------------------
+
+@sync_router.get("/todos/",response_model=TodoPage)
+def list_todos(
+    params: TodoListParams = Depends(),
+    session: Session = Depends(get_session),
+    current_user: UserPrincipal = Depends(get_current_user),
+):
+    '''
+    Return one page of the current user's todos.
+      - sort: updated_at or created_at, prefix with '-' for descending (default -updated_at)
+      - filters: completed, due_after / due_before (inclusive), has_reminder
+      - pass the returned next_cursor back as ?cursor= to get the following page
+    '''
+    return ORJSONResponse(crud.list_todos(session, current_user.id, params))
+
+# ----------------------------
+# SEARCH todos by title/description (registered before /todos/{todo_id})
+# ----------------------------
+
+@sync_router.get("/todos/search",response_model=TodoPage)
+def search_todos(
+    params: TodoSearchParams = Depends(),
+    session: Session = Depends(get_session),
+    current_user: UserPrincipal = Depends(get_current_user),
+):
+    '''
+    Full-text search over the current user's todos, best matches first.
+      - every word in ?q= must match a title or description word, as a prefix ("mil" finds "milk")
+      - titles weigh more than descriptions
+      - paginate with ?limit= and ?cursor= like GET /todos/; ranks move when todos are
+        written, so pages fetched across writes may skip or repeat a match (see app/search.py)
+    '''
+    hits = session.execute(*search_statement(session.get_bind().dialect.name, current_user.id, params)).all()
+    todos = session.execute(*todos_by_ids(current_user.id, [hit.id for hit in hits])).all() if hits else []
+    return ORJSONResponse(search_page(hits, todos, params))
+
+# ----------------------------
+# READ a single todo (only if owned by current user)
+# ----------------------------
+
+@sync_router.get("/todos/{todo_id}",response_model=TodoRead)
+def get_todo(todo_id:int,session:Session=Depends(get_session),current_user:UserPrincipal=Depends(get_current_user))->Todo:
+    """
+    Return single Todo by primary key id.
+    """
+    todo=crud.get_owned_todo(session,todo_id,current_user.id)
+
+    if not todo:
+        raise HTTPException(status_code=404,detail="Todo not found")
+    
+    return todo
+
+# ----------------------------
+# PARIAL UPDATE a single todo-only owner(PATCH)
+# ----------------------------
+@sync_router.patch("/todos/{todo_id}",response_model=TodoRead)
+def partial_update(todo_id:int,todo_in:TodoUpdate,session:Session=Depends(get_session),current_user: UserPrincipal = Depends(get_current_user))->Todo:
+    todo=crud.get_owned_todo(session,todo_id,current_user.id)
+    if not todo:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    
+    return commit_todo(session, crud.apply_partial_update(todo, todo_in))
+
+# ----------------------------
+# FULL UPDATE a single todo -only owner(PUT)
+# ----------------------------
+
+@sync_router.put("/todos/{todo_id}",response_model=TodoRead)
+def replace_todo(todo_id:int,todo_in:TodoCreate,session:Session=Depends(get_session),current_user:UserPrincipal=Depends(get_current_user)):
+
+    todo = crud.get_owned_todo(session, todo_id, current_user.id)
+    if not todo:
+        raise HTTPException(status_code=404, detail="Todo not found")
+
+    return commit_todo(session, crud.apply_replace(todo, todo_in))
+
+
+# ----------------------------
+# DELETE a single todo -only owner
+# ----------------------------
+
+@sync_router.delete("/todos/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_todo(todo_id: int, session: Session = Depends(get_session), current_user: UserPrincipal = Depends(get_current_user)):
+    todo = crud.get_owned_todo(session, todo_id, current_user.id)
+    if not todo:
+        raise HTTPException(status_code=404, detail="Todo not found")
+
+    crud.delete_todo(session, todo)
+    session.commit()
+    return None
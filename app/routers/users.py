@@ -0,0 +1,155 @@
+import re
+from fastapi import APIRouter,Depends,HTTPException,Request,status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlmodel import Session
+from app import crud
+from app.auth import authenticate_user_db,check_login_throttle,create_user_access_token,get_password_hash,record_login_result
+from app.database import get_session
+from app.models import UserCreate
+
+# router: always mounted. sync_router: endpoints with an async twin in app/async_api.py
+router=APIRouter()
+sync_router=APIRouter()
+
+def normalize_username_candidate(raw: str) -> str:
+    """
+    Only strip leading/trailing whitespace. Do NOT change spaces internally here;
+    we will reject usernames containing spaces explicitly.
+    """
+    return raw.strip()
+
+# Username must match this: lowercase letters, digits, underscore only
+USERNAME_REGEX = re.compile(r"^[a-z0-9_]+$")
+
+def validate_username(username_raw: str) -> str:
+    """
+    Validate and return the normalized username (stripped).
+    Raises HTTPException(400) if invalid.
+    Rules:
+      - no spaces at all
+      - must be lowercase (reject if contains uppercase)
+      - only a-z, 0-9 and underscore allowed
+    """
+    if username_raw is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username is required")
+    
+    candidate = normalize_username_candidate(username_raw)
+
+
+    # 1) No spaces anywhere
+    if " " in candidate:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username must not contain spaces. Use lowercase letters, digits and underscore only."
+        )
+
+    # 2) Must be lowercase (reject uppercase)
+    if candidate != candidate.lower():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username must be lowercase only (no uppercase letters)."
+        )
+
+    # 3) Only allowed characters
+    if not USERNAME_REGEX.fullmatch(candidate):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username may contain only lowercase letters (a-z), digits (0-9) and underscore (_)."
+        )
+
+    return candidate
+
+
+# -------------------------
+# Password validation helpers
+# -------------------------
+# Define allowed special symbols (choose a small safe set)
+ALLOWED_SYMBOLS = "!@$%&*()-_+="
+# build regex that matches only allowed characters (letters, digits and allowed symbols)
+ALLOWED_PASSWORD_RE = re.compile(rf"^[A-Za-z0-9{re.escape(ALLOWED_SYMBOLS)}]+$")
+
+
+def validate_password_strength(password: str, min_length: int = 8) -> None:
+    """
+    Validate password:
+      - minimum length (default 8)
+      - at least one uppercase letter
+      - at least one lowercase letter
+      - at least one digit
+      - at least one allowed symbol from ALLOWED_SYMBOLS
+      - only characters from the allowed set are permitted
+    Raises HTTPException(400) when invalid with a clear message.
+    """
+    if password is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password is required")
+    errors = []
+    if len(password) < min_length:
+        errors.append(f"at least {min_length} characters")
+    if not re.search(r"\d", password):
+        errors.append("at least one digit")
+    if not re.search(r"[A-Z]", password):
+        errors.append("at least one uppercase letter")
+    if not re.search(r"[a-z]", password):
+        errors.append("at least one lowercase letter")
+    if not re.search(rf"[{re.escape(ALLOWED_SYMBOLS)}]", password):
+        errors.append(f"at least one symbol from this set: {ALLOWED_SYMBOLS}")
+    
+    # ensure every character is allowed (prevent unexpected special chars)
+    if not ALLOWED_PASSWORD_RE.fullmatch(password):
+        errors.append(f"password contains invalid character(s). Allowed symbols: {ALLOWED_SYMBOLS}")
+
+    if errors:
+        # Build a single readable message
+        msg = "Password must contain " + ", ".join(errors) + "."
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=msg)
+
+# ----------------------------
+# User/Admin registration
+# ----------------------------
+@router.post("/register", status_code=status.HTTP_201_CREATED)
+def register(user_in: UserCreate, request: Request, session: Session = Depends(get_session)):
+    """
+    New registration:
+      - validate username (no spaces, lowercase only, allowed chars)
+      - check uniqueness
+      - validate password (strength and allowed chars)
+      - store hashed password and return minimal info
+    """
+    # validate and normalize username
+    normalized = validate_username(user_in.username)
+    
+    # uniqueness check (username stored normalized)
+    if crud.username_taken(session, normalized):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already registered")
+
+    # Validate password strength
+    validate_password_strength(user_in.password)
+
+    # refuse IPs with too many failed logins before spending CPU on argon2 (a registration itself is not counted)
+    check_login_throttle(None, request.client.host if request.client else None)
+
+    #create user
+    hashed = get_password_hash(user_in.password)
+    
+    user = crud.create_user(session, normalized, hashed, user_in.is_admin)
+    # 6) Return minimal info (read before commit expires the instance)
+    created = {"id": user.id, "username": user.username}
+    session.commit()
+    return created
+
+# ----------------------------
+# Token / login
+# ----------------------------
+
+
+@sync_router.post("/token")
+def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+    client_ip = request.client.host if request.client else None
+    check_login_throttle(form_data.username, client_ip)
+    user = authenticate_user_db(session, form_data.username, form_data.password)
+    record_login_result(form_data.username, client_ip, user is not None)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
+
+    access_token = create_user_access_token(user)
+    return {"access_token": access_token, "token_type": "bearer"}
@@ -0,0 +1,174 @@
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import bindparam, column, func, literal_column, table
+from sqlmodel import select
+
+from app.crud import BoundStatement, TODO_READ_COLUMNS
+from app.models import Todo
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_page, keyset_paginate, keyset_params
+from app.responses import rows_as_dicts
+
+# -------------------------
+# Full-text search over todo titles and descriptions
+# -------------------------
+# SQLite: a contentless FTS5 table todo_fts(owner, title, description) whose rowid
+# is the todo id, kept in sync by triggers on todo. The owner column holds a
+# single token ("u<owner_id>") so the owner filter is part of the MATCH and
+# FTS5 only walks that user's postings instead of every user's matches.
+# Postgres: a generated tsvector column todo.search_vector with a GIN index.
+#
+# Every search term is matched as a prefix ("mil" finds "milk"), all terms must
+# match, and results are ordered best match first. Both backends produce a
+# rank where lower is better, so keyset pagination on (rank, id) works the
+# same way as the list endpoint's (updated_at, id).
+#
+# Unlike updated_at, a rank is not fixed per row. SQLite's bm25 is computed
+# from statistics of the whole todo_fts table (term frequencies and average
+# lengths over every user's todos), so any write -- by anyone -- between two
+# page requests can move rows across the cursor: a (rank, id) cursor may then
+# skip or repeat rows. ts_rank only depends on the row itself, so on Postgres
+# only edits to the matching todos do that. Pages are consistent while the
+# corpus doesn't change; clients that need an exact walk should use GET /todos/.
+
+SEARCH_MAX_TERMS = 8
+# relative weight of a title hit vs a description hit
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_SQLITE_DDL = [
+    # prefix='2 3' keeps short prefix queries ("mi*") off the slow full-scan path
+    "CREATE VIRTUAL TABLE IF NOT EXISTS todo_fts USING fts5("
+    "owner, title, description, content='', prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS todo_fts_ai AFTER INSERT ON todo BEGIN "
+    "INSERT INTO todo_fts(rowid, owner, title, description) VALUES (new.id, 'u' || new.owner_id, new.title, new.description); "
+    "END",
+    # contentless tables need the old values to remove a row's postings
+    "CREATE TRIGGER IF NOT EXISTS todo_fts_ad AFTER DELETE ON todo BEGIN "
+    "INSERT INTO todo_fts(todo_fts, rowid, owner, title, description) VALUES ('delete', old.id, 'u' || old.owner_id, old.title, old.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS todo_fts_au AFTER UPDATE OF owner_id, title, description ON todo BEGIN "
+    "INSERT INTO todo_fts(todo_fts, rowid, owner, title, description) VALUES ('delete', old.id, 'u' || old.owner_id, old.title, old.description); "
+    "INSERT INTO todo_fts(rowid, owner, title, description) VALUES (new.id, 'u' || new.owner_id, new.title, new.description); "
+    "END",
+]
+
+_POSTGRES_DDL = [
+    "ALTER TABLE todo ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_todo_search ON todo USING GIN (search_vector)",
+]
+
+
+def create_search_index(conn) -> None:
+    """Create the search table/column, index and triggers if they are missing (idempotent)."""
+    name = conn.dialect.name
+    for ddl in _SQLITE_DDL if name == "sqlite" else _POSTGRES_DDL if name == "postgresql" else []:
+        conn.exec_driver_sql(ddl)
+
+
+def rebuild_search_index(conn) -> None:
+    """Re-index every existing todo (SQLite only; the Postgres column is generated)."""
+    if conn.dialect.name != "sqlite":
+        return
+    conn.exec_driver_sql("INSERT INTO todo_fts(todo_fts) VALUES ('delete-all')")
+    conn.exec_driver_sql(
+        "INSERT INTO todo_fts(rowid, owner, title, description) "
+        "SELECT id, 'u' || owner_id, title, description FROM todo"
+    )
+
+
+def search_terms(q: str) -> List[str]:
+    """
+    Split the user's query into lower-case word terms; punctuation is dropped so
+    nothing the user types is interpreted as FTS/tsquery syntax.
+    """
+    terms = re.findall(r"\w+", q.lower())[:SEARCH_MAX_TERMS]
+    if not terms:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="q must contain at least one word")
+    return terms
+
+
+class TodoSearchParams:
+    """?q=&limit=&cursor= for GET /todos/search (results are ordered by relevance)."""
+    sort = "rank"
+
+    def __init__(
+        self,
+        q: str = Query(..., min_length=1, max_length=200),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+    ):
+        self.terms = search_terms(q)
+        self.limit = limit
+        self.cursor = cursor
+
+
+_todo_fts = table("todo_fts", column("rowid"), column("owner"))
+
+
+def _sqlite_matches():
+    rank = func.bm25(literal_column("todo_fts"), 0.0, TITLE_WEIGHT, DESCRIPTION_WEIGHT)
+    return (
+        select(_todo_fts.c.rowid.label("id"), rank.label("rank"))
+        .where(literal_column("todo_fts").op("MATCH")(bindparam("match")))
+        .subquery()
+    )
+
+
+def _postgres_matches():
+    vector = literal_column("todo.search_vector")
+    query = func.to_tsquery("simple", bindparam("tsquery"))
+    # weights are {D, C, B, A}: titles are weighted A, descriptions B
+    weights = literal_column(f"'{{0, 0, {DESCRIPTION_WEIGHT / TITLE_WEIGHT}, 1}}'::float4[]")
+    # ts_rank is higher-is-better; negate it so both backends sort ascending
+    rank = -func.ts_rank(weights, vector, query)
+    return (
+        select(Todo.id.label("id"), rank.label("rank"))
+        .where(Todo.owner_id == bindparam("owner_id"), vector.op("@@")(query))
+        .subquery()
+    )
+
+
+@lru_cache(maxsize=None)
+def _search_shape(dialect: str, with_cursor: bool):
+    if dialect == "sqlite":
+        matches = _sqlite_matches()
+    elif dialect == "postgresql":
+        matches = _postgres_matches()
+    else:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Search is not supported on this database")
+    statement = select(matches.c.id, matches.c.rank)
+    return keyset_paginate(statement, matches.c.rank, matches.c.id, False, with_cursor)
+
+
+def search_statement(dialect: str, owner_id: int, params: TodoSearchParams) -> BoundStatement:
+    """
+    select (id, rank) of the user's matching todos, one page plus one row.
+    The todos themselves are loaded afterwards with todos_by_ids().
+    """
+    values = keyset_params(params.sort, params.cursor, params.limit)
+    if dialect == "sqlite":
+        values["match"] = f"owner : u{owner_id} AND {{title description}} : (" + " ".join(f'"{t}"*' for t in params.terms) + ")"
+    else:
+        values["owner_id"] = owner_id
+        values["tsquery"] = " & ".join(f"{t}:*" for t in params.terms)
+    return BoundStatement(_search_shape(dialect, "cursor_id" in values), values)
+
+
+_TODOS_BY_IDS = select(*TODO_READ_COLUMNS).where(Todo.id.in_(bindparam("ids", expanding=True)), Todo.owner_id == bindparam("owner_id"))
+
+
+def todos_by_ids(owner_id: int, ids: List[int]) -> BoundStatement:
+    return BoundStatement(_TODOS_BY_IDS, {"ids": ids, "owner_id": owner_id})
+
+
+def search_page(hits, todos, params: TodoSearchParams) -> dict:
+    """Put the loaded todos back in rank order and build the TodoPage."""
+    page = build_page(hits, params.sort, "rank", params.limit)
+    by_id = {todo.id: todo for todo in todos}
+    page["items"] = rows_as_dicts([by_id[hit.id] for hit in page["items"] if hit.id in by_id])
+    return page
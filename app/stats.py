@@ -0,0 +1,148 @@
+import logging
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import bindparam, false, func, or_, true, update
+from sqlmodel import Session, select
+
+from app.crud import max_user_id
+from app.database import engine
+from app.models import Todo, User
+from app.workers import PeriodicWorker
+
+logger = logging.getLogger("todo_stats")
+
+# -------------------------
+# Todo statistics (GET /me/stats, GET /admin/stats)
+# -------------------------
+# Total, completed and pending-reminder counts are counters on the user row
+# (user.todo_count, completed_count, reminder_count) that every write to a
+# user's todos adjusts in its own transaction, through crud.touch_user /
+# bump_data_version -- so reading them is a primary-key lookup whatever the
+# number of todos. Overdue changes with the clock rather than with writes, so
+# it isn't a counter: it is counted from the partial ix_todo_open_due index
+# (open todos with a due date), index-only and proportional to what is overdue.
+#
+# reconcile_todo_counts() recounts the counters from the todo table and fixes
+# the users whose counters drifted (rows written around the API, a lost race
+# between two updates of the same todo). StatsReconciler runs it every
+# STATS_RECONCILE_INTERVAL_SECONDS in one process for the whole deployment:
+# `python -m app.stats` (`python -m app.stats --once` runs it once, e.g. from cron).
+
+STATS_RECONCILE_INTERVAL_SECONDS = float(os.getenv("STATS_RECONCILE_INTERVAL_SECONDS", "21600"))
+# users recounted per transaction
+STATS_RECONCILE_CHUNK = int(os.getenv("STATS_RECONCILE_CHUNK", "1000"))
+# Run the reconciliation inside this API worker. Off by default: every worker would
+# recount every user; set to 1 only when there is a single API worker.
+RUN_STATS_RECONCILER = os.getenv("RUN_STATS_RECONCILER", "0") == "1"
+
+
+def _overdue(*conditions):
+    """Open todos due before :now; literal false so SQLite can use the partial index."""
+    return (
+        select(func.count())
+        .select_from(Todo)
+        .where(*conditions, Todo.completed == false(), Todo.due_date != None, Todo.due_date < bindparam("now"))
+        .scalar_subquery()
+    )
+
+
+_USER_STATS = select(
+    User.todo_count, User.completed_count, User.reminder_count, _overdue(Todo.owner_id == bindparam("user_id"))
+).where(User.id == bindparam("user_id"))
+_ALL_STATS = select(
+    func.coalesce(func.sum(User.todo_count), 0),
+    func.coalesce(func.sum(User.completed_count), 0),
+    func.coalesce(func.sum(User.reminder_count), 0),
+    _overdue(),
+    func.count(),
+).select_from(User)
+
+
+def _stats(total: int, completed: int, reminders: int, overdue: int) -> dict:
+    return {"total": total, "completed": completed, "open": total - completed, "overdue": overdue, "pending_reminders": reminders}
+
+
+def user_stats(session: Session, user_id: int) -> dict:
+    total, completed, reminders, overdue = session.execute(_USER_STATS, {"user_id": user_id, "now": datetime.now()}).one()
+    return _stats(total, completed, reminders, overdue)
+
+
+def all_stats(session: Session) -> dict:
+    """
+    The same over every user: one row per user, and for overdue the whole
+    ix_todo_open_due index (admin only).
+    """
+    total, completed, reminders, overdue, users = session.execute(_ALL_STATS, {"now": datetime.now()}).one()
+    return {**_stats(total, completed, reminders, overdue), "users": users}
+
+
+def _recount(*conditions):
+    return select(func.count()).select_from(Todo).where(Todo.owner_id == User.id, *conditions).scalar_subquery()
+
+
+_RECOUNTS = {
+    "todo_count": _recount(),
+    "completed_count": _recount(Todo.completed == true()),
+    "reminder_count": _recount(Todo.reminder_at != None, Todo.notified == false()),
+}
+_IN_CHUNK = (User.id > bindparam("start"), User.id <= bindparam("end"))
+_LOCK_CHUNK = select(User.id).where(*_IN_CHUNK).with_for_update()
+_RECONCILE_CHUNK = (
+    update(User)
+    .where(*_IN_CHUNK, or_(*(getattr(User, name) != count for name, count in _RECOUNTS.items())))
+    .values(**_RECOUNTS)
+    .execution_options(synchronize_session=False)
+)
+
+
+def reconcile_todo_counts(chunk_size: int = STATS_RECONCILE_CHUNK) -> int:
+    """
+    Recount every user's todo counters over user-id ranges, one short
+    transaction per range, and fix the ones that differ.
+    Returns how many users had drifted.
+    """
+    with Session(engine) as session:
+        last_id = max_user_id(session)
+    repaired = 0
+    for start in range(0, last_id, chunk_size):
+        values = {"start": start, "end": start + chunk_size}
+        with Session(engine) as session:
+            # writers bump the user row before touching its todos; once the rows are
+            # locked, the recount sees every committed write and later ones add on top
+            session.execute(_LOCK_CHUNK, values)
+            repaired += session.execute(_RECONCILE_CHUNK, values).rowcount
+            session.commit()
+    return repaired
+
+
+class StatsReconciler(PeriodicWorker):
+    """Background thread running reconcile_todo_counts every interval seconds."""
+
+    name = "stats-reconciler"
+    job = "stats_reconcile"
+    delay_first_run = True  # a restart doesn't need a full recount
+
+    def __init__(self, interval: float = STATS_RECONCILE_INTERVAL_SECONDS):
+        super().__init__(interval)
+
+    def run_once(self) -> None:
+        repaired = reconcile_todo_counts()
+        if repaired:
+            logger.warning("Repaired drifted todo counters of %s users", repaired)
+
+
+stats_reconciler = StatsReconciler()
+
+
+if __name__ == "__main__":
+    # Standalone reconciler, separate from the API: python -m app.stats [--once]
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] == ["--once"]:
+        logger.info("Repaired drifted todo counters of %s users", reconcile_todo_counts())
+    else:
+        try:
+            stats_reconciler.run_forever()
+        except KeyboardInterrupt:
+            pass
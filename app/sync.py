@@ -0,0 +1,144 @@
+import base64
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import bindparam, delete, literal_column, union_all
+from sqlmodel import Session, select
+
+from app.crud import TODO_READ_COLUMNS, data_version_statement
+from app.database import engine
+from app.models import Todo, TodoTombstone
+from app.responses import rows_as_dicts
+
+# -------------------------
+# Delta sync (GET /todos/changes)
+# -------------------------
+# user.data_version is bumped in every transaction that writes a user's todos
+# (crud.touch_user / bump_data_version), under the user row's lock, so it is a
+# per-user change sequence: a version becomes visible only after everything
+# stamped with a lower one has committed. Each written todo records the version
+# of its transaction in todo.change_seq; each deleted one leaves a TodoTombstone
+# with it. A sync token holds the version the client is up to date with, and a
+# sync returns the rows in (token, current version] through the
+# (owner_id, change_seq) indexes -- proportional to what changed.
+#
+# Pages are cut at change_seq boundaries so a token never splits a transaction;
+# a single write that changed more than `limit` todos comes back whole.
+# Tombstones are kept SYNC_TOMBSTONE_RETENTION_DAYS (purged by app/retention.py);
+# an older token gets 410 and the client starts over without ?since=.
+
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+SYNC_MAX_PAGE_SIZE = int(os.getenv("SYNC_MAX_PAGE_SIZE", "5000"))
+SYNC_TOMBSTONE_RETENTION_DAYS = float(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+
+
+def encode_sync_token(change_seq: int) -> str:
+    """Opaque token: the version synced up to and when it was issued (for expiry)."""
+    raw = json.dumps({"v": change_seq, "t": int(time.time())}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> int:
+    """
+    The change_seq in a token. 400 if it is malformed, 410 if it is older than
+    the tombstone retention (deletions since then may have been purged).
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode((token + "=" * (-len(token) % 4)).encode()))
+        change_seq, issued = int(payload["v"]), float(payload["t"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token")
+    if time.time() - issued > SYNC_TOMBSTONE_RETENTION_DAYS * 86400:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Sync token expired; sync again without ?since=")
+    return change_seq
+
+
+class ChangesParams:
+    """
+    ?since=&limit= for GET /todos/changes
+      - since: the sync_token of the previous response; omit it for a full sync
+      - limit: page size (a page can be bigger when one write changed more todos)
+    """
+
+    def __init__(self, since: Optional[str] = None, limit: int = Query(SYNC_PAGE_SIZE, ge=1, le=SYNC_MAX_PAGE_SIZE)):
+        self.full = since is None
+        # -1 so a full sync also returns rows written before change_seq existed (0)
+        self.since = -1 if since is None else decode_sync_token(since)
+        self.limit = limit
+
+
+def _in_range(change_seq):
+    return [change_seq > bindparam("since"), change_seq <= bindparam("upto")]
+
+
+def _first_changes(table):
+    return (
+        select(table.change_seq)
+        .where(table.owner_id == bindparam("owner_id"), *_in_range(table.change_seq))
+        .order_by(table.change_seq)
+        .limit(bindparam("limit"))
+        .subquery()
+    )
+
+
+# change_seq of the first limit+1 changes after :since -- where this page ends
+_todo_seqs, _tombstone_seqs = _first_changes(Todo), _first_changes(TodoTombstone)
+_CHANGE_SEQS = (
+    union_all(select(_todo_seqs.c.change_seq), select(_tombstone_seqs.c.change_seq))
+    .order_by(literal_column("change_seq"))
+    .limit(bindparam("limit"))
+)
+_CHANGED_TODOS = (
+    select(*TODO_READ_COLUMNS)
+    .where(Todo.owner_id == bindparam("owner_id"), *_in_range(Todo.change_seq))
+    .order_by(Todo.change_seq, Todo.id)
+)
+_DELETED_TODOS = (
+    select(TodoTombstone.todo_id)
+    .where(TodoTombstone.owner_id == bindparam("owner_id"), *_in_range(TodoTombstone.change_seq))
+    .order_by(TodoTombstone.change_seq)
+)
+
+
+def _page_end(change_seqs: list, current: int, limit: int):
+    """(last change_seq of this page, has_more) from the first limit+1 change_seqs."""
+    if len(change_seqs) <= limit:
+        return current, False
+    boundary = change_seqs[limit]
+    # end before the transaction that doesn't fit, unless it is the first one
+    upto = boundary - 1 if change_seqs[0] < boundary else boundary
+    # a page that had to take the whole last transaction is the final one
+    return upto, upto < current
+
+
+def changes_page(session: Session, owner_id: int, params: ChangesParams) -> dict:
+    # read the version first: every row stamped at or below it has committed
+    current = session.execute(*data_version_statement(owner_id)).scalar_one()
+    values = {"owner_id": owner_id, "since": params.since, "upto": current}
+    seqs = session.execute(_CHANGE_SEQS, {**values, "limit": params.limit + 1}).scalars().all()
+    upto, has_more = _page_end(seqs, current, params.limit)
+    values["upto"] = upto
+    todos = rows_as_dicts(session.execute(_CHANGED_TODOS, values).all())
+    deleted = []
+    if not params.full:
+        # an id can be reused after a delete; a row that exists now wins over its tombstone
+        present = {todo["id"] for todo in todos}
+        deleted = [todo_id for todo_id in session.execute(_DELETED_TODOS, values).scalars() if todo_id not in present]
+    return {"todos": todos, "deleted": deleted, "sync_token": encode_sync_token(upto), "has_more": has_more}
+
+
+def purge_tombstones(older_than: Optional[datetime] = None) -> int:
+    """
+    Delete tombstones older than older_than (default: SYNC_TOMBSTONE_RETENTION_DAYS;
+    tokens that old get 410 anyway). Returns how many were deleted.
+    """
+    if older_than is None:
+        older_than = datetime.now() - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+    with Session(engine) as session:
+        purged = session.execute(delete(TodoTombstone).where(TodoTombstone.deleted_at < older_than)).rowcount
+        session.commit()
+    return purged
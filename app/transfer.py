@@ -0,0 +1,227 @@
+import codecs
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from app.crud import add_counts, counts_of, new_todo, sum_counts, touch_user
+from app.database import engine
+from app.models import Todo, TodoCreate
+
+# -------------------------
+# Streaming export / import of a user's todos (NDJSON or CSV)
+# -------------------------
+# Export reads rows with yield_per (a server-side cursor on Postgres; SQLite
+# steps through its cursor lazily anyway) and writes each batch to the response
+# as it is read, so worker memory doesn't depend on how many todos a user has.
+# Import parses the upload as it arrives and inserts IMPORT_CHUNK_SIZE rows per
+# transaction. A title the user already has is skipped (the duplicate-title
+# rule of POST /todos/) by INSERT ... ON CONFLICT DO NOTHING on the
+# (owner_id, title) unique index, so concurrent creates can't slip through.
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_MAX_ERRORS = 20  # invalid rows reported back; the rest are only counted
+# Longest line (and CSV record) accepted, in characters. A valid todo is well
+# under 2 KB; longer records are skipped and reported instead of buffered.
+IMPORT_MAX_LINE_LENGTH = int(os.getenv("IMPORT_MAX_LINE_LENGTH", "65536"))
+
+EXPORT_FIELDS = ("id", "title", "description", "completed", "due_date", "reminder_at", "notified", "recurrence", "created_at", "updated_at")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_todos(owner_id: int, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """
+    Generator for a StreamingResponse body. Uses its own session: the request's
+    session is closed before the body is streamed.
+    """
+    columns = [getattr(Todo, name) for name in EXPORT_FIELDS]
+    statement = select(*columns).where(Todo.owner_id == owner_id).order_by(Todo.id).execution_options(yield_per=batch_size)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if fmt == "csv":
+        writer.writerow(EXPORT_FIELDS)
+    with Session(engine) as session:
+        for rows in session.execute(statement).partitions():
+            for row in rows:
+                if fmt == "csv":
+                    writer.writerow(_export_value(v) for v in row)
+                else:
+                    buffer.write(json.dumps({k: _export_value(v) for k, v in zip(EXPORT_FIELDS, row)}, separators=(",", ":")))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# -------------------------
+# Import
+# -------------------------
+
+# stands in for a line or record longer than IMPORT_MAX_LINE_LENGTH
+TOO_LONG = object()
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_length: int = IMPORT_MAX_LINE_LENGTH) -> AsyncIterator[object]:
+    """
+    Split a streamed UTF-8 body into lines without reading it all first.
+    A line longer than max_length is yielded as TOO_LONG; at most max_length
+    characters of it are held at a time.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending, skipping = "", False
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if skipping:
+                skipping = False  # the end of the line being dropped
+                yield TOO_LONG
+            else:
+                yield line.rstrip("\r") if len(line) <= max_length else TOO_LONG
+        if len(pending) > max_length:
+            pending, skipping = "", True
+    pending += decoder.decode(b"", final=True)
+    if skipping or len(pending) > max_length:
+        yield TOO_LONG
+    elif pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_records(lines: AsyncIterator[object], fmt: str) -> AsyncIterator[Tuple[int, object]]:
+    """
+    (line number, raw record) pairs: a decoded JSON value for NDJSON, a
+    {column: value} dict for CSV (first line is the header). A CSV record with
+    a quoted newline spans lines until its quotes balance. Over-long lines and
+    records come out as TOO_LONG.
+    """
+    header: Optional[List[str]] = None
+    record, start = "", 0
+    number = 0
+    async for line in lines:
+        number += 1
+        if line is TOO_LONG or len(record) + len(line) > IMPORT_MAX_LINE_LENGTH:
+            # drop the record it belongs to and carry on with the next line
+            yield start or number, TOO_LONG
+            record, start = "", 0
+            continue
+        if fmt == "ndjson":
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError:
+                    yield number, None
+            continue
+        record = f"{record}\n{line}" if record else line
+        start = start or number
+        if record.count('"') % 2:
+            continue  # inside a quoted field
+        values = next(csv.reader([record]), [])
+        record, line_number, start = "", start, 0
+        if header is None:
+            header = [name.strip() for name in values]
+        elif any(v.strip() for v in values):
+            yield line_number, {k: v for k, v in zip(header, values) if v != ""}
+    if record:
+        yield start, None  # unterminated quote at the end of the file
+
+
+def _error_text(error: ValueError) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in error.errors())
+    return str(error)
+
+
+def parse_todo(raw) -> TodoCreate:
+    if raw is TOO_LONG:
+        raise ValueError(f"record longer than {IMPORT_MAX_LINE_LENGTH} characters")
+    if not isinstance(raw, dict):
+        raise ValueError("not a JSON object / CSV row")
+    return TodoCreate.model_validate({k: v for k, v in raw.items() if k in TodoCreate.model_fields})
+
+
+def _insert_ignoring_duplicates(dialect: str):
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return insert(Todo)
+    return dialect_insert(Todo).on_conflict_do_nothing()
+
+
+def import_chunk(owner_id: int, todos: List[TodoCreate]) -> int:
+    """
+    Insert one chunk in one transaction, skipping titles the user already has.
+    Returns how many rows were inserted.
+    """
+    rows, seen = [], set()
+    for todo_in in todos:
+        if todo_in.title in seen:
+            continue  # repeated inside this chunk
+        seen.add(todo_in.title)
+        rows.append(new_todo(todo_in, owner_id).model_dump(exclude={"id"}))
+    if not rows:
+        return 0
+    with Session(engine) as session:
+        # the bumped version is the change_seq of the new rows; undone if they were all duplicates
+        change_seq = session.execute(*touch_user(owner_id)).scalar_one()
+        for row in rows:
+            row["change_seq"] = change_seq
+        statement = _insert_ignoring_duplicates(session.get_bind().dialect.name)
+        returned = session.execute(statement.returning(Todo.completed, Todo.reminder_at, Todo.notified), rows).all()
+        inserted = len(returned)
+        if inserted:
+            # only the rows that weren't duplicates count
+            session.execute(*add_counts(owner_id, sum_counts(counts_of(row) for row in returned)))
+            session.commit()
+        else:
+            session.rollback()
+    return inserted
+
+
+async def import_todos(owner_id: int, body: AsyncIterator[bytes], fmt: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """
+    Consume an uploaded NDJSON/CSV body and insert its todos chunk by chunk.
+    Invalid rows are skipped and reported (line number and reason).
+    """
+    imported = duplicates = invalid = 0
+    has_reminders = False
+    errors: List[dict] = []
+    chunk: List[TodoCreate] = []
+
+    async def flush():
+        nonlocal imported, duplicates
+        inserted = await run_in_threadpool(import_chunk, owner_id, chunk)
+        imported += inserted
+        duplicates += len(chunk) - inserted
+
+    async for line, raw in iter_records(iter_lines(body), fmt):
+        try:
+            todo_in = parse_todo(raw)
+        except ValueError as e:  # includes pydantic's ValidationError
+            invalid += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append({"line": line, "error": _error_text(e)[:300]})
+            continue
+        has_reminders = has_reminders or todo_in.reminder_at is not None or todo_in.recurrence is not None
+        chunk.append(todo_in)
+        if len(chunk) >= chunk_size:
+            await flush()
+            chunk = []
+    if chunk:
+        await flush()
+    return {"imported": imported, "duplicates": duplicates, "invalid": invalid, "errors": errors, "has_reminders": has_reminders}
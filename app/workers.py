@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+from app.metrics import job_duration
+
+logger = logging.getLogger("todo_workers")
+
+# -------------------------
+# Periodic background workers
+# -------------------------
+# The reminder dispatcher, notification retention and the stats reconciler
+# each run one function over and over on a daemon thread inside every API
+# worker (or standalone, through their module's __main__). PeriodicWorker is
+# that thread: start/stop from the app lifespan, run_once() in a loop,
+# failures logged and retried after the interval, poke() to run early.
+
+
+class PeriodicWorker:
+    """
+    Daemon thread calling run_once(), then waiting next_wait() seconds (or
+    until poke() / stop()) before the next call. Subclasses implement run_once()
+    and may override next_wait() to sleep until their next piece of work.
+    """
+
+    name = "periodic-worker"  # thread name, also used in log messages
+    job: Optional[str] = None  # job_duration label of each run; None when run_once records its own metrics
+    delay_first_run = False  # wait one interval after start() before the first run
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> None:
+        raise NotImplementedError
+
+    def next_wait(self) -> float:
+        """Seconds to wait after a successful run."""
+        return self.interval
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self.run_forever, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info("%s started.", self.name)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            logger.info("%s stopped.", self.name)
+
+    def poke(self) -> None:
+        """Run again now instead of at the end of the current wait."""
+        self._wakeup.set()
+
+    def _wait(self, timeout: float) -> None:
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def run_forever(self) -> None:
+        if self.delay_first_run:
+            self._wait(self.interval)
+        while not self._stopping.is_set():
+            started = time.perf_counter()
+            try:
+                self.run_once()
+                timeout = self.next_wait()
+            except Exception:
+                logger.exception("%s failed", self.name)
+                timeout = self.interval
+            if self.job:
+                job_duration.observe(time.perf_counter() - started, self.job)
+            self._wait(timeout)
@@ -0,0 +1,116 @@
+"""
+Compare the sync (threadpool) and async (DB_ASYNC=1) endpoint implementations.
+
+Starts uvicorn twice against a fresh SQLite file in a temp directory, seeds one
+user with some todos, then hammers GET /todos/ and GET /me/dashboard with many
+concurrent clients and prints requests/sec and latency percentiles.
+
+    python benchmarks/bench_async.py --concurrency 200 --seconds 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "Bench_pass1"
+
+
+def start_server(workdir: str, port: int, env_overrides: dict) -> subprocess.Popen:
+    env = dict(os.environ, PYTHONPATH=ROOT, **env_overrides)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def seed(base: str, todos: int) -> dict:
+    httpx.post(f"{base}/register", json={"username": "bench", "password": PASSWORD})
+    token = httpx.post(f"{base}/token", data={"username": "bench", "password": PASSWORD}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    with httpx.Client(base_url=base, headers=headers) as client:
+        for i in range(todos):
+            client.post("/todos/", json={"title": f"todo {i}"})
+    return headers
+
+
+async def hammer(base: str, headers: dict, paths: list, concurrency: int, seconds: float) -> dict:
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base, headers=headers, limits=limits, timeout=30) as client:
+        async def worker(n: int):
+            nonlocal errors
+            i = n
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                response = await client.get(paths[i % len(paths)])
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+                i += 1
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / seconds, 1),
+        "p50_ms": round(pick(0.50), 2),
+        "p99_ms": round(pick(0.99), 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def run_mode(name: str, env_overrides: dict, args) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = start_server(workdir, args.port, env_overrides)
+        try:
+            base = f"http://127.0.0.1:{args.port}"
+            headers = seed(base, args.todos)
+            result = asyncio.run(hammer(base, headers, ["/todos/", "/me/dashboard"], args.concurrency, args.seconds))
+        finally:
+            proc.terminate()
+            proc.wait()
+    result["mode"] = name
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--todos", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    common = {"RUN_REMINDER_DISPATCHER": "0"}
+    results = [
+        run_mode("sync", dict(common, DB_ASYNC="0"), args),
+        run_mode("async", dict(common, DB_ASYNC="1"), args),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
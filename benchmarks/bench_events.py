@@ -0,0 +1,154 @@
+"""
+Hold many idle GET /notifications/stream connections and measure push latency.
+
+Starts uvicorn against a fresh SQLite file, opens --connections SSE streams
+(spread over --users users), then sends --rounds admin bulk notifications and
+records, per stream, the time from sending the request to receiving the event.
+Prints connect time, server memory, and delivery latency percentiles.
+
+    python benchmarks/bench_events.py --connections 10000 --users 100 --rounds 5
+
+The client runs in one Python process, so at 10k streams the latencies are
+mostly its own parsing time; compare runs on the same machine.
+
+10k sockets need a high enough open-file limit on both sides (ulimit -n);
+the script raises its own soft limit as far as the hard limit allows.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_async import PASSWORD, start_server  # noqa: E402
+
+
+def raise_fd_limit(wanted: int) -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = min(max(soft, wanted), hard)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    return target
+
+
+def server_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return 0.0
+
+
+def tokens_for(base: str, users: int) -> list:
+    httpx.post(f"{base}/register", json={"username": "benchadmin", "password": PASSWORD})
+    tokens = []
+    with httpx.Client(base_url=base, timeout=60) as client:
+        for i in range(users):
+            client.post("/register", json={"username": f"stream{i}", "password": PASSWORD})
+            tokens.append(client.post("/token", data={"username": f"stream{i}", "password": PASSWORD}).json()["access_token"])
+    return tokens
+
+
+def admin_token(base: str, db_path: str) -> str:
+    """Registration never creates admins, so promote the bench admin in the database file."""
+    import sqlite3
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE user SET is_admin = 1 WHERE username = 'benchadmin'")
+    return httpx.post(f"{base}/token", data={"username": "benchadmin", "password": PASSWORD}).json()["access_token"]
+
+
+async def run(base: str, tokens: list, admin: str, connections: int, rounds: int, pid: int) -> dict:
+    limits = httpx.Limits(max_connections=connections + 10, max_keepalive_connections=0)
+    received = [asyncio.Queue() for _ in range(connections)]
+    ready = asyncio.Semaphore(0)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=None) as client:
+        async def stream(n: int):
+            token = tokens[n % len(tokens)]
+            async with client.stream("GET", f"/notifications/stream?token={token}") as response:
+                ready.release()
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        received[n].put_nowait((time.perf_counter(), json.loads(line[5:])))
+
+        rss_before = server_rss_mb(pid)
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(stream(n)) for n in range(connections)]
+        for _ in range(connections):
+            await ready.acquire()
+        connect_seconds = time.perf_counter() - started
+        await asyncio.sleep(1)  # let every handler register its subscription
+        rss_idle = server_rss_mb(pid)
+
+        latencies = []
+        missing = 0
+        async with httpx.AsyncClient(base_url=base, timeout=60) as admin_client:
+            for r in range(rounds):
+                sent = time.perf_counter()
+                await admin_client.post(
+                    "/admin/bulk-notify",
+                    json={"title": f"round {r}", "message": "bench"},
+                    headers={"Authorization": f"Bearer {admin}"},
+                )
+                for queue in received:
+                    try:
+                        arrived, _ = await asyncio.wait_for(queue.get(), 30)
+                        latencies.append(arrived - sent)
+                    except asyncio.TimeoutError:
+                        missing += 1
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else None
+    return {
+        "connections": connections,
+        "connect_seconds": round(connect_seconds, 2),
+        "server_rss_mb_before": rss_before,
+        "server_rss_mb_idle": rss_idle,
+        "events_received": len(latencies),
+        "events_missing": missing,
+        "p50_ms": round(pick(0.50), 2) if latencies else None,
+        "p99_ms": round(pick(0.99), 2) if latencies else None,
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    limit = raise_fd_limit(args.connections + 1000)
+    if limit < args.connections + 100:
+        print(f"open-file limit is {limit}; lowering --connections to fit")
+        args.connections = limit - 100
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # one client IP registers every user, so lift the per-IP login/registration throttle
+        env = {"DATABASE_URL": f"sqlite:///{workdir}/bench.db", "RUN_REMINDER_DISPATCHER": "0", "LOGIN_MAX_ATTEMPTS_PER_IP": "0"}
+        server = start_server(workdir, args.port, env)
+        try:
+            base = f"http://127.0.0.1:{args.port}"
+            tokens = tokens_for(base, args.users)
+            admin = admin_token(base, f"{workdir}/bench.db")
+            result = asyncio.run(run(base, tokens, admin, args.connections, args.rounds, server.pid))
+        finally:
+            server.terminate()
+            server.wait()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
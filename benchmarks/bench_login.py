@@ -0,0 +1,90 @@
+"""
+Login throughput vs. latency of other endpoints during a login burst.
+
+For each hashing configuration, starts uvicorn, then runs a login flood
+(POST /token with valid credentials) next to normal API traffic (GET /todos/)
+and reports successful logins/sec, rejected (503) logins and the p50/p99 of
+the normal traffic. Throttling is disabled so the flood reaches the hasher.
+
+    python benchmarks/bench_login.py --login-clients 64 --api-clients 16 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+import httpx
+
+from bench_async import PASSWORD, seed, start_server
+
+CONFIGS = {
+    # roughly the old behaviour: hashing limited only by the request threadpool
+    "unbounded": {"HASH_WORKERS": "40", "HASH_MAX_PENDING": "100000"},
+    # defaults from app/hashing.py
+    "bounded": {},
+}
+
+
+async def run_load(base: str, headers: dict, args) -> dict:
+    stop_at = time.perf_counter() + args.seconds
+    api_latencies = []
+    logins = {"ok": 0, "rejected": 0, "other": 0}
+    limits = httpx.Limits(max_connections=args.login_clients + args.api_clients)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        async def login_worker():
+            while time.perf_counter() < stop_at:
+                r = await client.post("/token", data={"username": "bench", "password": PASSWORD})
+                key = "ok" if r.status_code == 200 else "rejected" if r.status_code == 503 else "other"
+                logins[key] += 1
+
+        async def api_worker():
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                await client.get("/todos/", headers=headers)
+                api_latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(
+            *(login_worker() for _ in range(args.login_clients)),
+            *(api_worker() for _ in range(args.api_clients)),
+        )
+
+    api_latencies.sort()
+    pick = lambda q: round(api_latencies[min(len(api_latencies) - 1, int(q * len(api_latencies)))] * 1000, 2)
+    return {
+        "logins_per_sec": round(logins["ok"] / args.seconds, 1),
+        "logins_rejected_503": logins["rejected"],
+        "logins_other_errors": logins["other"],
+        "api_requests": len(api_latencies),
+        "api_p50_ms": pick(0.50),
+        "api_p99_ms": pick(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--login-clients", type=int, default=64)
+    parser.add_argument("--api-clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    results = []
+    for name, env in CONFIGS.items():
+        env = dict(env, RUN_REMINDER_DISPATCHER="0", LOGIN_MAX_ATTEMPTS_PER_IP="0", LOGIN_MAX_FAILURES_PER_USER="0")
+        with tempfile.TemporaryDirectory() as workdir:
+            proc = start_server(workdir, args.port, env)
+            try:
+                base = f"http://127.0.0.1:{args.port}"
+                headers = seed(base, 20)
+                result = asyncio.run(run_load(base, headers, args))
+            finally:
+                proc.terminate()
+                proc.wait()
+        results.append({"config": name, **result})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Overhead of the request/query instrumentation (app/metrics.py).
+
+First times the middleware and the SQLAlchemy hooks in isolation (the
+stable number: microseconds added per request and per query). Then runs the
+in-process benchmark suite twice, with METRICS_ENABLED=0 and =1, over the
+cheap read endpoints and prints the throughput and p50 difference per
+scenario; on a busy or single-core machine that end-to-end figure is noisy.
+
+    python benchmarks/bench_metrics.py --requests 3000 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+SCENARIOS = ["list_todos", "get_todo", "dashboard"]
+
+
+def micro(n: int = 50000) -> dict:
+    from app import metrics
+
+    class Route:
+        path = "/todos/{todo_id}"
+
+    async def endpoint(scope, receive, send):
+        scope["route"] = Route
+        await send({"type": "http.response.start", "status": 200})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    async def per_request(app) -> float:
+        started = time.perf_counter()
+        for _ in range(n):
+            await app({"type": "http", "method": "GET"}, None, send)
+        return (time.perf_counter() - started) / n
+
+    class Connection:
+        info: dict = {}
+
+    conn = Connection()
+    started = time.perf_counter()
+    for _ in range(n):
+        metrics._before_cursor_execute(conn, None, "SELECT 1", None, None, False)
+        metrics._after_cursor_execute(conn, None, "SELECT 1", None, None, False)
+    per_query = (time.perf_counter() - started) / n
+    middleware = asyncio.run(per_request(metrics.MetricsMiddleware(endpoint))) - asyncio.run(per_request(endpoint))
+    return {"middleware_us_per_request": round(middleware * 1e6, 2), "hooks_us_per_query": round(per_query * 1e6, 2)}
+
+
+def run_suite(enabled: bool, args, output: str) -> dict:
+    env = dict(os.environ, METRICS_ENABLED="1" if enabled else "0")
+    subprocess.run(
+        [sys.executable, os.path.join(HERE, "suite.py"), "--only", *SCENARIOS,
+         "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+         "--users", "50", "--todos", "100", "--output", output],
+        env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+    with open(output) as f:
+        return json.load(f)["results"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        off = run_suite(False, args, os.path.join(workdir, "off.json"))
+        on = run_suite(True, args, os.path.join(workdir, "on.json"))
+    report = {
+        name: {
+            "rps_off": off[name]["rps"],
+            "rps_on": on[name]["rps"],
+            "rps_change": f"{(on[name]['rps'] - off[name]['rps']) / off[name]['rps']:+.1%}",
+            "p50_ms_off": off[name]["p50_ms"],
+            "p50_ms_on": on[name]["p50_ms"],
+        }
+        for name in SCENARIOS
+    }
+    print(json.dumps({"micro": micro(), "suite": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
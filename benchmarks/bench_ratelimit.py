@@ -0,0 +1,150 @@
+"""
+Per-request overhead of RateLimitMiddleware (app/ratelimit.py).
+
+Times, without any HTTP server or database:
+  - take():      one two-bucket update in LocalBucketStore and in the
+                 SharedBucketStore read/compare-and-set loop (InMemorySharedStore,
+                 including its hop to the threadpool)
+  - middleware:  a request through RateLimitMiddleware minus the same request
+                 straight to a no-op app, for an authenticated client whose
+                 token get_current_user already cached (the common case), one
+                 whose token has to be verified, and an anonymous one; both
+                 for a route with its own limit and one without
+Then checks the limit itself: --tasks concurrent tasks hammering one bucket
+get no more than burst + rate * elapsed requests through.
+Exits non-zero if the middleware overhead of the cached-token case exceeds --budget-us.
+
+    python benchmarks/bench_ratelimit.py --repeat 100000 --budget-us 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("METRICS_ENABLED", "0")
+os.environ.setdefault("DATABASE_URL", "sqlite://")  # never connected to
+
+
+def us_per_call(fn, repeat: int) -> float:
+    async def loop():
+        await fn()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await fn()
+        return (time.perf_counter() - started) / repeat * 1e6
+
+    return asyncio.run(loop())
+
+
+def async_us_per_call(app, scope, repeat: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def loop():
+        await app(scope, receive, send)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await app(scope, receive, send)
+        return (time.perf_counter() - started) / repeat * 1e6
+
+    return asyncio.run(loop())
+
+
+def allowed_under_contention(store, tasks: int, seconds: float, rate: float, burst: float) -> dict:
+    from app.ratelimit import Bucket
+
+    buckets = [Bucket("hot", rate, burst, 1.0)]
+    allowed = [0] * tasks
+
+    async def hammer(i: int, deadline: float):
+        while time.perf_counter() < deadline:
+            wait, _ = await store.take(buckets)
+            if not wait:
+                allowed[i] += 1
+            await asyncio.sleep(0)
+
+    async def run():
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(hammer(i, deadline) for i in range(tasks)))
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    return {"allowed": sum(allowed), "max_allowed": int(burst + rate * elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=100000)
+    parser.add_argument("--tasks", type=int, default=8)
+    parser.add_argument("--budget-us", type=float, default=50.0)
+    args = parser.parse_args()
+
+    from app.auth import create_access_token, token_subject, user_cache
+    from app.models import UserPrincipal
+    from app.ratelimit import Bucket, InMemorySharedStore, LocalBucketStore, RateLimitMiddleware
+
+    # limits high enough that nothing is refused: this measures the bookkeeping
+    rate, burst = 1e9, 1e9
+    take = {}
+    for store in (LocalBucketStore(), InMemorySharedStore()):
+        keys = [f"user:{i}" for i in range(1000)]
+        counter = iter(range(10**9))
+
+        def take_one(store=store, counter=counter):
+            key = keys[next(counter) % 1000]
+            return store.take([Bucket(key, rate, burst, 1.0), Bucket(f"{key} GET /todos/", rate, burst, 1.0)])
+
+        take[type(store).__name__] = us_per_call(take_one, args.repeat)
+
+    async def noop(scope, receive, send):
+        pass
+
+    cached = create_access_token({"sub": "cached", "uid": 1}, timedelta(hours=1))
+    fresh = create_access_token({"sub": "fresh", "uid": 2}, timedelta(hours=1))
+    user_cache.set(cached, UserPrincipal(id=1, username="cached"))
+    clients = {
+        "cached_token": [(b"authorization", f"Bearer {cached}".encode())],
+        "verified_token": [(b"authorization", f"Bearer {fresh}".encode())],
+        "anonymous": [],
+    }
+    routes = {"route_limit": "/todos/", "client_limit_only": "/todos/search/none"}
+    limiter = RateLimitMiddleware(
+        noop, subject_of_token=token_subject, store=LocalBucketStore(), rate=rate, burst=burst, routes=f"GET /todos/={rate}:{burst}"
+    )
+    overhead = {}
+    for client, headers in clients.items():
+        for route, path in routes.items():
+            scope = {"type": "http", "method": "GET", "path": path, "headers": headers, "client": ("127.0.0.1", 5000)}
+            repeat = args.repeat if client != "verified_token" else args.repeat // 10
+            overhead[f"{client}/{route}"] = async_us_per_call(limiter, scope, repeat) - async_us_per_call(noop, scope, repeat)
+
+    contention = {
+        type(store).__name__: allowed_under_contention(store, args.tasks, 1.0, rate=1000, burst=100)
+        for store in (LocalBucketStore(), InMemorySharedStore())
+    }
+    print(json.dumps({
+        "take_us": {k: round(v, 2) for k, v in take.items()},
+        "middleware_overhead_us": {k: round(v, 2) for k, v in overhead.items()},
+        "contention_1s": contention,
+        "budget_us": args.budget_us,
+    }, indent=2))
+    failures = [f"{name}: {c['allowed']} requests allowed, limit {c['max_allowed']}" for name, c in contention.items() if c["allowed"] > c["max_allowed"]]
+    worst = max(overhead["cached_token/route_limit"], overhead["cached_token/client_limit_only"])
+    if worst > args.budget_us:
+        failures.append(f"middleware overhead {worst:.1f} us (budget {args.budget_us:.0f} us)")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Dispatching many recurring reminders that fire in the same minute.
+
+Seeds --due recurring todos (a mix of interval and cron rules) plus a fifth as
+many one-shot reminders, all due within the last minute, and times one run of
+the reminder dispatcher (tests/test_recurring_reminders.py checks what it
+sends and re-arms). Then adds --idle recurring todos due next week plus a fresh due set and
+dispatches again: the time should follow the number of due rows, not the
+number of recurring todos (the pending-reminder index holds next fire times).
+
+    python benchmarks/bench_recurring.py --due 5000 --idle 50000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RULES = ["daily", "weekly", "every 15 minutes", "0 9 * * 1-5", "*/5 * * * *"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--due", type=int, default=5000)
+    parser.add_argument("--idle", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-recurring-")
+    try:
+        run(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args, workdir: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("METRICS_ENABLED", "0")
+
+    from sqlalchemy import func, insert
+    from sqlmodel import Session, select
+
+    from app.database import create_db_and_tables, engine
+    from app.models import Todo, User
+    from app.reminders import dispatch_due_reminders
+
+    create_db_and_tables()
+    with Session(engine) as session:
+        session.execute(insert(User), [
+            {"id": u, "username": f"user{u}", "hashed_password": "x", "is_admin": False} for u in range(1, args.users + 1)
+        ])
+        session.commit()
+
+    def seed(prefix: str, count: int, reminder_at, recurring_only: bool = False) -> None:
+        now = datetime.now()
+        rows = []
+        for i in range(count):
+            # every fifth due todo is a one-shot reminder
+            rule = None if (not recurring_only and i % 5 == 4) else RULES[i % len(RULES)]
+            rows.append({
+                "title": f"{prefix} {i}", "owner_id": 1 + i % args.users, "created_at": now, "updated_at": now,
+                "reminder_at": reminder_at(i), "recurrence": rule, "notified": False, "completed": False,
+            })
+        with Session(engine) as session:
+            for start in range(0, len(rows), 10000):
+                session.execute(insert(Todo), rows[start:start + 10000])
+            session.commit()
+
+    def dispatch(prefix: str) -> dict:
+        with Session(engine) as session:
+            due = session.exec(select(func.count()).select_from(Todo).where(Todo.title.like(f"{prefix} %"))).one()
+        started = time.perf_counter()
+        sent = dispatch_due_reminders()
+        seconds = time.perf_counter() - started
+        if sent != due:
+            sys.exit(f"sent {sent} reminders for {due} due todos")
+        return {"due": due, "seconds": round(seconds, 3), "reminders_per_second": round(due / seconds)}
+
+    now = datetime.now()
+    seed("first", args.due, lambda i: now - timedelta(seconds=1 + i % 59))
+    first = dispatch("first")
+
+    now = datetime.now()
+    seed("idle", args.idle, lambda i: now + timedelta(days=7, minutes=i % 1440), recurring_only=True)
+    seed("second", args.due, lambda i: now - timedelta(seconds=1 + i % 59))
+    second = dispatch("second")
+
+    with Session(engine) as session:
+        waiting = session.exec(select(func.count()).select_from(Todo).where(Todo.recurrence != None, Todo.notified == False)).one()
+    print(json.dumps({
+        "rules": RULES,
+        "without_idle": {**first, "recurring_waiting_before": 0},
+        "with_idle": {**second, "recurring_waiting_before": args.idle + first["due"] * 4 // 5},
+        "recurring_waiting_now": waiting,
+        "slowdown_with_idle": f"{second['seconds'] / first['seconds']:.2f}x",
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
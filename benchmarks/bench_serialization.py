@@ -0,0 +1,129 @@
+"""
+CPU cost of building a JSON list response, per 1000 rows.
+
+Compares, over the same SQLite rows:
+  - orm:      select(Todo) ORM instances, validated into a page whose items are
+              the table model and dumped by pydantic (the list endpoints before
+              TodoRead / app/responses.py)
+  - columns:  select of the TodoRead columns, still validated per row by a
+              response_model (why the list endpoints don't do that)
+  - lean:     select of the TodoRead columns -> dicts -> ORJSONResponse
+              (what GET /todos/, /todos/search, /notifications and the
+              dashboard do now)
+and, for a single object, pydantic's dump_json (FastAPI's default when a
+route has a response_model) against dump-to-dict + orjson (what an app-wide
+ORJSONResponse default class would do instead).
+
+CPU time is process time, so it is not skewed by other load on the machine.
+
+    python benchmarks/bench_serialization.py --rows 1000 --repeat 50
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def cpu_ms(fn, repeat: int) -> float:
+    fn()  # warm up statement caches
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-serialization-")
+    try:
+        run(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args, workdir: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("METRICS_ENABLED", "0")
+
+    from pydantic import TypeAdapter
+    from sqlalchemy import insert
+    from sqlmodel import Session, SQLModel, select
+
+    from app.crud import TODO_READ_COLUMNS
+    from app.database import create_db_and_tables, engine
+    from app.models import Todo, TodoPage, TodoRead, User
+    from app.responses import ORJSONResponse, rows_as_dicts
+
+    class OrmTodoPage(SQLModel):
+        items: List[Todo]
+        next_cursor: Optional[str] = None
+
+    create_db_and_tables()
+    now = datetime.now()
+    with Session(engine) as session:
+        session.add(User(id=1, username="bench", hashed_password="x", is_admin=False))
+        session.flush()
+        session.execute(insert(Todo), [
+            {"title": f"todo {i}", "description": "some words about it" if i % 2 else None, "owner_id": 1,
+             "created_at": now, "updated_at": now + timedelta(seconds=i),
+             "due_date": now + timedelta(days=1), "reminder_at": None, "completed": False, "notified": False}
+            for i in range(args.rows)
+        ])
+        session.commit()
+
+    orm_page, lean_page = TypeAdapter(OrmTodoPage), TypeAdapter(TodoPage)
+    orm_statement = select(Todo).where(Todo.owner_id == 1).order_by(Todo.id)
+    lean_statement = select(*TODO_READ_COLUMNS).where(Todo.owner_id == 1).order_by(Todo.id)
+
+    def orm():
+        with Session(engine) as session:
+            rows = session.exec(orm_statement).all()
+            return orm_page.dump_json(orm_page.validate_python({"items": rows, "next_cursor": None}))
+
+    def columns():
+        with Session(engine) as session:
+            rows = session.exec(lean_statement).all()
+            return lean_page.dump_json(lean_page.validate_python({"items": rows, "next_cursor": None}))
+
+    def lean():
+        with Session(engine) as session:
+            rows = session.exec(lean_statement).all()
+            return ORJSONResponse({"items": rows_as_dicts(rows), "next_cursor": None}).body
+
+    assert json.loads(orm()) == json.loads(lean()) == json.loads(columns()), "responses differ"
+
+    with Session(engine) as session:
+        one = session.get(Todo, 1)
+    todo_read = TypeAdapter(TodoRead)
+    single_n = args.repeat * 100
+
+    per_1k = 1000 / args.rows
+    list_results = {name: round(cpu_ms(fn, args.repeat) * per_1k, 2) for name, fn in (("orm", orm), ("columns", columns), ("lean", lean))}
+    single = {
+        "pydantic_dump_json_us": round(cpu_ms(lambda: todo_read.dump_json(todo_read.validate_python(one)), single_n) * 1000, 2),
+        "dict_then_orjson_us": round(cpu_ms(
+            lambda: ORJSONResponse(todo_read.dump_python(todo_read.validate_python(one), mode="json")).body, single_n
+        ) * 1000, 2),
+    }
+    print(json.dumps({
+        "rows": args.rows,
+        "cpu_ms_per_1k_rows": list_results,
+        "lean_vs_orm": f"{list_results['lean'] / list_results['orm']:.2f}x",
+        "single_object": single,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
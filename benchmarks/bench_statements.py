@@ -0,0 +1,128 @@
+"""
+Per-request cost of building a list query before it reaches the database.
+
+For GET /todos/ (completed filter, second page via a cursor) compares:
+  - inline:  a fresh select() with the values inlined, as the builders did
+             before app/crud.py cached statements; SQLAlchemy has to rebuild
+             and hash it to find the compiled form in its cache
+  - lambda:  lambda_stmt(), SQLAlchemy's own closure-keyed statement cache
+  - cached:  crud.todo_list_statement -- the shared statement for this shape
+             plus a params dict (what the endpoints do now)
+Each variant is timed for "build + cache key" alone and for executing it
+against a small SQLite table (a 20-row page).
+
+    python benchmarks/bench_statements.py --repeat 20000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def us_per_call(fn, repeat: int) -> float:
+    fn()  # warm up statement caches
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-statements-")
+    try:
+        run(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args, workdir: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("METRICS_ENABLED", "0")
+
+    from sqlalchemy import and_, insert, lambda_stmt, or_
+    from sqlmodel import Session, select
+
+    from app.crud import TODO_READ_COLUMNS, todo_list_statement
+    from app.database import create_db_and_tables, engine
+    from app.models import Todo, User
+    from app.pagination import TodoListParams, decode_cursor, encode_cursor
+
+    create_db_and_tables()
+    now = datetime.now()
+    with Session(engine) as session:
+        session.add(User(id=1, username="bench", hashed_password="x", is_admin=False))
+        session.flush()
+        session.execute(insert(Todo), [
+            {"title": f"todo {i}", "description": None, "owner_id": 1, "created_at": now,
+             "updated_at": now + timedelta(seconds=i), "due_date": None, "reminder_at": None,
+             "completed": bool(i % 2), "notified": False}
+            for i in range(200)
+        ])
+        session.commit()
+
+    cursor = encode_cursor("-updated_at", now + timedelta(seconds=150), 151)
+    params = TodoListParams(limit=20, cursor=cursor, sort="-updated_at", completed=True)
+
+    def inline():
+        value, last_id = decode_cursor(params.cursor, params.sort)
+        return (
+            select(*TODO_READ_COLUMNS)
+            .where(Todo.owner_id == 1, Todo.completed == params.completed)
+            .where(or_(Todo.updated_at < value, and_(Todo.updated_at == value, Todo.id < last_id)))
+            .order_by(Todo.updated_at.desc(), Todo.id.desc())
+            .limit(params.limit + 1)
+        )
+
+    def lambda_():
+        value, last_id = decode_cursor(params.cursor, params.sort)
+        owner_id, completed, limit = 1, params.completed, params.limit + 1
+        statement = lambda_stmt(lambda: select(*TODO_READ_COLUMNS))
+        statement += lambda s: s.where(Todo.owner_id == owner_id, Todo.completed == completed)
+        statement += lambda s: s.where(or_(Todo.updated_at < value, and_(Todo.updated_at == value, Todo.id < last_id)))
+        statement += lambda s: s.order_by(Todo.updated_at.desc(), Todo.id.desc()).limit(limit)
+        return statement
+
+    def cached():
+        return todo_list_statement(1, params)
+
+    def run_inline(session):
+        return session.execute(inline()).all()
+
+    def run_lambda(session):
+        return session.execute(lambda_()).all()
+
+    def run_cached(session):
+        return session.execute(*cached()).all()
+
+    with Session(engine) as session:
+        expected = run_inline(session)
+        assert len(expected) == 21 and run_lambda(session) == expected == run_cached(session), "results differ"
+        build = {
+            "inline": us_per_call(lambda: inline()._generate_cache_key(), args.repeat),
+            "lambda": us_per_call(lambda: lambda_()._generate_cache_key(), args.repeat),
+            "cached": us_per_call(lambda: cached().statement._generate_cache_key(), args.repeat),
+        }
+        executed = {
+            name: us_per_call(lambda fn=fn: fn(session), args.repeat // 10)
+            for name, fn in (("inline", run_inline), ("lambda", run_lambda), ("cached", run_cached))
+        }
+    print(json.dumps({
+        "build_and_cache_key_us": {k: round(v, 2) for k, v in build.items()},
+        "execute_page_us": {k: round(v, 2) for k, v in executed.items()},
+        "cached_vs_inline_execute": f"{executed['cached'] / executed['inline']:.2f}x",
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Benchmark suite for the API: seed a database, measure every hot endpoint,
+write the results as JSON and compare them against an earlier run.
+
+    # in-process (httpx ASGI transport, no network), 50 concurrent clients
+    python benchmarks/suite.py --mode inprocess --output before.json
+
+    # against a real uvicorn worker
+    python benchmarks/suite.py --mode server --concurrency 100 --output after.json
+
+    # fail (exit 1) if any scenario got >20% slower than before.json
+    python benchmarks/suite.py --compare before.json --threshold 0.2
+
+Scenarios: register, token, list_todos, get_todo, patch_todo, dashboard,
+search, sync_changes (GET /todos/changes with a token taken at seeding, so
+the delta is what patch_todo changed), stats (GET /me/stats), bulk_notify (admin, run
+--bulk-rounds times) and reminder_job
+(dispatch_due_reminders over --reminders due todos, always in this process).
+Each request scenario sends --requests requests from --concurrency clients.
+
+The database is a fresh SQLite file in a temp directory (or --database-url)
+seeded with --users users, --todos todos and --notifications notifications
+per user. Seeding writes rows directly, so it is fast even for large sizes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_async import PASSWORD, start_server  # noqa: E402
+
+ADMIN = "benchadmin"
+SEED_CHUNK = 5000
+# settings for both the in-process app and the uvicorn worker: every client
+# shares one IP, and the background threads would compete with the scenarios
+BENCH_ENV = {"LOGIN_MAX_ATTEMPTS_PER_IP": "0", "RATE_LIMIT_ENABLED": "0", "RUN_REMINDER_DISPATCHER": "0", "RUN_RETENTION": "0"}
+
+
+# -------------------------
+# Seeding
+# -------------------------
+
+def seed(users: int, todos: int, notifications: int) -> dict:
+    """Fill the database configured in DATABASE_URL; returns ids the scenarios need."""
+    from sqlalchemy import insert, select, update
+    from sqlmodel import Session
+
+    from app.auth import get_password_hash
+    from app.database import create_db_and_tables, engine
+    from app.models import Notification, Todo, User
+
+    create_db_and_tables()
+    hashed = get_password_hash(PASSWORD)  # one argon2 hash shared by every seeded user
+    now = datetime.now()
+    with Session(engine) as session:
+        session.execute(insert(User), [{"username": ADMIN, "hashed_password": hashed, "is_admin": True}])
+        for start in range(0, users, SEED_CHUNK):
+            session.execute(
+                insert(User),
+                [{"username": f"user{i}", "hashed_password": hashed, "is_admin": False} for i in range(start, min(users, start + SEED_CHUNK))],
+            )
+        user_ids = session.execute(select(User.id).where(User.is_admin == False).order_by(User.id)).scalars().all()  # noqa: E712
+
+        rows = ({"owner_id": uid, "title": f"todo {j}", "description": f"seeded todo {j} of user {uid}",
+                 "created_at": now - timedelta(minutes=j), "updated_at": now - timedelta(minutes=j)}
+                for uid in user_ids for j in range(todos))
+        _insert_chunks(session, Todo, rows)
+        rows = ({"user_id": uid, "title": f"note {j}", "message": "seeded", "created_at": now - timedelta(minutes=j)}
+                for uid in user_ids for j in range(notifications))
+        _insert_chunks(session, Notification, rows)
+        session.execute(update(User).where(User.is_admin == False).values(unread_notifications=notifications, todo_count=todos))  # noqa: E712
+        session.commit()
+
+        sample_users = user_ids[: min(len(user_ids), 100)]
+        todo_ids = {
+            uid: session.execute(select(Todo.id).where(Todo.owner_id == uid).limit(20)).scalars().all()
+            for uid in sample_users
+        }
+    return {"usernames": {uid: f"user{n}" for n, uid in enumerate(user_ids[: len(sample_users)])}, "todo_ids": todo_ids}
+
+
+def _insert_chunks(session, model, rows) -> None:
+    from sqlalchemy import insert
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == SEED_CHUNK:
+            session.execute(insert(model), chunk)
+            chunk = []
+    if chunk:
+        session.execute(insert(model), chunk)
+
+
+# -------------------------
+# Measuring
+# -------------------------
+
+def summarize(latencies: list, errors: dict, seconds: float) -> dict:
+    latencies = sorted(latencies)
+    pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 2) if latencies else None
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors.values()),
+        "error_statuses": errors,
+        "rps": round(len(latencies) / seconds, 1) if seconds else 0.0,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+    }
+
+
+async def measure(client: httpx.AsyncClient, make_request, requests: int, concurrency: int) -> dict:
+    """Send `requests` requests built by make_request(n) -> (method, url, kwargs) from `concurrency` workers."""
+    latencies = []
+    errors = {}  # status code (or "connection") -> count
+    counter = iter(range(requests))
+
+    async def worker():
+        for n in counter:
+            method, url, kwargs = make_request(n)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                failure = str(response.status_code) if response.status_code >= 400 else None
+            except httpx.HTTPError:
+                failure = "connection"
+            latencies.append(time.perf_counter() - started)
+            if failure:
+                errors[failure] = errors.get(failure, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def login(client: httpx.AsyncClient, username: str) -> dict:
+    response = await client.post("/token", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run_scenarios(client: httpx.AsyncClient, seeded: dict, args) -> dict:
+    from app.hashing import HASH_MAX_PENDING, HASH_WORKERS
+    from app.sync import encode_sync_token
+
+    users = list(seeded["usernames"].items())
+    headers = {uid: await login(client, name) for uid, name in users}
+    admin = await login(client, ADMIN)
+    run_id = f"{os.getpid() % 1000}{int(time.time()) % 1000}"
+    seeded_token = encode_sync_token(0)  # seeded rows have change_seq 0
+
+    def as_user(n: int):
+        uid, _ = users[n % len(users)]
+        return uid, headers[uid]
+
+    def todo_of(n: int):
+        uid, h = as_user(n)
+        ids = seeded["todo_ids"][uid]
+        return ids[n % len(ids)], h
+
+    scenarios = {
+        "register": lambda n: ("POST", "/register", {"json": {"username": f"r{run_id}_{n}", "password": PASSWORD}}),
+        "token": lambda n: ("POST", "/token", {"data": {"username": users[n % len(users)][1], "password": PASSWORD}}),
+        "list_todos": lambda n: ("GET", "/todos/", {"headers": as_user(n)[1], "params": {"limit": 50}}),
+        "get_todo": lambda n: ("GET", f"/todos/{todo_of(n)[0]}", {"headers": todo_of(n)[1]}),
+        "patch_todo": lambda n: ("PATCH", f"/todos/{todo_of(n)[0]}", {"headers": todo_of(n)[1], "json": {"description": f"edit {n}"}}),
+        "dashboard": lambda n: ("GET", "/me/dashboard", {"headers": as_user(n)[1]}),
+        "search": lambda n: ("GET", "/todos/search", {"headers": as_user(n)[1], "params": {"q": f"todo {n % 10}"}}),
+        "sync_changes": lambda n: ("GET", "/todos/changes", {"headers": as_user(n)[1], "params": {"since": seeded_token}}),
+        "stats": lambda n: ("GET", "/me/stats", {"headers": as_user(n)[1]}),
+    }
+    results = {}
+    for name, make_request in scenarios.items():
+        if args.only and name not in args.only:
+            continue
+        requests, concurrency = args.requests, args.concurrency
+        if name in ("register", "token"):
+            # argon2 endpoints are ~100x slower than the rest: keep the run short, and stay
+            # within the hashing pool's queue so we measure hashing, not 503 backpressure
+            concurrency = min(concurrency, HASH_WORKERS + HASH_MAX_PENDING)
+            requests = max(concurrency, args.requests // 10)
+        results[name] = await measure(client, make_request, requests, concurrency)
+        print(f"  {name:<12} {results[name]['rps']:>9} req/s  p50 {results[name]['p50_ms']} ms  p99 {results[name]['p99_ms']} ms", file=sys.stderr)
+
+    if not args.only or "bulk_notify" in args.only:
+        bulk = lambda n: ("POST", "/admin/bulk-notify", {"headers": admin, "json": {"title": f"bench {n}", "message": "bench"}})
+        results["bulk_notify"] = await measure(client, bulk, args.bulk_rounds, 1)
+    return results
+
+
+def reminder_job(due: int) -> dict:
+    """Make `due` todos due now and time one dispatch_due_reminders() run."""
+    from sqlalchemy import select, update
+    from sqlmodel import Session
+
+    from app.database import engine
+    from app.models import Todo
+    from app.reminders import dispatch_due_reminders
+
+    with Session(engine) as session:
+        ids = session.execute(select(Todo.id).order_by(Todo.id).limit(due)).scalars().all()
+        session.execute(
+            update(Todo).where(Todo.id.in_(ids)).values(reminder_at=datetime.now() - timedelta(seconds=1), notified=False)
+        )
+        session.commit()
+    started = time.perf_counter()
+    sent = dispatch_due_reminders()
+    seconds = time.perf_counter() - started
+    return {"reminders": sent, "seconds": round(seconds, 3), "per_second": round(sent / seconds, 1) if seconds else 0.0}
+
+
+# -------------------------
+# Modes
+# -------------------------
+
+async def run_inprocess(seeded: dict, args) -> dict:
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        return await run_scenarios(client, seeded, args)
+
+
+def run_server(workdir: str, seeded: dict, args) -> dict:
+    env = dict(BENCH_ENV, DATABASE_URL=os.environ["DATABASE_URL"])
+    server = start_server(workdir, args.port, env)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+        async def go():
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+                return await run_scenarios(client, seeded, args)
+
+        return asyncio.run(go())
+    finally:
+        server.terminate()
+        server.wait()
+
+
+# -------------------------
+# Comparing runs
+# -------------------------
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Scenarios that regressed by more than threshold (0.2 = 20%): lower throughput,
+    or higher p50/p99 latency. Returns a list of human-readable findings.
+    """
+    regressions = []
+    for name, now in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        if name == "reminder_job":
+            checks = [("per_second", now["per_second"], before["per_second"], False)]
+        else:
+            checks = [("rps", now["rps"], before["rps"], False),
+                      ("p50_ms", now["p50_ms"], before["p50_ms"], True),
+                      ("p99_ms", now["p99_ms"], before["p99_ms"], True)]
+        for metric, value, old, lower_is_better in checks:
+            if not value or not old:
+                continue
+            change = (value - old) / old if lower_is_better else (old - value) / old
+            if change > threshold:
+                regressions.append(f"{name}.{metric}: {old} -> {value} ({change:+.0%} worse)")
+    return regressions
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("inprocess", "server"), default="inprocess")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--todos", type=int, default=100, help="todos per user")
+    parser.add_argument("--notifications", type=int, default=50, help="notifications per user")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--bulk-rounds", type=int, default=3)
+    parser.add_argument("--reminders", type=int, default=5000, help="due todos for the reminder_job scenario")
+    parser.add_argument("--only", nargs="*", help="run only these scenarios")
+    parser.add_argument("--database-url", help="seed and benchmark this database instead of a temp SQLite file")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed regression vs --compare (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # app settings are read at import time, so configure before importing app.*
+        os.environ.update(BENCH_ENV)
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+
+        started = time.perf_counter()
+        seeded = seed(args.users, args.todos, args.notifications)
+        print(f"seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        if args.mode == "inprocess":
+            results = asyncio.run(run_inprocess(seeded, args))
+        else:
+            results = run_server(workdir, seeded, args)
+        if not args.only or "reminder_job" in args.only:
+            results["reminder_job"] = reminder_job(args.reminders)
+
+    report = {
+        "meta": {
+            "mode": args.mode,
+            "revision": git_revision(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": "sqlite (temp file)" if not args.database_url else args.database_url.split(":", 1)[0],
+            "users": args.users,
+            "todos_per_user": args.todos,
+            "notifications_per_user": args.notifications,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for key in ("mode", "users", "todos_per_user", "notifications_per_user", "requests", "concurrency"):
+            if baseline.get("meta", {}).get(key) != report["meta"][key]:
+                print(f"warning: baseline was run with {key}={baseline.get('meta', {}).get(key)}, not {report['meta'][key]}", file=sys.stderr)
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:.0%} vs {args.compare}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+# The app reads its settings at import time: point it at a throwaway SQLite
+# file and keep the background workers out of the way before anything imports it.
+_db_dir = tempfile.mkdtemp(prefix="todo-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'todos.db')}"
+os.environ["DB_CREATE_ON_STARTUP"] = "1"
+for worker in ("RUN_REMINDER_DISPATCHER", "RUN_RETENTION", "RUN_STATS_RECONCILER"):
+    os.environ[worker] = "0"
+os.environ.setdefault("METRICS_ENABLED", "0")
+# cheap password hashes, and no request limits unless a test sets them up
+os.environ.update(ARGON2_TIME_COST="1", ARGON2_MEMORY_COST="1024", ARGON2_PARALLELISM="1", RATE_LIMIT_ENABLED="0")
+
+import itertools  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from app.database import create_db_and_tables, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+PASSWORD = "Pw12345678!"
+_usernames = itertools.count(1)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    create_db_and_tables()
+    yield engine
+
+
+@pytest.fixture
+def session(database):
+    with Session(database) as session:
+        yield session
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def new_user(client):
+    """Register a fresh user and return the headers of a logged-in request: new_user() or new_user(is_admin=True)."""
+
+    def register(is_admin: bool = False) -> dict:
+        username = f"user_{next(_usernames)}"
+        assert client.post("/register", json={"username": username, "password": PASSWORD, "is_admin": is_admin}).status_code == 201
+        token = client.post("/token", data={"username": username, "password": PASSWORD}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    return register
@@ -0,0 +1,80 @@
+"""
+The per-worker token -> UserPrincipal cache in app/auth.py: repeat requests
+skip the token decode, deletions through this worker drop the user's tokens
+at once, and deletions through another worker are noticed on revalidation.
+"""
+import pytest
+from sqlmodel import select
+
+from app import auth, crud
+from app.models import User
+
+
+@pytest.fixture
+def stats():
+    """Cache hits/misses since the start of the test."""
+    before = auth.user_cache.stats()
+    return lambda: {key: auth.user_cache.stats()[key] - before[key] for key in ("hits", "misses")}
+
+
+@pytest.fixture
+def revalidate_every_request(monkeypatch):
+    # a ttl of 0 stores nothing, so every cache hit re-reads the user's row
+    monkeypatch.setattr(auth.user_checked, "ttl", 0)
+    auth.user_checked.clear()
+
+
+def user_id(session, headers) -> int:
+    username = auth.user_cache.peek(headers["Authorization"].split()[1]).username
+    return session.exec(select(User.id).where(User.username == username)).one()
+
+
+def test_miss_then_hit(client, new_user, stats):
+    headers = new_user()
+    assert client.get("/me/stats", headers=headers).status_code == 200
+    assert stats() == {"hits": 0, "misses": 1}
+    assert client.get("/me/stats", headers=headers).status_code == 200
+    assert stats() == {"hits": 1, "misses": 1}
+
+
+def test_invalidated_on_delete(client, new_user):
+    headers, admin = new_user(), new_user(is_admin=True)
+    assert client.get("/me/stats", headers=headers).status_code == 200
+    token = headers["Authorization"].split()[1]
+    target = auth.user_cache.peek(token).id
+
+    assert client.delete(f"/admin/users/{target}", headers=admin).status_code == 204
+    assert auth.user_cache.peek(token) is None
+    assert client.get("/me/stats", headers=headers).status_code == 401
+
+
+def test_deleted_elsewhere_within_revalidation(client, new_user, session):
+    headers = new_user()
+    assert client.get("/todos/", headers=headers).status_code == 200
+    # another worker deleted the user: this worker's cache was not invalidated
+    crud.delete_user_cascade(session, user_id(session, headers))
+    session.commit()
+    assert client.get("/todos/", headers=headers).status_code == 200, "checked less than USER_CACHE_REVALIDATE_SECONDS ago"
+
+    auth.user_checked.clear()
+    assert client.get("/todos/", headers=headers).status_code == 401
+    assert auth.user_cache.peek(headers["Authorization"].split()[1]) is None
+
+
+def test_revalidation_sees_admin_change(client, new_user, session, revalidate_every_request):
+    headers = new_user(is_admin=True)
+    assert client.get("/admin/auth-cache", headers=headers).status_code == 200
+    user = session.get(User, user_id(session, headers))
+    user.is_admin = False
+    session.add(user)
+    session.commit()
+    assert client.get("/admin/auth-cache", headers=headers).status_code == 403
+
+
+@pytest.mark.parametrize("path", ["/todos/", "/todos/export"])
+def test_revalidation_in_each_dependency(client, new_user, session, revalidate_every_request, path):
+    headers = new_user()
+    assert client.get(path, headers=headers).status_code == 200
+    crud.delete_user_cascade(session, user_id(session, headers))
+    session.commit()
+    assert client.get(path, headers=headers).status_code == 401
@@ -0,0 +1,131 @@
+"""POST /todos/batch (crud.apply_todo_batch)."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session
+
+from app.database import engine
+from app.models import User
+
+
+def batch(client, headers, *operations):
+    response = client.post("/todos/batch", json={"operations": list(operations)}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def user_row(user_id: int) -> User:
+    with Session(engine) as session:
+        return session.get(User, user_id)
+
+
+@pytest.fixture
+def todos(client, new_user):
+    """(headers, {title: id}) of a user with todos a, b, c and d (d has a pending reminder)."""
+    headers = new_user()
+    ids = {}
+    for title in "abc":
+        ids[title] = client.post("/todos/", json={"title": title}, headers=headers).json()["id"]
+    reminder = (datetime.now() + timedelta(days=1)).isoformat()
+    ids["d"] = client.post("/todos/", json={"title": "d", "reminder_at": reminder}, headers=headers).json()["id"]
+    return headers, ids
+
+
+def titles(client, headers) -> dict:
+    return {todo["title"]: todo for todo in client.get("/todos/?limit=100", headers=headers).json()["items"]}
+
+
+def test_mixed_operations(client, todos):
+    headers, ids = todos
+    result = batch(
+        client, headers,
+        {"op": "create", "todo": {"title": "new"}},
+        {"op": "update", "id": ids["a"], "changes": {"description": "changed"}},
+        {"op": "complete", "id": ids["b"]},
+        {"op": "delete", "id": ids["c"]},
+    )
+    assert (result["applied"], result["failed"]) == (4, 0)
+    assert [r["ok"] for r in result["results"]] == [True] * 4
+    after = titles(client, headers)
+    assert set(after) == {"a", "b", "d", "new"}
+    assert after["new"]["id"] == result["results"][0]["id"]
+    assert after["a"]["description"] == "changed"
+    assert after["b"]["completed"] is True
+
+
+def test_per_item_errors(client, new_user, todos):
+    headers, ids = todos
+    foreign = client.post("/todos/", json={"title": "theirs"}, headers=new_user()).json()["id"]
+    result = batch(
+        client, headers,
+        {"op": "complete", "id": foreign},
+        {"op": "delete", "id": 10**9},
+        {"op": "create", "todo": {"title": "a"}},
+        {"op": "update", "id": ids["b"], "changes": {"title": "c"}},
+        {"op": "update", "id": ids["a"]},
+        {"op": "complete", "id": ids["d"]},
+    )
+    errors = [r["error"] for r in result["results"]]
+    assert errors[:2] == ["Todo not found", "Todo not found"]
+    assert errors[2] == errors[3] == "You already have a todo with this title."
+    assert errors[4] == "update needs a 'changes' object"
+    assert errors[5] is None
+    assert (result["applied"], result["failed"]) == (1, 5)
+    assert titles(client, headers)["d"]["completed"] is True
+
+
+@pytest.mark.parametrize("order", ["a_first", "b_first"])
+def test_chained_renames(client, todos, order):
+    headers, ids = todos
+    renames = [
+        {"op": "update", "id": ids["a"], "changes": {"title": "b"}},
+        {"op": "update", "id": ids["b"], "changes": {"title": "new"}},
+    ]
+    result = batch(client, headers, *(renames if order == "a_first" else renames[::-1]))
+    assert result["failed"] == 0
+    after = titles(client, headers)
+    assert (after["b"]["id"], after["new"]["id"]) == (ids["a"], ids["b"])
+
+
+def test_swap_titles(client, todos):
+    headers, ids = todos
+    batch(
+        client, headers,
+        {"op": "update", "id": ids["a"], "changes": {"title": "b"}},
+        {"op": "update", "id": ids["b"], "changes": {"title": "a"}},
+    )
+    after = titles(client, headers)
+    assert (after["a"]["id"], after["b"]["id"]) == (ids["b"], ids["a"])
+
+
+def test_counters_and_data_version(client, todos):
+    headers, ids = todos
+    owner_id = titles(client, headers)["a"]["owner_id"]
+    before = user_row(owner_id)
+    assert (before.todo_count, before.completed_count, before.reminder_count) == (4, 0, 1)
+    reminder = (datetime.now() + timedelta(days=2)).isoformat()
+    batch(
+        client, headers,
+        {"op": "create", "todo": {"title": "x", "reminder_at": reminder}},
+        {"op": "create", "todo": {"title": "y", "completed": True}},
+        {"op": "complete", "id": ids["a"]},
+        {"op": "delete", "id": ids["d"]},
+        {"op": "update", "id": ids["b"], "changes": {"reminder_at": reminder}},
+        {"op": "delete", "id": 10**9},
+    )
+    after = user_row(owner_id)
+    # +2 created -1 deleted; a and y completed; x and b gained a reminder, d's went with it
+    assert (after.todo_count, after.completed_count, after.reminder_count) == (5, 2, 2)
+    # one version for the whole batch, whatever the number of operations
+    assert after.data_version == before.data_version + 1
+    stats = client.get("/me/stats", headers=headers).json()
+    assert (stats["total"], stats["completed"], stats["pending_reminders"]) == (5, 2, 2)
+
+
+def test_nothing_valid_changes_nothing(client, todos):
+    headers, ids = todos
+    owner_id = titles(client, headers)["a"]["owner_id"]
+    version = user_row(owner_id).data_version
+    result = batch(client, headers, {"op": "delete", "id": 10**9})
+    assert result["applied"] == 0
+    assert user_row(owner_id).data_version == version
@@ -0,0 +1,40 @@
+"""Conditional GET of /me/dashboard (app/dashboard.py)."""
+
+
+def dashboard(client, headers, etag=None):
+    if etag is not None:
+        headers = {**headers, "If-None-Match": etag}
+    return client.get("/me/dashboard", headers=headers)
+
+
+def test_etag_changes_with_writes(client, new_user):
+    headers = new_user()
+    first = dashboard(client, headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    replay = dashboard(client, headers, etag)
+    assert replay.status_code == 304 and replay.headers["ETag"] == etag and not replay.content
+    assert dashboard(client, headers, f'W/"other", {etag}').status_code == 304
+
+    todo = client.post("/todos/", json={"title": "new"}, headers=headers).json()
+    after_write = dashboard(client, headers, etag)
+    assert after_write.status_code == 200
+    assert after_write.headers["ETag"] != etag
+    assert [item["id"] for item in after_write.json()["todos"]] == [todo["id"]]
+    assert dashboard(client, headers, after_write.headers["ETag"]).status_code == 304
+
+
+def test_etag_per_limits_and_user(client, new_user):
+    headers, other = new_user(), new_user()
+    etag = dashboard(client, headers).headers["ETag"]
+    assert client.get("/me/dashboard?todo_limit=5", headers={**headers, "If-None-Match": etag}).status_code == 200
+    assert dashboard(client, other, etag).status_code == 200
+
+
+def test_cached_body_matches_fresh_one(client, new_user):
+    headers = new_user()
+    client.post("/todos/", json={"title": "cached"}, headers=headers)
+    first, second = dashboard(client, headers), dashboard(client, headers)
+    assert second.status_code == 200 and second.headers["ETag"] == first.headers["ETag"]
+    assert second.json() == first.json()
@@ -0,0 +1,76 @@
+"""Parsing of streamed imports (app/transfer.py) and the export/import endpoints."""
+import asyncio
+import json
+
+import pytest
+
+from app import transfer
+from app.database import get_session
+from app.main import app
+from app.transfer import TOO_LONG, iter_lines, iter_records, parse_todo
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def collect(iterator) -> list:
+    async def run():
+        return [item async for item in iterator]
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_lines_over_the_limit_are_dropped(size):
+    body = b"short\n" + b"x" * 50 + b"\nnext\r\n" + b"y" * 30
+    lines = collect(iter_lines(chunked(body, size), max_length=20))
+    assert lines == ["short", TOO_LONG, "next", TOO_LONG]
+
+
+def test_oversized_records_are_reported(monkeypatch):
+    monkeypatch.setattr(transfer, "IMPORT_MAX_LINE_LENGTH", 100)
+    body = "\n".join([json.dumps({"title": "ok"}), json.dumps({"title": "t" * 200}), json.dumps({"title": "after"})]).encode()
+    records = collect(iter_records(iter_lines(chunked(body, 16), max_length=100), "ndjson"))
+    assert [line for line, _ in records] == [1, 2, 3]
+    assert records[1][1] is TOO_LONG
+    with pytest.raises(ValueError, match="longer than 100"):
+        parse_todo(records[1][1])
+    assert parse_todo(records[2][1]).title == "after"
+
+
+def test_unbalanced_csv_quote_is_bounded(monkeypatch):
+    monkeypatch.setattr(transfer, "IMPORT_MAX_LINE_LENGTH", 100)
+    body = ("title,description\nok,fine\n" + 'bad,"never closed\n' + "more text\n" * 50).encode()
+    records = collect(iter_records(iter_lines(chunked(body, 64)), "csv"))
+    assert records[0] == (2, {"title": "ok", "description": "fine"})
+    assert records[1] == (3, TOO_LONG)
+
+
+@pytest.fixture
+def no_sessions():
+    """Fail any endpoint that depends on get_session while active."""
+
+    def refuse():
+        raise AssertionError("streaming endpoint opened a request-scoped session")
+        yield
+
+    app.dependency_overrides[get_session] = refuse
+    yield
+    del app.dependency_overrides[get_session]
+
+
+@pytest.fixture
+def headers(new_user):
+    return new_user()
+
+
+def test_round_trip_without_request_session(client, headers, no_sessions):
+    body = "\n".join(json.dumps({"title": title}) for title in ["one", "two", "one"]).encode()
+    result = client.post("/todos/import", headers=headers, content=body).json()
+    assert (result["imported"], result["duplicates"]) == (2, 1)
+
+    exported = client.get("/todos/export", headers=headers).text.splitlines()
+    assert [json.loads(line)["title"] for line in exported] == ["one", "two"]
+    assert client.get("/todos/export", headers={"Authorization": "Bearer nope"}).status_code == 401
@@ -0,0 +1,56 @@
+"""
+Import-time budget for app.main (what every API worker and every script that
+imports the app pays before doing anything), measured with
+`python -X importtime -c "import app.main"` in fresh interpreters.
+IMPORT_BUDGET_MS overrides the budget on slow machines.
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+RUNS = 3
+
+# loaded lazily by app.auth.password_context / app.database.get_async_engine
+LAZY_MODULES = ("passlib.context", "passlib.handlers.argon2", "sqlalchemy.ext.asyncio", "aiosqlite", "asyncpg")
+
+
+def import_profile(workdir: str) -> dict:
+    """{module: (self_us, cumulative_us)} for one fresh `import app.main`."""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'import.db')}", DB_ASYNC="0")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+@pytest.fixture(scope="module")
+def profiles(tmp_path_factory):
+    workdir = str(tmp_path_factory.mktemp("import-time"))
+    return [import_profile(workdir) for _ in range(RUNS)]
+
+
+def test_import_budget(profiles):
+    total_ms = statistics.median(profile["app.main"][1] / 1000 for profile in profiles)
+    last = profiles[-1]
+    # app modules and top-level third-party packages, by cumulative time
+    tracked = [name for name in last if name.startswith("app.") or ("." not in name and name != "app")]
+    slowest = {name: round(last[name][1] / 1000, 1) for name in sorted(tracked, key=lambda name: last[name][1], reverse=True)[:10]}
+    assert total_ms <= IMPORT_BUDGET_MS, f"import app.main took {total_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms); slowest: {slowest}"
+
+
+def test_lazy_modules_stay_lazy(profiles):
+    eager = [name for name in LAZY_MODULES if name in profiles[-1]]
+    assert not eager, f"should be imported on first use only: {', '.join(eager)}"
@@ -0,0 +1,48 @@
+"""Background job state lives in the database (app/jobs.py), not in the worker that runs the job."""
+import threading
+import time
+
+from app.jobs import get_job, submit_job
+
+
+def wait_until_finished(job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = get_job(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+def test_progress_and_result_are_stored():
+    halfway, resume = threading.Event(), threading.Event()
+
+    def work(job):
+        job.progress(5, 10)
+        halfway.set()
+        resume.wait(5)
+        job.progress(10)
+        return {"created": 10}
+
+    job = submit_job("test", work)
+    assert halfway.wait(5)
+    running = get_job(job.id)
+    assert (running["status"], running["done"], running["total"], running["percent"]) == ("running", 5, 10, 50.0)
+    resume.set()
+    finished = wait_until_finished(job.id)
+    assert (finished["status"], finished["done"], finished["result"]) == ("done", 10, {"created": 10})
+    assert finished["finished_at"] is not None
+
+
+def test_failure_is_stored():
+    def work(job):
+        raise RuntimeError("boom")
+
+    job = submit_job("test", work)
+    finished = wait_until_finished(job.id)
+    assert (finished["status"], finished["error"], finished["result"]) == ("failed", "boom", None)
+
+
+def test_unknown_job():
+    assert get_job("nope") is None
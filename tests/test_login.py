@@ -0,0 +1,76 @@
+"""Failed-login throttling and the bounded hashing pool behind POST /token and /register (app/auth.py)."""
+import threading
+
+import pytest
+
+from app import auth
+from app.hashing import HashingPool
+from app.ratelimit import AttemptLimiter
+from conftest import PASSWORD
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Fresh limiters: 3 failures per (username, IP), 5 per IP."""
+    monkeypatch.setattr(auth, "user_failures", AttemptLimiter(3, 60))
+    monkeypatch.setattr(auth, "ip_failures", AttemptLimiter(5, 60))
+
+
+@pytest.fixture
+def usernames(new_user):
+    """usernames() -> the name of a freshly registered user."""
+    return lambda: auth.decode_token(new_user()["Authorization"].split()[1])["sub"]
+
+
+def login(client, username: str, password: str = PASSWORD):
+    return client.post("/token", data={"username": username, "password": password})
+
+
+def test_user_limit_with_retry_after(client, limits, usernames):
+    username, other = usernames(), usernames()
+    assert [login(client, username, "wrong").status_code for _ in range(3)] == [401, 401, 401]
+    refused = login(client, username)
+    assert refused.status_code == 429
+    assert 1 <= int(refused.headers["Retry-After"]) <= 60
+    # the limit is per username: someone else on the same IP still logs in
+    assert login(client, other).status_code == 200
+
+
+def test_success_clears_failures(client, limits, usernames):
+    username = usernames()
+    assert [login(client, username, "wrong").status_code for _ in range(2)] == [401, 401]
+    assert login(client, username).status_code == 200
+    assert [login(client, username, "wrong").status_code for _ in range(2)] == [401, 401]
+    assert login(client, username).status_code == 200
+
+
+def test_ip_limit_across_usernames(client, limits, usernames):
+    *failing, last = [usernames() for _ in range(6)]
+    for username in failing:
+        assert login(client, username, "wrong").status_code == 401
+    assert login(client, last).status_code == 429
+    assert client.post("/register", json={"username": "throttled", "password": PASSWORD}).status_code == 429
+
+
+@pytest.fixture
+def saturate(monkeypatch):
+    """saturate() -> a hashing pool, now in use, whose only slot is taken until the test ends."""
+    release = threading.Event()
+
+    def fill() -> HashingPool:
+        pool = HashingPool(workers=1, max_pending=0)
+        pool.submit(release.wait)
+        monkeypatch.setattr(auth, "hash_pool", pool)
+        return pool
+
+    yield fill
+    release.set()
+
+
+def test_503_when_hashing_pool_is_full(client, usernames, saturate):
+    username = usernames()
+    saturated_pool = saturate()
+    refused = login(client, username)
+    assert refused.status_code == 503 and refused.headers["Retry-After"] == "1"
+    assert client.post("/register", json={"username": "overloaded", "password": PASSWORD}).status_code == 503
+    assert saturated_pool.stats()["rejected"] == 2
@@ -0,0 +1,42 @@
+"""Who may read /metrics (app/routers/admin.py)."""
+import ipaddress
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import admin
+
+
+@pytest.fixture
+def token(monkeypatch):
+    monkeypatch.setattr(admin, "METRICS_TOKEN", "scrape-me")
+    monkeypatch.setattr(admin, "METRICS_ALLOWED_IPS", [ipaddress.ip_network("10.0.0.0/8")])
+
+
+@pytest.mark.parametrize(
+    "authorization, client_host, allowed",
+    [
+        ("Bearer scrape-me", "203.0.113.7", True),
+        ("Bearer wrong", "203.0.113.7", False),
+        ("", "203.0.113.7", False),
+        ("", "10.1.2.3", True),
+        ("", "testclient", False),
+    ],
+)
+def test_token_or_allowlist(token, authorization, client_host, allowed):
+    assert admin.metrics_access_allowed(authorization, client_host) is allowed
+
+
+def test_no_token_configured(monkeypatch):
+    monkeypatch.setattr(admin, "METRICS_TOKEN", "")
+    assert not admin.metrics_access_allowed("Bearer ", "203.0.113.7")
+    assert admin.metrics_access_allowed("", "127.0.0.1")
+
+
+def test_endpoint(token):
+    with TestClient(app) as client:
+        assert client.get("/metrics").status_code == 403
+        response = client.get("/metrics", headers={"Authorization": "Bearer scrape-me"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
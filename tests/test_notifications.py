@@ -0,0 +1,71 @@
+"""POST /notifications/read and the unread counter behind /notifications/unread-count."""
+import pytest
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from app import crud
+from app.database import engine
+from app.models import Notification, User
+
+
+@pytest.fixture
+def notified(client, new_user):
+    """(headers, notification ids oldest first) of a user with five unread notifications."""
+    headers = new_user()
+    client.post("/todos/", json={"title": "owner"}, headers=headers)
+    user_id = client.get("/todos/", headers=headers).json()["items"][0]["owner_id"]
+    with Session(engine) as session:
+        ids = session.execute(
+            insert(Notification).returning(Notification.id),
+            [{"title": f"n{i}", "user_id": user_id} for i in range(5)],
+        ).scalars().all()
+        # written around the API: bring the counter in line, as the API would have
+        session.execute(crud.bump_data_version(User.id == user_id, unread_delta=len(ids)))
+        session.commit()
+    return headers, sorted(ids)
+
+
+def unread(client, headers) -> int:
+    count = client.get("/notifications/unread-count", headers=headers).json()["unread"]
+    listed = client.get("/notifications", params={"unread": "true", "limit": 100}, headers=headers).json()["items"]
+    assert count == len(listed), "counter and unread rows disagree"
+    return count
+
+
+def mark(client, headers, **body) -> dict:
+    response = client.post("/notifications/read", json=body, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_mark_by_ids_up_to_id_and_all(client, notified):
+    headers, ids = notified
+    assert unread(client, headers) == 5
+    assert mark(client, headers, ids=[ids[0], ids[3]]) == {"marked": 2, "unread": 3}
+    assert unread(client, headers) == 3
+    # ids[0] is already read: only ids[1] and ids[2] change
+    assert mark(client, headers, up_to_id=ids[2]) == {"marked": 2, "unread": 1}
+    assert unread(client, headers) == 1
+    assert mark(client, headers, all=True) == {"marked": 1, "unread": 0}
+    assert unread(client, headers) == 0
+
+
+def test_marking_twice_counts_once(client, notified):
+    headers, ids = notified
+    assert mark(client, headers, ids=ids[:2]) == {"marked": 2, "unread": 3}
+    assert mark(client, headers, ids=ids[:2]) == {"marked": 0, "unread": 3}
+    assert mark(client, headers, ids=[ids[2], ids[2]]) == {"marked": 1, "unread": 2}
+    assert unread(client, headers) == 2
+
+
+def test_other_users_ids_are_ignored(client, notified, new_user):
+    headers, ids = notified
+    other = new_user()
+    assert mark(client, other, ids=ids) == {"marked": 0, "unread": 0}
+    assert mark(client, other, all=True)["marked"] == 0
+    assert unread(client, headers) == 5
+
+
+def test_selection_required(client, notified):
+    headers, _ = notified
+    assert client.post("/notifications/read", json={}, headers=headers).status_code == 422
@@ -0,0 +1,22 @@
+"""Loading the configured backends (app/plugins.py)."""
+import pytest
+
+from app.events import Broker, LocalBroker, load_broker
+from app.plugins import load_instance
+from app.ratelimit import BucketStore, InMemorySharedStore, load_bucket_store
+
+
+def test_loads_configured_classes():
+    assert isinstance(load_broker("app.events:LocalBroker"), LocalBroker)
+    assert isinstance(load_bucket_store("app.ratelimit:InMemorySharedStore"), InMemorySharedStore)
+
+
+@pytest.mark.parametrize("path", ["app.events", ":LocalBroker", "app.events:NoSuchClass", "app.ratelimit:LocalBucketStore", "app.events:logger"])
+def test_rejects_bad_paths(path):
+    with pytest.raises(ValueError):
+        load_instance(path, Broker)
+
+
+def test_missing_module():
+    with pytest.raises(ImportError):
+        load_instance("app.no_such_module:Store", BucketStore)
@@ -0,0 +1,157 @@
+"""
+EXPLAIN QUERY PLAN of the queries behind the endpoints and background jobs on
+a fresh SQLite database: each one has to find its rows through an index
+(app/models.py), never by scanning a table, and a page comes out of the index
+in order rather than through a temp b-tree sort.
+"""
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from sqlalchemy import event, func
+from sqlmodel import SQLModel, select
+
+from app import crud, jobs, reminders, retention, search, stats, sync
+from app.database import engine
+from app.models import Todo
+from app.pagination import NotificationListParams, TodoListParams
+
+
+@pytest.fixture
+def query_plans():
+    """The plan of every statement run while the fixture is active, one list of detail lines each."""
+    plans: List[List[str]] = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        rows = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        plans.append([row[3] for row in rows])
+
+    event.listen(engine, "before_cursor_execute", explain)
+    yield plans
+    event.remove(engine, "before_cursor_execute", explain)
+
+
+@pytest.fixture
+def user_id(session):
+    user_id = crud.create_user(session, "plans", "not-a-hash", False).id
+    session.commit()
+    yield user_id
+    crud.delete_user_cascade(session, user_id)
+    session.commit()
+
+
+def assert_indexed(plan: List[str], *indexes: str, sorted_by_index: bool = True) -> None:
+    for line in plan:
+        words = line.split()
+        # "SCAN table" without USING reads the whole table; scanning a subquery's few rows is fine
+        assert not (words[0] == "SCAN" and words[1] in SQLModel.metadata.tables and "USING" not in words), plan
+        assert not (sorted_by_index and "TEMP B-TREE" in line), plan
+    for index in indexes:
+        assert any(f"INDEX {index} " in f"{line} " for line in plan), f"{index} not used: {plan}"
+
+
+def todo_params(**overrides) -> TodoListParams:
+    values = dict(limit=10, cursor=None, sort="-updated_at", completed=None, due_after=None, due_before=None, has_reminder=None)
+    return TodoListParams(**{**values, **overrides})
+
+
+def notification_params(**overrides) -> NotificationListParams:
+    return NotificationListParams(**{**dict(limit=10, cursor=None, sort="-created_at", unread=None), **overrides})
+
+
+@pytest.mark.parametrize(
+    "params, index",
+    [
+        (todo_params(), "ix_todo_owner_updated"),
+        (todo_params(sort="updated_at", completed=False), "ix_todo_owner_updated"),
+        (todo_params(sort="-created_at", has_reminder=True), "ix_todo_owner_created"),
+        (todo_params(due_after=datetime(2026, 1, 1), due_before=datetime(2027, 1, 1)), "ix_todo_owner_updated"),
+    ],
+)
+def test_todo_list(session, query_plans, user_id, params, index):
+    session.execute(*crud.todo_list_statement(user_id, params)).all()
+    assert_indexed(query_plans[-1], index)
+
+
+def test_todo_list_next_page(session, query_plans, user_id):
+    # a page after the first: the cursor condition must stay on the index
+    session.add(Todo(title="a", owner_id=user_id))
+    session.add(Todo(title="b", owner_id=user_id))
+    session.flush()
+    first = crud.list_todos(session, user_id, todo_params(limit=1))
+    session.execute(*crud.todo_list_statement(user_id, todo_params(limit=1, cursor=first["next_cursor"]))).all()
+    assert_indexed(query_plans[-1], "ix_todo_owner_updated")
+    session.rollback()
+
+
+@pytest.mark.parametrize("unread", [None, True, False])
+def test_notification_list(session, query_plans, user_id, unread):
+    session.execute(*crud.notification_list_statement(user_id, notification_params(unread=unread))).all()
+    assert_indexed(query_plans[-1])
+    assert any("INDEX ix_notification_user_" in line for line in query_plans[-1]), query_plans[-1]
+
+
+def test_duplicate_title(session, query_plans, user_id):
+    session.execute(*crud.duplicate_title_statement(user_id, "milk")).all()
+    assert_indexed(query_plans[-1], "uq_todo_owner_title")
+
+
+def test_dashboard(session, query_plans, user_id):
+    todos, notifications = crud.dashboard_statements(user_id, 5, 5)
+    session.execute(*todos).all()
+    session.execute(*notifications).all()
+    assert_indexed(query_plans[-2], "ix_todo_owner_updated")
+    assert_indexed(query_plans[-1], "ix_notification_user_created")
+
+
+def test_search(session, query_plans, user_id):
+    params = search.TodoSearchParams(q="milk", limit=10, cursor=None)
+    session.execute(*search.search_statement("sqlite", user_id, params)).all()
+    # ranked by relevance: only the matches found through the FTS index are sorted
+    assert_indexed(query_plans[-1], sorted_by_index=False)
+    assert "VIRTUAL TABLE INDEX" in query_plans[-1][0], query_plans[-1]
+    session.execute(*search.todos_by_ids(user_id, [1, 2, 3])).all()
+    assert_indexed(query_plans[-1])
+
+
+def test_stats(session, query_plans, user_id):
+    stats.user_stats(session, user_id)
+    assert_indexed(query_plans[-1], "ix_todo_open_due")
+
+
+def test_delta_sync(session, query_plans, user_id):
+    sync.changes_page(session, user_id, sync.ChangesParams(since=sync.encode_sync_token(0), limit=10))
+    # where the page ends: the first limit+1 change_seqs of todos and tombstones, merged
+    assert_indexed(query_plans[-3], "ix_todo_owner_change", "ix_tombstone_owner_change", sorted_by_index=False)
+    for plan in query_plans[-2:]:
+        assert_indexed(plan)
+    assert any("INDEX ix_todo_owner_change" in line for line in query_plans[-2])
+    assert any("INDEX ix_tombstone_owner_change" in line for line in query_plans[-1])
+
+
+def test_pending_reminders(session, query_plans):
+    reminders.claim_due_reminders(session, datetime.now(), 10)
+    assert_indexed(query_plans[-1], "ix_todo_pending_reminder")
+    session.rollback()
+    session.execute(select(func.min(Todo.reminder_at)).where(reminders.pending_reminders())).one()
+    assert_indexed(query_plans[-1], "ix_todo_pending_reminder")
+
+
+def test_retention(query_plans):
+    retention.purge_read_notifications(datetime.now() - timedelta(days=30))
+    assert any("INDEX ix_notification_read_at" in line for line in query_plans[0]), query_plans[0]
+    sync.purge_tombstones(datetime.now() - timedelta(days=30))
+    assert_indexed(query_plans[-1], "ix_tombstone_deleted_at")
+
+
+def test_unread_count(session, query_plans, user_id):
+    session.execute(*crud.unread_count_statement(user_id)).one()
+    session.execute(*crud.data_version_statement(user_id)).one()
+    for plan in query_plans[-2:]:
+        assert_indexed(plan)
+        assert any("INTEGER PRIMARY KEY" in line for line in plan), plan
+
+
+def test_job_pruning(query_plans):
+    jobs.submit_job("noop", lambda job: {})
+    assert_indexed(query_plans[0], "ix_backgroundjob_finished_at")
@@ -0,0 +1,64 @@
+"""RateLimitMiddleware (app/ratelimit.py) over a bare app, with limits small enough to hit."""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import ratelimit
+from app.ratelimit import InMemorySharedStore, LocalBucketStore, RateLimitMiddleware
+
+# slow enough that nothing refills during a test
+RATE = 0.001
+
+
+@pytest.fixture(params=[LocalBucketStore, InMemorySharedStore])
+def limited(request, monkeypatch):
+    """limited(burst, routes) -> a TestClient of an app behind the middleware; the bearer token is the subject."""
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+
+    def build(burst: float, routes: str = "") -> TestClient:
+        app = FastAPI()
+        for path in ("/cheap", "/expensive", "/items/{item_id}"):
+            app.add_api_route(path, lambda: {"ok": True})
+        app.add_middleware(RateLimitMiddleware, subject_of_token=lambda token: token, store=request.param(), rate=RATE, burst=burst, routes=routes)
+        return TestClient(app)
+
+    return build
+
+
+def get(client, path: str, user: str = "alice") -> int:
+    return client.get(path, headers={"Authorization": f"Bearer {user}"}).status_code
+
+
+def test_429_with_retry_after(limited):
+    client = limited(burst=2)
+    assert [get(client, "/cheap") for _ in range(2)] == [200, 200]
+    refused = client.get("/cheap", headers={"Authorization": "Bearer alice"})
+    assert refused.status_code == 429
+    # one token at RATE per second
+    assert int(refused.headers["Retry-After"]) == pytest.approx(1 / RATE, rel=0.01)
+    assert get(client, "/cheap", user="bob") == 200
+    # without a token the client is its IP
+    assert client.get("/cheap").status_code == 200
+
+
+def test_route_buckets_are_separate(limited):
+    client = limited(burst=10, routes="GET /expensive=0.001:1;GET /items/{item_id}=0.001:2")
+    assert [get(client, "/expensive") for _ in range(2)] == [200, 429]
+    assert get(client, "/cheap") == 200
+    assert get(client, "/expensive", user="bob") == 200
+    # a templated route shares one bucket across its paths
+    assert [get(client, f"/items/{i}") for i in range(3)] == [200, 200, 429]
+
+
+def test_refused_request_charges_nothing(limited):
+    client = limited(burst=4, routes="GET /expensive=0.001:1:2")
+    assert get(client, "/expensive") == 200  # client bucket 4 -> 2, route bucket 1 -> 0
+    for _ in range(3):
+        assert get(client, "/expensive") == 429  # refused by the route: the client bucket keeps its 2
+    assert [get(client, "/cheap") for _ in range(3)] == [200, 200, 429]
+
+
+def test_disabled(limited, monkeypatch):
+    client = limited(burst=1)
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", False)
+    assert [get(client, "/cheap") for _ in range(3)] == [200, 200, 200]
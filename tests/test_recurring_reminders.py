@@ -0,0 +1,84 @@
+"""
+dispatch_due_reminders() over recurring and one-shot reminders due in the same
+minute (benchmarks/bench_recurring.py times the same dispatch at scale).
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert
+from sqlmodel import select
+
+from app import crud
+from app.models import Notification, Todo, User
+from app.recurrence import parse_rule
+from app.reminders import dispatch_due_reminders
+
+RULES = ["daily", "weekly", "every 15 minutes", "0 9 * * 1-5", "*/5 * * * *"]
+
+
+@pytest.fixture
+def owners(session):
+    ids = [crud.create_user(session, f"recurring{i}", "not-a-hash", False).id for i in range(3)]
+    session.commit()
+    yield ids
+    for user_id in ids:
+        crud.delete_user_cascade(session, user_id)
+    session.commit()
+
+
+def seed_due(session, owners, count: int = 60) -> dict:
+    """`count` todos due within the last minute, every fifth one a one-shot reminder: {id: (rule, reminder_at)}."""
+    now = datetime.now().replace(microsecond=0)
+    rows = []
+    for i in range(count):
+        rows.append({
+            "title": f"due {i}", "owner_id": owners[i % len(owners)], "created_at": now, "updated_at": now,
+            "reminder_at": now - timedelta(seconds=1 + i % 59), "recurrence": None if i % 5 == 4 else RULES[i % len(RULES)],
+            "notified": False, "completed": False,
+        })
+    session.execute(insert(Todo), rows)
+    # written around the API: bring the counters in line, as the API would have
+    for owner in owners:
+        pending = sum(1 for row in rows if row["owner_id"] == owner)
+        session.execute(*crud.add_counts(owner, crud.TodoCounts(todos=pending, reminders=pending)))
+    session.commit()
+    return {todo.id: (todo.recurrence, todo.reminder_at) for todo in session.exec(select(Todo).where(Todo.owner_id.in_(owners)))}
+
+
+def test_each_due_reminder_fires_once(session, owners):
+    due = seed_due(session, owners)
+    started_at = datetime.now()
+
+    assert dispatch_due_reminders() == len(due)
+    assert dispatch_due_reminders() == 0, "second dispatch sent reminders again"
+
+    session.expire_all()
+    notified = session.exec(select(Notification.todo_id).where(Notification.user_id.in_(owners))).all()
+    assert sorted(notified) == sorted(due), "every due todo needs exactly one notification"
+    todos = {todo.id: todo for todo in session.exec(select(Todo).where(Todo.owner_id.in_(owners)))}
+    for todo_id, (rule, reminder_at) in due.items():
+        todo = todos[todo_id]
+        if rule is None:
+            assert todo.notified, f"one-shot todo {todo_id} not marked notified"
+            continue
+        assert not todo.notified and todo.reminder_at > started_at, f"recurring todo {todo_id} not re-armed"
+        step = parse_rule(rule)
+        if isinstance(step, timedelta):
+            assert todo.reminder_at == reminder_at + step, f"todo {todo_id} lost its phase"
+
+
+def test_counters_follow_dispatch(session, owners):
+    due = seed_due(session, owners)
+    dispatch_due_reminders()
+
+    session.expire_all()
+    for owner in owners:
+        user = session.get(User, owner)
+        notifications = session.exec(select(func.count()).select_from(Notification).where(Notification.user_id == owner)).one()
+        pending = session.exec(
+            select(func.count()).select_from(Todo).where(Todo.owner_id == owner, Todo.reminder_at != None, Todo.notified == False)
+        ).one()
+        assert user.unread_notifications == notifications
+        assert user.reminder_count == pending
+    # the recurring four fifths stay pending, the one-shot fifth is done
+    assert sum(session.get(User, owner).reminder_count for owner in owners) == sum(1 for rule, _ in due.values() if rule)
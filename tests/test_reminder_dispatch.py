@@ -0,0 +1,83 @@
+"""The reminder dispatcher against concurrent API writes (app/reminders.py)."""
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, select
+
+from app import reminders
+from app.database import engine
+from app.models import Todo, User
+from app.reminders import claim_due_reminders, dispatch_due_reminders
+
+
+def test_owner_rows_are_locked_before_todos(client, new_user):
+    headers = new_user()
+    client.post("/todos/", json={"title": "due", "reminder_at": (datetime.now() - timedelta(seconds=1)).isoformat()}, headers=headers)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with Session(engine) as session:
+            assert claim_due_reminders(session, datetime.now(), 100)
+            session.rollback()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    lock_user = next(i for i, sql in enumerate(statements) if sql.startswith("SELECT user.id FROM user"))
+    claim_todo = next(i for i, sql in enumerate(statements) if sql.startswith("UPDATE todo"))
+    assert lock_user < claim_todo, statements
+    # SQLite leaves FOR UPDATE out; Postgres gets it
+    assert "FOR UPDATE SKIP LOCKED" in str(reminders._LOCK_OWNERS.compile(dialect=postgresql.dialect()))
+
+
+def test_dispatch_racing_patches(client, new_user):
+    headers = new_user()
+    past = (datetime.now() - timedelta(seconds=1)).isoformat()
+    ids = [client.post("/todos/", json={"title": f"race {i}", "reminder_at": past}, headers=headers).json()["id"] for i in range(40)]
+    errors = []
+
+    def dispatch():
+        try:
+            for _ in range(5):
+                dispatch_due_reminders(batch_size=5)
+        except Exception as e:
+            errors.append(e)
+
+    dispatcher = threading.Thread(target=dispatch)
+    dispatcher.start()
+    statuses = [client.patch(f"/todos/{todo_id}", json={"completed": True, "reminder_at": past}, headers=headers).status_code for todo_id in ids]
+    dispatcher.join(30)
+    dispatch_due_reminders()
+
+    assert not errors and statuses == [200] * len(ids)
+    owner_id = client.get("/todos/?limit=1", headers=headers).json()["items"][0]["owner_id"]
+    with Session(engine) as session:
+        user = session.get(User, owner_id)
+        pending = session.exec(
+            select(func.count()).select_from(Todo).where(Todo.owner_id == owner_id, Todo.reminder_at != None, Todo.notified == False)
+        ).one()
+        assert (user.todo_count, user.completed_count, user.reminder_count) == (len(ids), len(ids), pending)
+
+
+def test_empty_dispatch_is_not_a_batch():
+    metrics = reminders.DispatchMetrics()
+    metrics.record_batch(0, [])
+    metrics.record_batch(2, [1.0, 3.0])
+    snapshot = metrics.snapshot()
+    assert (snapshot["batches_total"], snapshot["dispatched_total"]) == (1, 2)
+
+
+def test_sleeps_until_next_reminder(monkeypatch):
+    dispatcher = reminders.ReminderDispatcher(interval=30)
+    monkeypatch.setattr(reminders, "next_reminder_at", lambda: None)
+    assert dispatcher.next_wait() == 30
+    monkeypatch.setattr(reminders, "next_reminder_at", lambda: datetime.now() + timedelta(seconds=10))
+    assert 9 < dispatcher.next_wait() <= 10
+    monkeypatch.setattr(reminders, "next_reminder_at", lambda: datetime.now() + timedelta(hours=1))
+    assert dispatcher.next_wait() == 30
+    monkeypatch.setattr(reminders, "next_reminder_at", lambda: datetime.now() - timedelta(seconds=5))
+    assert dispatcher.next_wait() == 0
@@ -0,0 +1,80 @@
+"""GET /todos/search: the FTS index follows every write path and results stay with their owner (app/search.py)."""
+import pytest
+
+
+def search(client, headers, q: str, **params) -> list:
+    response = client.get("/todos/search", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def found(client, headers, q: str) -> set:
+    return {todo["id"] for todo in search(client, headers, q, limit=100)["items"]}
+
+
+def create(client, headers, **todo) -> int:
+    response = client.post("/todos/", json=todo, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+@pytest.fixture
+def headers(new_user):
+    return new_user()
+
+
+def test_single_writes(client, headers):
+    todo = create(client, headers, title="buy milk", description="semi skimmed")
+    assert found(client, headers, "milk") == found(client, headers, "skim") == {todo}
+
+    client.patch(f"/todos/{todo}", json={"title": "buy bread"}, headers=headers)
+    assert found(client, headers, "milk") == set()
+    assert found(client, headers, "bread") == found(client, headers, "skimmed") == {todo}
+    # a write that doesn't touch the indexed columns leaves the index alone
+    client.patch(f"/todos/{todo}", json={"completed": True}, headers=headers)
+    assert found(client, headers, "bread") == {todo}
+
+    client.put(f"/todos/{todo}", json={"title": "call mum"}, headers=headers)
+    assert found(client, headers, "bread") == found(client, headers, "skimmed") == set()
+    assert found(client, headers, "mum") == {todo}
+
+    client.delete(f"/todos/{todo}", headers=headers)
+    assert found(client, headers, "mum") == set()
+
+
+def test_batch_writes(client, headers):
+    kept, renamed, deleted = (create(client, headers, title=f"{word} report") for word in ("annual", "weekly", "daily"))
+    operations = [
+        {"op": "create", "todo": {"title": "quarterly report"}},
+        {"op": "update", "id": renamed, "changes": {"title": "weekly summary"}},
+        {"op": "delete", "id": deleted},
+        {"op": "complete", "id": kept},
+    ]
+    results = client.post("/todos/batch", json={"operations": operations}, headers=headers).json()["results"]
+    assert found(client, headers, "report") == {kept, results[0]["id"]}
+    assert found(client, headers, "summary") == {renamed}
+    assert found(client, headers, "daily") == set()
+
+
+def test_scoped_to_owner(client, new_user):
+    alice, bob = new_user(), new_user()
+    mine = create(client, alice, title="shared word")
+    theirs = create(client, bob, title="shared word", description="bob only")
+    assert found(client, alice, "shared") == {mine}
+    assert found(client, bob, "shared") == {theirs}
+    assert found(client, alice, "bob") == set()
+    # a write by one user doesn't leak into the other's results
+    client.patch(f"/todos/{theirs}", json={"title": "alice"}, headers=bob)
+    assert found(client, alice, "alice") == set()
+
+
+def test_pages_without_writes(client, headers):
+    ids = {create(client, headers, title=f"page {i}", description="page" * (i % 3)) for i in range(7)}
+    seen, cursor = [], None
+    while True:
+        page = search(client, headers, "page", limit=3, **({"cursor": cursor} if cursor else {}))
+        seen += [todo["id"] for todo in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(ids)
@@ -0,0 +1,56 @@
+"""GET /me/stats from the counters on the user row, and their reconciliation (app/stats.py)."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlmodel import Session
+
+from app.database import engine
+from app.models import User
+from app.stats import reconcile_todo_counts
+
+
+def stats(client, headers) -> dict:
+    response = client.get("/me/stats", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture
+def user(client, new_user):
+    """(headers, user id, {title: id}) of a user with todos a..e: b completed, c with a reminder, d overdue."""
+    headers = new_user()
+    soon, past = (datetime.now() + timedelta(days=1)).isoformat(), (datetime.now() - timedelta(days=1)).isoformat()
+    bodies = [{"title": "a"}, {"title": "b", "completed": True}, {"title": "c", "reminder_at": soon}, {"title": "d", "due_date": past}, {"title": "e"}]
+    todos = [client.post("/todos/", json=body, headers=headers).json() for body in bodies]
+    return headers, todos[0]["owner_id"], {todo["title"]: todo["id"] for todo in todos}
+
+
+def test_counters_follow_writes(client, user):
+    headers, _, ids = user
+    assert stats(client, headers) == {"total": 5, "completed": 1, "open": 4, "overdue": 1, "pending_reminders": 1}
+
+    client.patch(f"/todos/{ids['a']}", json={"completed": True}, headers=headers)
+    client.patch(f"/todos/{ids['b']}", json={"completed": False}, headers=headers)
+    client.put(f"/todos/{ids['d']}", json={"title": "d", "completed": True}, headers=headers)
+    client.patch(f"/todos/{ids['e']}", json={"reminder_at": (datetime.now() + timedelta(hours=1)).isoformat()}, headers=headers)
+    assert stats(client, headers) == {"total": 5, "completed": 2, "open": 3, "overdue": 0, "pending_reminders": 2}
+
+    for title in "ace":
+        assert client.delete(f"/todos/{ids[title]}", headers=headers).status_code == 204
+    assert stats(client, headers) == {"total": 2, "completed": 1, "open": 1, "overdue": 0, "pending_reminders": 0}
+
+
+def test_reconcile_repairs_drift(client, user):
+    headers, user_id, _ = user
+    expected = stats(client, headers)
+    reconcile_todo_counts()
+    with Session(engine) as session:
+        # rows written around the API, or a lost race between two updates
+        session.execute(update(User).where(User.id == user_id).values(todo_count=40, completed_count=0, reminder_count=7))
+        session.commit()
+    assert stats(client, headers)["total"] == 40
+
+    assert reconcile_todo_counts() == 1
+    assert stats(client, headers) == expected
+    assert reconcile_todo_counts() == 0
@@ -0,0 +1,101 @@
+"""GET /todos/changes (app/sync.py): where a page ends, and syncing through the API."""
+import base64
+import json
+import time
+
+import pytest
+
+from app import sync
+from app.sync import _page_end
+
+
+@pytest.mark.parametrize(
+    "change_seqs, current, limit, page_end",
+    [
+        ([3, 4], 9, 5, (9, False)),  # everything fits
+        ([3, 4, 5, 6], 9, 3, (5, True)),  # ends before the first change that doesn't fit
+        ([3, 3, 3, 6], 9, 3, (5, True)),  # ... after a whole transaction
+        ([3, 3, 3, 3], 9, 3, (3, True)),  # a transaction bigger than a page is returned whole
+        ([9, 9, 9, 9], 9, 3, (9, False)),  # ... and if it is the last one, nothing is left
+    ],
+)
+def test_page_end(change_seqs, current, limit, page_end):
+    assert _page_end(change_seqs, current, limit) == page_end
+
+
+def changes(client, headers, since=None, limit=None, status_code=200) -> dict:
+    params = {key: value for key, value in (("since", since), ("limit", limit)) if value is not None}
+    response = client.get("/todos/changes", params=params, headers=headers)
+    assert response.status_code == status_code, response.text
+    return response.json()
+
+
+def create(client, headers, title: str) -> int:
+    return client.post("/todos/", json={"title": title}, headers=headers).json()["id"]
+
+
+def test_changes_after_each_write(client, new_user):
+    headers = new_user()
+    full = changes(client, headers)
+    assert (full["todos"], full["deleted"], full["has_more"]) == ([], [], False)
+
+    a, b = create(client, headers, "a"), create(client, headers, "b")
+    page = changes(client, headers, full["sync_token"])
+    assert [todo["id"] for todo in page["todos"]] == [a, b] and page["deleted"] == []
+
+    client.patch(f"/todos/{a}", json={"completed": True}, headers=headers)
+    patched = changes(client, headers, page["sync_token"])
+    assert [(todo["id"], todo["completed"]) for todo in patched["todos"]] == [(a, True)]
+
+    client.delete(f"/todos/{b}", headers=headers)
+    deleted = changes(client, headers, patched["sync_token"])
+    assert (deleted["todos"], deleted["deleted"]) == ([], [b])
+
+    # nothing since, and another user's writes don't show up
+    create(client, new_user(), "elsewhere")
+    assert changes(client, headers, deleted["sync_token"])["todos"] == []
+    # a full sync has no tombstones, only what exists
+    assert [todo["id"] for todo in changes(client, headers)["todos"]] == [a]
+
+
+def test_batch_deletes_leave_tombstones(client, new_user):
+    headers = new_user()
+    ids = [create(client, headers, title) for title in "abc"]
+    token = changes(client, headers)["sync_token"]
+    operations = [{"op": "delete", "id": ids[0]}, {"op": "delete", "id": ids[2]}]
+    assert client.post("/todos/batch", json={"operations": operations}, headers=headers).json()["applied"] == 2
+    page = changes(client, headers, token)
+    assert (page["todos"], sorted(page["deleted"])) == ([], [ids[0], ids[2]])
+
+
+def test_multi_page_walk(client, new_user):
+    headers = new_user()
+    token = changes(client, headers)["sync_token"]
+    ids = [create(client, headers, f"single {i}") for i in range(5)]
+    # one transaction of four: never split across pages
+    operations = [{"op": "create", "todo": {"title": f"batch {i}"}} for i in range(4)]
+    batch_ids = [result["id"] for result in client.post("/todos/batch", json={"operations": operations}, headers=headers).json()["results"]]
+    client.delete(f"/todos/{ids[1]}", headers=headers)
+
+    seen, deleted, pages = [], [], []
+    while True:
+        page = changes(client, headers, token, limit=2)
+        pages.append([todo["id"] for todo in page["todos"]])
+        seen += pages[-1]
+        deleted += page["deleted"]
+        token = page["sync_token"]
+        if not page["has_more"]:
+            break
+    assert sorted(seen) == sorted(set(ids + batch_ids) - {ids[1]}) and len(seen) == len(set(seen))
+    assert deleted == [ids[1]]
+    assert batch_ids in pages and len(pages) >= 4
+    assert all(len(page) <= 2 for page in pages if page != batch_ids)
+    assert changes(client, headers, token)["todos"] == []
+
+
+def test_old_and_malformed_tokens(client, new_user):
+    headers = new_user()
+    issued = time.time() - sync.SYNC_TOMBSTONE_RETENTION_DAYS * 86400 - 60
+    expired = base64.urlsafe_b64encode(json.dumps({"v": 0, "t": int(issued)}).encode()).decode().rstrip("=")
+    assert "without ?since=" in changes(client, headers, expired, status_code=410)["detail"]
+    changes(client, headers, "not a token", status_code=400)
@@ -0,0 +1,43 @@
+"""Writes through the todo endpoints: which failures become a 400 or 422, and which propagate."""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+
+from app import crud
+from app.main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        client.post("/register", json={"username": "writer", "password": "Pw12345678!"})
+        token = client.post("/token", data={"username": "writer", "password": "Pw12345678!"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+def test_duplicate_title_is_400(client):
+    assert client.post("/todos/", json={"title": "dup"}).status_code == 201
+    other = client.post("/todos/", json={"title": "dup 2"}).json()
+    assert client.post("/todos/", json={"title": "dup"}).status_code == 400
+    assert client.patch(f"/todos/{other['id']}", json={"title": "dup"}).status_code == 400
+
+
+@pytest.mark.parametrize("field", ["title", "completed"])
+def test_explicit_null_is_422(client, field):
+    todo = client.post("/todos/", json={"title": f"null {field}"}).json()
+    response = client.patch(f"/todos/{todo['id']}", json={field: None})
+    assert response.status_code == 422
+    assert client.get(f"/todos/{todo['id']}").json()[field] is not None
+
+
+def test_other_integrity_errors_propagate(client, monkeypatch):
+    todo = client.post("/todos/", json={"title": "not a duplicate"}).json()
+
+    def broken(todo, todo_in):
+        todo.title = None  # a NOT NULL violation: a bug, not the client's duplicate title
+        return todo
+
+    monkeypatch.setattr(crud, "apply_partial_update", broken)
+    with pytest.raises(IntegrityError):
+        client.patch(f"/todos/{todo['id']}", json={"description": "x"})
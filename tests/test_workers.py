@@ -0,0 +1,57 @@
+"""PeriodicWorker (app/workers.py), the loop behind the dispatcher, retention and stats threads."""
+import threading
+
+from app.workers import PeriodicWorker
+
+
+class Counting(PeriodicWorker):
+    name = "test-worker"
+
+    def __init__(self, interval: float, fail_first: bool = False):
+        super().__init__(interval)
+        self.runs = 0
+        self.fail_first = fail_first
+        self.ran = threading.Event()
+
+    def run_once(self) -> None:
+        self.runs += 1
+        self.ran.set()
+        if self.fail_first and self.runs == 1:
+            raise RuntimeError("first run fails")
+
+
+def test_runs_on_start_and_when_poked():
+    worker = Counting(interval=60)
+    worker.start()
+    try:
+        assert worker.ran.wait(5)
+        worker.ran.clear()
+        worker.poke()
+        assert worker.ran.wait(5)
+        assert worker.runs == 2
+    finally:
+        worker.stop()
+    assert not worker._thread.is_alive()
+
+
+def test_delay_first_run():
+    worker = Counting(interval=60)
+    worker.delay_first_run = True
+    worker.start()
+    try:
+        assert not worker.ran.wait(0.2)
+    finally:
+        worker.stop()
+    assert worker.runs == 0 and not worker._thread.is_alive()
+
+
+def test_keeps_running_after_a_failure():
+    worker = Counting(interval=0.01, fail_first=True)
+    worker.start()
+    try:
+        for _ in range(2):
+            assert worker.ran.wait(5)
+            worker.ran.clear()
+    finally:
+        worker.stop()
+    assert worker.runs >= 2